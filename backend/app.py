@@ -1,11 +1,45 @@
+import asyncio
+import logging
+import math
 import os
+from collections.abc import Awaitable, Callable
+from datetime import timedelta
 
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from pymongo.errors import PyMongoError
 
+from backend.config import settings
+from backend.repositories.base import VersionConflictError
+from backend.repositories.command_output import CommandOutputRepository
+from backend.repositories.job import JobRepository
+from backend.repositories.path_analytics import PathAnalyticsRepository
+from backend.repositories.runbook import RunbookRepository
+from backend.repositories.user import UserRepository
+from backend.services.archive import session_archiver
+from backend.services.autocomplete import autocomplete_index
+from backend.services.body_limit import BodySizeLimitMiddleware
+from backend.services.cache import invalidation_bus
 from backend.services.database import db
+from backend.services.metrics import MetricsMiddleware
+from backend.services.rate_limit import AdmissionRejected
+from backend.services.revocation import revocation_list
+from backend.services.runbook_snapshot import runbook_snapshot
+from backend.services.runbook_uploads import runbook_uploads
+from backend.services.similarity import similarity_index
+from backend.services.single_flight import SingleFlightMiddleware
+from backend.services.structured_logging import RequestIdMiddleware, log_pipeline
+from backend.services.warmup import cache_warmer
+from backend.views import (
+    admin_routes,
+    auth_routes,
+    job_routes,
+    metrics_routes,
+    runbook_routes,
+    session_routes,
+)
 
 load_dotenv()
 
@@ -16,14 +50,95 @@ app = FastAPI(
 )
 
 
+logger = logging.getLogger(__name__)
+
+# Set while the services that need MongoDB wait for it to come back.
+_mongo_startup_task: asyncio.Task | None = None
+
+
+def _mongo_startup_steps() -> list[Callable[[], Awaitable[None]]]:
+    """The startup steps that need MongoDB, in the order they run."""
+    return [
+        lambda: invalidation_bus.start(db.db),
+        lambda: revocation_list.start(db.db),
+        lambda: PathAnalyticsRepository(db.db).ensure_indexes(),
+        lambda: RunbookRepository(db.db).ensure_indexes(),
+        lambda: UserRepository(db.db).ensure_indexes(),
+        lambda: CommandOutputRepository(db.db).ensure_indexes(),
+        lambda: JobRepository(db.db).ensure_indexes(
+            timedelta(days=settings.job_retention_days)
+        ),
+        lambda: session_archiver.ensure_indexes(db.db),
+        lambda: similarity_index.start(db.db),
+        lambda: autocomplete_index.start(db.db),
+    ]
+
+
+async def _run_startup_steps(steps: list[Callable[[], Awaitable[None]]]) -> None:
+    """
+    Run startup steps in order, removing each one once it has succeeded.
+
+    :param steps: The steps left to run; on failure, the failed step and the
+        ones after it remain, so a retry resumes where this run stopped.
+    """
+    while steps:
+        await steps[0]()
+        steps.pop(0)
+
+
+async def _retry_startup_steps(steps: list[Callable[[], Awaitable[None]]]) -> None:
+    while steps:
+        await asyncio.sleep(settings.db_health_interval_s)
+        if not db.healthy:
+            continue
+        try:
+            await _run_startup_steps(steps)
+        except PyMongoError as exc:
+            logger.warning("MongoDB startup steps failed again: %s", exc)
+    logger.info("MongoDB is reachable; startup completed")
+
+
 @app.on_event("startup")
 async def startup_db_client():
+    global _mongo_startup_task
+    log_pipeline.start()
     await db.connect()
+    await runbook_snapshot.start(db.db)
+    steps = _mongo_startup_steps()
+    try:
+        if not await db.ping():
+            raise PyMongoError("MongoDB did not answer the startup ping")
+        await _run_startup_steps(steps)
+    except PyMongoError as exc:
+        if runbook_snapshot.created_at is None:
+            # Without a snapshot there is nothing to serve until MongoDB is up.
+            raise
+        logger.warning(
+            "MongoDB is unavailable at startup (%s); serving the runbook "
+            "snapshot and retrying in the background",
+            exc,
+        )
+        _mongo_startup_task = asyncio.create_task(_retry_startup_steps(steps))
+    cache_warmer.start(db.db)
 
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    if _mongo_startup_task is not None:
+        _mongo_startup_task.cancel()
+        try:
+            await _mongo_startup_task
+        except asyncio.CancelledError:
+            pass
+    await cache_warmer.stop()
+    await runbook_snapshot.stop()
+    runbook_uploads.shutdown()
+    await autocomplete_index.stop()
+    await similarity_index.stop()
+    await revocation_list.stop()
+    await invalidation_bus.stop()
     await db.disconnect()
+    log_pipeline.stop()
 
 
 # CORS middleware
@@ -37,6 +152,56 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(
+    SingleFlightMiddleware,
+    path_prefixes=[p.strip() for p in settings.single_flight_get_paths.split(",")],
+)
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_bytes=settings.max_request_body_bytes,
+    path_limits={"/api/runbooks": settings.max_runbook_body_bytes},
+)
+app.add_middleware(MetricsMiddleware)
+# Outermost, so every log record of a request carries its ID
+app.add_middleware(RequestIdMiddleware)
+
+app.include_router(metrics_routes.router)
+app.include_router(admin_routes.router)
+app.include_router(auth_routes.router)
+app.include_router(job_routes.router)
+app.include_router(runbook_routes.router)
+app.include_router(session_routes.router)
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=exc.status_code,
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+        content={
+            "ok": False,
+            "error": {
+                "code": "rate_limited" if exc.status_code == 429 else "overloaded",
+                "message": "Too many requests, retry later.",
+            },
+        },
+    )
+
+
+@app.exception_handler(VersionConflictError)
+async def version_conflict_handler(request: Request, exc: VersionConflictError):
+    return JSONResponse(
+        status_code=409,
+        headers={"ETag": f'"{exc.current_version}"'},
+        content={
+            "ok": False,
+            "error": {
+                "code": "version_conflict",
+                "message": "The document was modified by someone else.",
+                "details": {"current_version": exc.current_version},
+            },
+        },
+    )
 
 
 @app.get("/")
@@ -59,6 +224,24 @@ async def health_check():
     )
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Report ready once the startup cache warm-up has finished or timed out."""
+    if not cache_warmer.ready:
+        return JSONResponse(
+            status_code=503,
+            content={
+                "ok": False,
+                "error": {
+                    "code": "warming_up",
+                    "message": "The caches are still warming up.",
+                    "details": cache_warmer.state(),
+                },
+            },
+        )
+    return {"ok": True, "data": cache_warmer.state()}
+
+
 @app.get("/api/health")
 async def api_health_check():
     return JSONResponse(
@@ -0,0 +1,111 @@
+"""
+Compare the memory held per cached runbook as models and in compact form.
+
+Run with ``python -m backend.benchmarks.cache_footprint``. For each size,
+several distinct runbooks are built from BSON and kept alive, and the memory
+they hold is measured with tracemalloc. Conversion times show what a cache
+hit costs in each form.
+"""
+import argparse
+import gc
+import statistics
+import time
+import tracemalloc
+from collections.abc import Callable
+from typing import Any
+
+import bson
+from bson import ObjectId
+
+from backend.benchmarks.raw_reads import build_runbook
+from backend.models.compact import CompactRunbook
+from backend.models.runbook import Runbook
+from backend.services.bson_json import document_to_json
+
+
+def held_bytes(build: Callable[[], Any], count: int) -> float:
+    """
+    Measure the memory held by ``count`` objects built by ``build``.
+
+    :param build: Builds one object.
+    :param count: The number of objects kept alive.
+    :return: Bytes held per object.
+    """
+    gc.collect()
+    tracemalloc.start()
+    kept = [build() for _ in range(count)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return current / count
+
+
+def median_ms(fn: Callable[[], Any], rounds: int) -> float:
+    """Return the median run time of ``fn`` in milliseconds."""
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def measure(size_kb: int, count: int, rounds: int) -> dict[str, float]:
+    """
+    Measure one runbook size.
+
+    :param size_kb: The approximate BSON size of the runbook.
+    :param count: The number of runbooks kept alive per form.
+    :param rounds: The number of timed conversions.
+    :return: Sizes in KiB and conversion times in milliseconds.
+    """
+    doc = build_runbook(size_kb * 1024)
+    data = bson.encode(doc)
+
+    def load() -> Runbook:
+        # Each cached runbook has its own strings, as if read from MongoDB.
+        stored = bson.decode(data)
+        stored["_id"] = ObjectId()
+        return Runbook(**stored)
+
+    model_bytes = held_bytes(load, count)
+    compact_bytes = held_bytes(lambda: CompactRunbook(load()), count)
+    runbook = load()
+    compact = CompactRunbook(runbook)
+    assert compact.to_model() == runbook
+    return {
+        "bson_kib": len(data) / 1024,
+        "nodes": len(doc["decision_tree"]["nodes"]),
+        "model_kib": model_bytes / 1024,
+        "compact_kib": compact_bytes / 1024,
+        "to_model_ms": median_ms(compact.to_model, rounds),
+        "to_json_ms": median_ms(
+            lambda: document_to_json(compact.to_document()), rounds
+        ),
+        "dump_ms": median_ms(lambda: runbook.model_dump(mode="json"), rounds),
+    }
+
+
+def main() -> None:
+    """Run the benchmark and print a comparison table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes-kb", default="16,256,2048")
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    print(
+        f"{'BSON KiB':>9} {'nodes':>6} {'model KiB':>10} {'compact KiB':>12} "
+        f"{'ratio':>6} {'to_model ms':>12} {'to JSON ms':>11} {'dump ms':>8}"
+    )
+    for size_kb in args.sizes_kb.split(","):
+        r = measure(int(size_kb), args.count, args.rounds)
+        print(
+            f"{r['bson_kib']:>9.0f} {r['nodes']:>6} {r['model_kib']:>10.0f} "
+            f"{r['compact_kib']:>12.0f} {r['model_kib'] / r['compact_kib']:>6.1f} "
+            f"{r['to_model_ms']:>12.2f} {r['to_json_ms']:>11.2f} {r['dump_ms']:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
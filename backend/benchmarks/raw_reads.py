@@ -0,0 +1,149 @@
+"""
+Compare the validated and raw read paths on a large runbook.
+
+Run with ``python -m backend.benchmarks.raw_reads``. The document is encoded to
+BSON once and then served repeatedly from bytes, so the numbers isolate
+decoding, validation and JSON encoding from network and MongoDB time.
+"""
+import argparse
+import json
+import statistics
+import time
+import tracemalloc
+from collections.abc import Callable
+from datetime import UTC, datetime
+
+import bson
+from bson import ObjectId
+from bson.raw_bson import RawBSONDocument
+
+from backend.models.runbook import Runbook
+from backend.services.bson_json import decode_raw, document_to_json, ok_envelope
+
+
+def build_runbook(target_bytes: int) -> dict:
+    """
+    Build a stored runbook document of roughly the given BSON size.
+
+    :param target_bytes: The approximate encoded size.
+    :return: The document, as MongoDB would return it.
+    """
+    nodes = {}
+    index = 0
+    while len(bson.encode({"nodes": nodes})) < target_bytes:
+        decision, action = f"decision-{index}", f"action-{index}"
+        nodes[decision] = {
+            "id": decision,
+            "type": "decision",
+            "question": f"Is component {index} healthy?",
+            "description": "Check the dashboard and the recent deploys. " * 4,
+            "options": [
+                {"description": "Yes", "next_node_id": f"decision-{index + 1}"},
+                {"description": "No", "next_node_id": action},
+            ],
+        }
+        nodes[action] = {
+            "id": action,
+            "type": "action",
+            "title": f"Restart component {index}",
+            "description": "Restart the component and watch the error rate. " * 4,
+            "commands": [
+                {
+                    "command": f"kubectl rollout restart deploy/component-{index}",
+                    "description": "Restart the deployment",
+                    "timeout_seconds": 120,
+                    "expected_exit_codes": [0],
+                },
+                {
+                    "command": f"kubectl rollout status deploy/component-{index}",
+                    "description": "Wait for the rollout",
+                    "timeout_seconds": 300,
+                    "expected_exit_codes": [0],
+                },
+            ],
+            "next_node_id": None,
+        }
+        index += 1
+    now = datetime.now(UTC).replace(tzinfo=None)
+    return {
+        "_id": ObjectId(),
+        "title": "Large runbook",
+        "description": "Synthetic runbook used for read benchmarks.",
+        "owner_id": ObjectId(),
+        "severity": "critical",
+        "execution_environment": {"name": "bench", "base_image": "ubuntu:22.04"},
+        "decision_tree": {"root_node_id": "decision-0", "nodes": nodes},
+        "version": 1,
+        "tags": ["benchmark"],
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def validated_path(data: bytes) -> bytes:
+    """Decode to dicts, validate into the model, dump and encode."""
+    runbook = Runbook(**bson.decode(data))
+    payload = {"ok": True, "data": runbook.model_dump(mode="json")}
+    return json.dumps(payload).encode()
+
+
+def raw_path(data: bytes) -> bytes:
+    """Wrap the bytes as a raw document and encode it straight to JSON."""
+    return ok_envelope(document_to_json(decode_raw(RawBSONDocument(data))))
+
+
+def measure(fn: Callable[[bytes], bytes], data: bytes, rounds: int) -> dict:
+    """
+    Time a read path and measure its peak allocation.
+
+    :param fn: The read path.
+    :param data: The BSON document.
+    :param rounds: The number of timed runs.
+    :return: Median and p95 latency in milliseconds, and peak memory in MiB.
+    """
+    fn(data)
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn(data)
+        timings.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    fn(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    timings.sort()
+    return {
+        "median_ms": statistics.median(timings),
+        "p95_ms": timings[int(len(timings) * 0.95) - 1],
+        "peak_mib": peak / 2**20,
+    }
+
+
+def main() -> None:
+    """Run the benchmark and print a comparison table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=float, default=1.0)
+    parser.add_argument("--rounds", type=int, default=30)
+    args = parser.parse_args()
+
+    data = bson.encode(build_runbook(int(args.size_mb * 2**20)))
+    assert (
+        json.loads(raw_path(data))["data"]["decision_tree"]
+        == json.loads(validated_path(data))["data"]["decision_tree"]
+    )
+
+    print(f"Runbook size: {len(data) / 2**20:.2f} MiB BSON, {args.rounds} rounds")
+    results = {
+        "validated": measure(validated_path, data, args.rounds),
+        "raw": measure(raw_path, data, args.rounds),
+    }
+    print(f"{'path':<10} {'median ms':>10} {'p95 ms':>10} {'peak MiB':>10}")
+    for name, result in results.items():
+        print(
+            f"{name:<10} {result['median_ms']:>10.1f} {result['p95_ms']:>10.1f} "
+            f"{result['peak_mib']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
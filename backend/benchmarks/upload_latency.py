@@ -0,0 +1,175 @@
+"""
+Measure small-request latency while large runbooks are being uploaded.
+
+Run with ``python -m backend.benchmarks.upload_latency``. An in-process app
+serves a trivial GET route next to an upload route that validates runbook
+bodies the way ``POST /api/runbooks`` does. Small requests are issued at a
+steady rate, first alone and then while an upload arrives every second, with
+validation inline on the event loop and then offloaded to the process pool.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi import FastAPI, Request
+from httpx import AsyncClient
+
+from backend.benchmarks.raw_reads import build_runbook
+from backend.services.runbook_uploads import RunbookUploads
+
+
+def build_body(target_bytes: int) -> bytes:
+    """
+    Build a ``RunbookCreate`` body of roughly the given size.
+
+    :param target_bytes: The approximate BSON size of the runbook.
+    :return: The JSON body.
+    """
+    doc = build_runbook(target_bytes)
+    nodes = doc["decision_tree"]["nodes"]
+    # The generated chain ends in an option to a node that does not exist.
+    last = max(
+        (node for node in nodes.values() if node["type"] == "decision"),
+        key=lambda node: int(node["id"].rsplit("-", 1)[1]),
+    )
+    last["options"][0]["next_node_id"] = last["options"][1]["next_node_id"]
+    return json.dumps(
+        {
+            "title": doc["title"],
+            "description": doc["description"],
+            "owner_id": str(doc["owner_id"]),
+            "severity": doc["severity"],
+            "execution_environment": doc["execution_environment"],
+            "decision_tree": doc["decision_tree"],
+            "tags": doc["tags"],
+        }
+    ).encode()
+
+
+def build_app(uploads: RunbookUploads) -> FastAPI:
+    """
+    Build the app under test.
+
+    :param uploads: Validates the upload bodies.
+    :return: The app.
+    """
+    app = FastAPI()
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        prepared = await uploads.prepare_create(await request.body())
+        return {"ok": True, "data": {"id": prepared.id}}
+
+    return app
+
+
+async def run_case(
+    uploads: RunbookUploads | None,
+    body: bytes,
+    duration: float,
+    interval: float,
+    upload_interval: float,
+) -> dict:
+    """
+    Issue small requests at a steady rate, optionally while uploading.
+
+    :param uploads: Validates uploads, or None for no uploads.
+    :param body: The upload body.
+    :param duration: Seconds to measure for.
+    :param interval: Seconds between small requests.
+    :param upload_interval: Seconds between the starts of uploads.
+    :return: Small-request latency percentiles in milliseconds and the
+        number of uploads completed.
+    """
+    app = build_app(uploads or RunbookUploads(1 << 62, 1, 64))
+    latencies: list[float] = []
+    uploaded = 0
+    async with AsyncClient(app=app, base_url="http://bench") as client:
+        if uploads is not None:
+            # Start the pool processes before measuring.
+            await client.post("/upload", content=body)
+        deadline = time.perf_counter() + duration
+
+        async def upload_loop() -> None:
+            nonlocal uploaded
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.post("/upload", content=body)
+                response.raise_for_status()
+                uploaded += 1
+                await asyncio.sleep(upload_interval - (time.perf_counter() - started))
+
+        async def small(scheduled: float) -> None:
+            (await client.get("/small")).raise_for_status()
+            latencies.append((time.perf_counter() - scheduled) * 1000)
+
+        uploader = asyncio.create_task(upload_loop()) if uploads else None
+        pending = []
+        scheduled = time.perf_counter()
+        while scheduled < deadline:
+            # Latency counts from when the request was due, not from when
+            # a blocked loop got around to sending it.
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            pending.append(asyncio.create_task(small(scheduled)))
+            scheduled += interval
+        await asyncio.gather(*pending)
+        if uploader is not None:
+            await uploader
+    latencies.sort()
+    return {
+        "p50_ms": latencies[len(latencies) // 2],
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1],
+        "max_ms": latencies[-1],
+        "uploads": uploaded,
+    }
+
+
+def main() -> None:
+    """Run the benchmark and print a comparison table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=float, default=2.0)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--interval-ms", type=float, default=5.0)
+    parser.add_argument("--upload-interval-ms", type=float, default=1000.0)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    body = build_body(int(args.size_mb * 2**20))
+    print(
+        f"Upload size: {len(body) / 2**20:.2f} MiB JSON, "
+        f"{args.duration:.0f}s per case, a small request every {args.interval_ms}ms, "
+        f"an upload every {args.upload_interval_ms}ms"
+    )
+    inline = RunbookUploads(offload_bytes=len(body) + 1, workers=1, dim=256)
+    pooled = RunbookUploads(offload_bytes=0, workers=args.workers, dim=256)
+    results = {}
+    try:
+        for name, uploads in (("idle", None), ("inline", inline), ("pool", pooled)):
+            results[name] = asyncio.run(
+                run_case(
+                    uploads,
+                    body,
+                    args.duration,
+                    args.interval_ms / 1000,
+                    args.upload_interval_ms / 1000,
+                )
+            )
+    finally:
+        pooled.shutdown()
+    print(f"{'case':<8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'uploads':>8}")
+    for name, result in results.items():
+        print(
+            f"{name:<8} {result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} "
+            f"{result['max_ms']:>8.1f} {result['uploads']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Authentication business logic."""
+import functools
+import uuid
+from datetime import UTC, datetime, timedelta
+
+from fastapi import HTTPException, status
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from starlette.concurrency import run_in_threadpool
+
+from backend.config import settings
+from backend.models.token import RefreshToken
+from backend.models.user import User, UserLogin
+from backend.repositories.refresh_token import RefreshTokenRepository
+from backend.repositories.user import UserRepository
+from backend.services.password import password_service
+from backend.services.rate_limit import (
+    login_account_limiter,
+    login_ip_limiter,
+    password_verification_gate,
+)
+from backend.services.revocation import revocation_list
+from backend.services.token import token_service
+
+
+@functools.cache
+def _dummy_hash() -> str:
+    """A hash of no one's password, verified when there is no account to check."""
+    return password_service.get_password_hash(uuid.uuid4().hex)
+
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=detail)
+
+
+class AuthController:
+    """Controller for login, token refresh and logout."""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        """
+        Initializes the controller.
+
+        :param db: The database instance.
+        """
+        self.user_repo = UserRepository(db)
+        self.refresh_token_repo = RefreshTokenRepository(db)
+
+    async def login(
+        self, credentials: UserLogin, client_ip: str
+    ) -> tuple[User, str, str]:
+        """
+        Authenticate a user and issue a new token family.
+
+        Rate limits are checked before any database or bcrypt work, and password
+        verification runs in a worker thread behind a global concurrency gate.
+        The email is matched case-insensitively, for the account rate limit
+        and the lookup alike.
+
+        :param credentials: The submitted credentials.
+        :param client_ip: The client IP address.
+        :return: The authenticated user, their access token and refresh token.
+        :raises AdmissionRejected: If the request is shed.
+        """
+        email = credentials.email.strip().lower()
+        login_ip_limiter.acquire(client_ip)
+        login_account_limiter.acquire(email)
+
+        user = await self.user_repo.get_by_email(email)
+        known = user is not None and user.is_active
+
+        # Unknown and inactive accounts are checked against a dummy hash, so
+        # the response time does not tell which emails have an account.
+        async with password_verification_gate:
+            valid = await run_in_threadpool(
+                lambda: password_service.verify_password(
+                    credentials.password,
+                    user.password_hash if known else _dummy_hash(),
+                )
+            )
+        if not known or not valid:
+            raise _unauthorized("Invalid credentials")
+
+        family_id = uuid.uuid4().hex
+        jti = uuid.uuid4().hex
+        refresh_token = await self._issue_refresh_token(user, family_id, jti)
+        return user, self._issue_access_token(user, family_id), refresh_token
+
+    async def refresh(self, refresh_token: str) -> tuple[User, str, str]:
+        """
+        Rotate a refresh token, issuing a new access and refresh token.
+
+        Presenting a refresh token that was already rotated means it has been
+        copied, so the whole family is revoked.
+
+        :param refresh_token: The presented refresh token.
+        :return: The user, a new access token and a new refresh token.
+        """
+        payload = token_service.decode_token(refresh_token)
+        if payload is None or payload.get("type") != "refresh":
+            raise _unauthorized("Invalid refresh token")
+        family_id = payload.get("fam")
+        if family_id is None or revocation_list.is_revoked(family_id):
+            raise _unauthorized("Refresh token has been revoked")
+
+        new_jti = uuid.uuid4().hex
+        previous = await self.refresh_token_repo.rotate(payload.get("jti"), new_jti)
+        if previous is None:
+            await self._revoke_family(family_id)
+            raise _unauthorized("Refresh token has already been used")
+
+        user = await self.user_repo.get(str(previous.user_id))
+        if user is None or not user.is_active:
+            await self._revoke_family(family_id)
+            raise _unauthorized("User not found")
+
+        new_refresh_token = await self._issue_refresh_token(user, family_id, new_jti)
+        return user, self._issue_access_token(user, family_id), new_refresh_token
+
+    async def logout(self, refresh_token: str | None) -> None:
+        """
+        Revoke the token family of the presented refresh token.
+
+        :param refresh_token: The refresh token, if the client still has one.
+        """
+        if not refresh_token:
+            return
+        payload = token_service.decode_token(refresh_token)
+        if payload and payload.get("type") == "refresh" and payload.get("fam"):
+            await self._revoke_family(payload["fam"])
+
+    def _issue_access_token(self, user: User, family_id: str) -> str:
+        return token_service.create_access_token(
+            {"sub": str(user.id), "role": user.role.value, "fam": family_id}
+        )
+
+    async def _issue_refresh_token(self, user: User, family_id: str, jti: str) -> str:
+        expires_delta = timedelta(minutes=settings.refresh_token_ttl_min)
+        await self.refresh_token_repo.create(
+            RefreshToken(
+                jti=jti,
+                family_id=family_id,
+                user_id=user.id,
+                expires_at=datetime.now(UTC) + expires_delta,
+            )
+        )
+        return token_service.create_refresh_token(
+            {"sub": str(user.id), "jti": jti, "fam": family_id}, expires_delta
+        )
+
+    async def _revoke_family(self, family_id: str) -> None:
+        await self.refresh_token_repo.revoke_family(family_id)
+        revocation_list.revoke(family_id)
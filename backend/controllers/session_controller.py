@@ -0,0 +1,261 @@
+"""Session business logic."""
+from datetime import UTC, datetime
+from typing import Any
+
+from fastapi import HTTPException, status
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from backend.models.enums import SessionStatus
+from backend.models.job import Job
+from backend.models.runbook import ActionNode, DecisionNode, Runbook
+from backend.models.session import Session, SessionUpdate
+from backend.models.user import User
+from backend.repositories.job import JobRepository
+from backend.repositories.path_analytics import PathAnalyticsRepository
+from backend.repositories.runbook import RunbookRepository
+from backend.repositories.session import SessionRepository
+from backend.services.speculation import get_action_metadata, speculative_preparer
+
+FINAL_STATUSES = (SessionStatus.COMPLETED, SessionStatus.FAILED)
+
+
+def _elapsed_seconds(since: datetime) -> float:
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=UTC)
+    return max(0.0, (datetime.now(UTC) - since).total_seconds())
+
+
+def _concurrent_change() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Session was changed by another request; reload it and retry",
+    )
+
+
+class SessionController:
+    """Controller for starting and walking execution sessions."""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        """
+        Initializes the controller.
+
+        :param db: The database instance.
+        """
+        self.session_repo = SessionRepository(db)
+        self.runbook_repo = RunbookRepository(db)
+        self.analytics_repo = PathAnalyticsRepository(db)
+        self.job_repo = JobRepository(db)
+
+    async def _get_session(self, session_id: str) -> Session:
+        session = await self.session_repo.get(session_id)
+        if session is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Session not found"
+            )
+        return session
+
+    async def _get_runbook(self, runbook_id: str) -> Runbook:
+        runbook = await self.runbook_repo.get(runbook_id)
+        if runbook is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Runbook not found"
+            )
+        return runbook
+
+    async def _speculate(self, session_id: str, runbook: Runbook, node_id: str) -> None:
+        """Start preparing the likely next actions if ``node_id`` is a decision."""
+        node = runbook.decision_tree.nodes.get(node_id)
+        if not isinstance(node, DecisionNode):
+            return
+        choices, visits = await self.analytics_repo.get_option_choices(
+            runbook.id, runbook.version, node_id
+        )
+        speculative_preparer.on_decision(session_id, runbook, node, choices, visits)
+
+    async def start(self, runbook_id: str, user: User) -> Session:
+        """
+        Start a new session at the root of a runbook's decision tree.
+
+        :param runbook_id: The runbook ID.
+        :param user: The responder starting the session.
+        :return: The created session.
+        """
+        runbook = await self._get_runbook(runbook_id)
+        root = runbook.decision_tree.root_node_id
+        session = await self.session_repo.create(
+            Session(
+                runbook_id=runbook.id,
+                runbook_version=runbook.version,
+                user_id=user.id,
+                status=SessionStatus.ACTIVE,
+                current_node_id=root,
+                execution_path=[root],
+            )
+        )
+        await self.analytics_repo.record_start(runbook.id, runbook.version, root)
+        await self._speculate(str(session.id), runbook, root)
+        return session
+
+    async def advance(
+        self, session_id: str, next_node_id: str
+    ) -> tuple[Session, dict[str, Any] | None]:
+        """
+        Move an active session to the next node.
+
+        :param session_id: The session ID.
+        :param next_node_id: The node to move to; it must be reachable from the
+            current node through one of its options or its ``next_node_id``.
+        :return: The updated session, and the execution metadata of the node
+            moved to if it is an action, usually prepared while the responder
+            read the decision before it.
+        :raises HTTPException: 409 if the session is not active or another
+            request changed it first.
+        """
+        session = await self._get_session(session_id)
+        if session.status != SessionStatus.ACTIVE:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Session is {session.status.value}",
+            )
+        runbook = await self._get_runbook(str(session.runbook_id))
+        nodes = runbook.decision_tree.nodes
+        current = nodes.get(session.current_node_id)
+
+        option_index = None
+        if isinstance(current, DecisionNode):
+            targets = [option.next_node_id for option in current.options]
+            if next_node_id in targets:
+                option_index = targets.index(next_node_id)
+            reachable = option_index is not None
+        else:
+            reachable = current is not None and current.next_node_id == next_node_id
+        if not reachable or next_node_id not in nodes:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Node {next_node_id} is not reachable from the current node",
+            )
+
+        path = session.execution_path or [session.current_node_id]
+        # Only applies if no concurrent request moved or finished the session
+        # since it was read, so the path and analytics are written once.
+        updated = await self.session_repo.update(
+            session_id,
+            SessionUpdate(
+                current_node_id=next_node_id, execution_path=[*path, next_node_id]
+            ),
+            conditions={
+                "status": session.status.value,
+                "current_node_id": session.current_node_id,
+            },
+        )
+        if updated is None:
+            raise _concurrent_change()
+        await self.analytics_repo.record_advance(
+            session.runbook_id,
+            session.runbook_version or runbook.version,
+            session.current_node_id,
+            next_node_id,
+            option_index,
+            _elapsed_seconds(session.updated_at),
+        )
+        target = nodes[next_node_id]
+        if isinstance(target, ActionNode):
+            # Only an action reached from a decision could have been prepared.
+            if isinstance(current, DecisionNode):
+                speculative_preparer.on_enter(session_id, next_node_id)
+            return updated, get_action_metadata(runbook, target)
+        await self._speculate(session_id, runbook, next_node_id)
+        return updated, None
+
+    async def complete(self, session_id: str, final_status: SessionStatus) -> Session:
+        """
+        Finish a session as completed or failed.
+
+        :param session_id: The session ID.
+        :param final_status: Either ``COMPLETED`` or ``FAILED``.
+        :return: The updated session.
+        :raises HTTPException: 409 if the session is already finished or
+            another request changed it first.
+        """
+        if final_status not in FINAL_STATUSES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="A session can only be completed or failed",
+            )
+        session = await self._get_session(session_id)
+        if session.status in FINAL_STATUSES:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Session is already {session.status.value}",
+            )
+        updated = await self.session_repo.update(
+            session_id,
+            SessionUpdate(status=final_status, completed_at=datetime.now(UTC)),
+            conditions={
+                "status": session.status.value,
+                "current_node_id": session.current_node_id,
+            },
+        )
+        if updated is None:
+            raise _concurrent_change()
+        version = session.runbook_version
+        if version is None:
+            version = (await self._get_runbook(str(session.runbook_id))).version
+        await self.analytics_repo.record_completion(
+            session.runbook_id,
+            version,
+            session.execution_path or [session.current_node_id],
+            final_status,
+            _elapsed_seconds(session.updated_at),
+        )
+        speculative_preparer.on_finish(session_id)
+        return updated
+
+    async def run_command(
+        self, session_id: str, node_id: str, command_index: int, user: User
+    ) -> Job:
+        """
+        Queue a command of the session's current action node to run in its
+        execution environment.
+
+        The command runs once, in the job worker pool; its output is stored
+        as it is produced and can be followed through the session's outputs.
+
+        :param session_id: The session ID.
+        :param node_id: The current node, which must be an action.
+        :param command_index: The command's position in the node.
+        :param user: The responder running the command.
+        :return: The queued job.
+        :raises HTTPException: 409 if the session is not active, 400 if the
+            node is not its current action or has no such command.
+        """
+        session = await self._get_session(session_id)
+        if session.status != SessionStatus.ACTIVE:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Session is {session.status.value}",
+            )
+        runbook = await self._get_runbook(str(session.runbook_id))
+        node = runbook.decision_tree.nodes.get(node_id)
+        if (
+            node_id != session.current_node_id
+            or not isinstance(node, ActionNode)
+            or command_index >= len(node.commands)
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Node {node_id} has no command {command_index} to run now",
+            )
+        # Commands may have side effects, so a failed run is never retried.
+        return await self.job_repo.create(
+            Job(
+                kind="run_command",
+                payload={
+                    "session_id": session_id,
+                    "node_id": node_id,
+                    "command_index": command_index,
+                },
+                max_attempts=1,
+                created_by=user.id,
+            )
+        )
@@ -0,0 +1,102 @@
+"""
+Store tree statistics on runbooks written before they existed.
+
+Run with ``python -m backend.migrations.backfill_tree_stats``. Only runbooks
+whose statistics are missing or were computed by an older version of
+:func:`backend.services.tree_stats.tree_stats` are updated, so the migration
+can be re-run safely and resumes where an interrupted run stopped.
+"""
+import argparse
+import asyncio
+import logging
+
+from bson import ObjectId
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from backend.config import settings
+from backend.models.runbook import DecisionTree
+from backend.repositories.runbook import RunbookRepository
+from backend.services.cache import INVALIDATION_COLLECTION, runbook_cache
+from backend.services.tree_stats import TREE_STATS_VERSION, tree_stats
+
+logger = logging.getLogger(__name__)
+
+
+async def backfill_tree_stats(db: AsyncIOMotorDatabase, batch_size: int = 500) -> int:
+    """
+    Compute and store the statistics of every runbook that lacks them.
+
+    Statistics are set without bumping the runbook version; cached copies
+    are invalidated through the cache invalidation bus instead. Runbooks
+    updated while the migration runs are skipped rather than given stats of
+    their old tree; a tree update stores fresh stats itself, and a re-run
+    picks up any that still lack them.
+
+    :param db: The database instance.
+    :param batch_size: The number of runbooks updated per bulk write.
+    :return: The number of runbooks updated.
+    """
+    repo = RunbookRepository(db)
+    await repo.ensure_indexes()
+    # Only publish if the app created the capped bus collection; inserting
+    # into a missing one would create it uncapped.
+    publish = INVALIDATION_COLLECTION in await db.list_collection_names()
+    cursor = repo.collection.find(
+        {"stats.version": {"$ne": TREE_STATS_VERSION}},
+        {"decision_tree": 1, "version": 1},
+    )
+    updated = 0
+    pending: dict[ObjectId, tuple[int | None, dict]] = {}
+
+    async def flush() -> None:
+        nonlocal updated
+        result = await repo.collection.bulk_write(
+            [
+                # Stats of a tree that was replaced since it was read would
+                # overwrite those of the new tree.
+                UpdateOne({"_id": id, "version": version}, {"$set": {"stats": stats}})
+                for id, (version, stats) in pending.items()
+            ],
+            ordered=False,
+        )
+        if publish:
+            await db[INVALIDATION_COLLECTION].insert_many(
+                [{"cache": runbook_cache.name, "key": str(id)} for id in pending]
+            )
+        updated += result.modified_count
+        logger.info("Backfilled tree statistics of %d runbooks", updated)
+        pending.clear()
+
+    async for doc in cursor:
+        tree = DecisionTree.model_validate(doc["decision_tree"])
+        pending[doc["_id"]] = (doc.get("version"), tree_stats(tree).model_dump())
+        if len(pending) >= batch_size:
+            await flush()
+    if pending:
+        await flush()
+    return updated
+
+
+async def _run(batch_size: int) -> None:
+    client = AsyncIOMotorClient(settings.mongodb_uri)
+    try:
+        updated = await backfill_tree_stats(client[settings.db_name], batch_size)
+    finally:
+        client.close()
+    logger.info("Updated %d runbooks", updated)
+
+
+def main() -> None:
+    """Run the migration against the configured database."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_run(args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
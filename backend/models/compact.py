@@ -0,0 +1,384 @@
+"""Compact immutable runbooks for in-process caches."""
+import sys
+from array import array
+from datetime import datetime
+from typing import Any
+
+from bson import ObjectId
+from pydantic import BaseModel
+
+from .enums import SeverityLevel
+from .execution_environment import ExecutionEnvironment
+from .runbook import (
+    ActionNode,
+    Command,
+    DecisionNode,
+    DecisionOption,
+    DecisionTree,
+    Runbook,
+    TreeStats,
+)
+
+# Strings up to this length are interned: node IDs, option labels, tags and
+# commands repeat within and across runbooks, long descriptions rarely do.
+INTERN_MAX_LENGTH = 128
+
+DECISION = 0
+ACTION = 1
+
+_setattr = object.__setattr__
+_exit_codes: dict[tuple[int, ...], tuple[int, ...]] = {}
+
+
+def _instantiate(
+    model: type[BaseModel], values: dict[str, Any], fields_set=None
+) -> Any:
+    """
+    Build a model from the final value of every field, without any checks.
+
+    Compact runbooks only hold values taken from validated models, so they
+    are rebuilt without validating them again.
+
+    :param model: The model class.
+    :param values: Every field by name, with values of the annotated types.
+    :param fields_set: The fields counted as explicitly set; all by default.
+    :return: The model instance.
+    """
+    instance = model.__new__(model)
+    _setattr(instance, "__dict__", values)
+    _setattr(
+        instance,
+        "__pydantic_fields_set__",
+        set(values) if fields_set is None else fields_set,
+    )
+    _setattr(instance, "__pydantic_extra__", None)
+    _setattr(instance, "__pydantic_private__", None)
+    return instance
+
+
+def _intern(text: str) -> str:
+    return sys.intern(text) if len(text) <= INTERN_MAX_LENGTH else text
+
+
+def _intern_codes(codes: list[int]) -> tuple[int, ...]:
+    key = tuple(codes)
+    if len(key) > 4:
+        return key
+    return _exit_codes.setdefault(key, key)
+
+
+class _Frozen:
+    __slots__ = ()
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+
+class CompactTree(_Frozen):
+    """
+    A decision tree stored as parallel arrays instead of nested models.
+
+    Nodes are numbered in their original order. ``names`` holds the node
+    IDs, followed by any edge targets that are not nodes. Edges and commands
+    are stored in CSR form: node ``i`` owns the entries from
+    ``edge_offsets[i]`` to ``edge_offsets[i + 1]``, and likewise for commands.
+    An action's edge has no label.
+    """
+
+    __slots__ = (
+        "root",
+        "names",
+        "ids",
+        "kinds",
+        "texts",
+        "descriptions",
+        "edge_offsets",
+        "edge_targets",
+        "edge_labels",
+        "command_offsets",
+        "commands",
+        "command_descriptions",
+        "timeouts",
+        "exit_codes",
+    )
+
+    def __init__(self, tree: DecisionTree):
+        """
+        Initializes the compact tree.
+
+        :param tree: The decision tree.
+        """
+        nodes = tree.nodes
+        names = [_intern(node_id) for node_id in nodes]
+        index = {node_id: i for i, node_id in enumerate(names)}
+
+        def name(node_id: str) -> int:
+            if node_id not in index:
+                index[node_id] = len(names)
+                names.append(_intern(node_id))
+            return index[node_id]
+
+        kinds = bytearray()
+        texts, descriptions, ids = [], [], []
+        edge_offsets, edge_targets, edge_labels = array("I", [0]), array("I"), []
+        command_offsets, timeouts = array("I", [0]), array("q")
+        commands, command_descriptions, exit_codes = [], [], []
+        for node in nodes.values():
+            ids.append(node.id)
+            descriptions.append(node.description)
+            if node.type == "decision":
+                kinds.append(DECISION)
+                texts.append(node.question)
+                for option in node.options:
+                    edge_targets.append(name(option.next_node_id))
+                    edge_labels.append(_intern(option.description))
+            else:
+                kinds.append(ACTION)
+                texts.append(node.title)
+                if node.next_node_id is not None:
+                    edge_targets.append(name(node.next_node_id))
+                    edge_labels.append(None)
+                for command in node.commands:
+                    commands.append(_intern(command.command))
+                    command_descriptions.append(_intern(command.description))
+                    timeouts.append(command.timeout_seconds)
+                    exit_codes.append(_intern_codes(command.expected_exit_codes))
+            edge_offsets.append(len(edge_targets))
+            command_offsets.append(len(commands))
+
+        _setattr(self, "root", name(tree.root_node_id))
+        _setattr(self, "names", tuple(names))
+        # Node IDs are only kept separately if some differ from their keys.
+        _setattr(
+            self,
+            "ids",
+            None if ids == names[: len(ids)] else tuple(map(_intern, ids)),
+        )
+        _setattr(self, "kinds", bytes(kinds))
+        _setattr(self, "texts", tuple(texts))
+        _setattr(self, "descriptions", tuple(descriptions))
+        _setattr(self, "edge_offsets", edge_offsets)
+        _setattr(self, "edge_targets", edge_targets)
+        _setattr(self, "edge_labels", tuple(edge_labels))
+        _setattr(self, "command_offsets", command_offsets)
+        _setattr(self, "commands", tuple(commands))
+        _setattr(self, "command_descriptions", tuple(command_descriptions))
+        _setattr(self, "timeouts", timeouts)
+        _setattr(self, "exit_codes", tuple(exit_codes))
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Rebuild the tree as stored, with ``root_node_id`` and ``nodes``."""
+        names, ids = self.names, self.ids or self.names
+        edge_offsets, edge_targets, edge_labels = (
+            self.edge_offsets,
+            self.edge_targets,
+            self.edge_labels,
+        )
+        command_offsets = self.command_offsets
+        nodes = {}
+        for i, kind in enumerate(self.kinds):
+            first, last = edge_offsets[i], edge_offsets[i + 1]
+            if kind == DECISION:
+                nodes[names[i]] = {
+                    "id": ids[i],
+                    "type": "decision",
+                    "question": self.texts[i],
+                    "description": self.descriptions[i],
+                    "options": [
+                        {
+                            "description": edge_labels[e],
+                            "next_node_id": names[edge_targets[e]],
+                        }
+                        for e in range(first, last)
+                    ],
+                }
+            else:
+                nodes[names[i]] = {
+                    "id": ids[i],
+                    "type": "action",
+                    "title": self.texts[i],
+                    "description": self.descriptions[i],
+                    "commands": [
+                        {
+                            "command": self.commands[c],
+                            "description": self.command_descriptions[c],
+                            "timeout_seconds": self.timeouts[c],
+                            "expected_exit_codes": list(self.exit_codes[c]),
+                        }
+                        for c in range(command_offsets[i], command_offsets[i + 1])
+                    ],
+                    "next_node_id": names[edge_targets[first]]
+                    if last > first
+                    else None,
+                }
+        return {"root_node_id": names[self.root], "nodes": nodes}
+
+    def to_model(self) -> DecisionTree:
+        """Rebuild the tree model, without validating it again."""
+        names, ids = self.names, self.ids or self.names
+        edge_offsets, edge_targets, edge_labels = (
+            self.edge_offsets,
+            self.edge_targets,
+            self.edge_labels,
+        )
+        command_offsets = self.command_offsets
+        nodes = {}
+        for i, kind in enumerate(self.kinds):
+            first, last = edge_offsets[i], edge_offsets[i + 1]
+            if kind == DECISION:
+                nodes[names[i]] = _instantiate(
+                    DecisionNode,
+                    {
+                        "id": ids[i],
+                        "type": "decision",
+                        "question": self.texts[i],
+                        "description": self.descriptions[i],
+                        "options": [
+                            _instantiate(
+                                DecisionOption,
+                                {
+                                    "description": edge_labels[e],
+                                    "next_node_id": names[edge_targets[e]],
+                                },
+                            )
+                            for e in range(first, last)
+                        ],
+                    },
+                )
+            else:
+                nodes[names[i]] = _instantiate(
+                    ActionNode,
+                    {
+                        "id": ids[i],
+                        "type": "action",
+                        "title": self.texts[i],
+                        "description": self.descriptions[i],
+                        "commands": [
+                            _instantiate(
+                                Command,
+                                {
+                                    "command": self.commands[c],
+                                    "description": self.command_descriptions[c],
+                                    "timeout_seconds": self.timeouts[c],
+                                    "expected_exit_codes": list(self.exit_codes[c]),
+                                },
+                            )
+                            for c in range(command_offsets[i], command_offsets[i + 1])
+                        ],
+                        "next_node_id": (
+                            names[edge_targets[first]] if last > first else None
+                        ),
+                    },
+                )
+        return _instantiate(
+            DecisionTree, {"root_node_id": names[self.root], "nodes": nodes}
+        )
+
+
+class CompactRunbook(_Frozen):
+    """
+    A runbook as cached in process: slotted, immutable and with its tree in
+    a :class:`CompactTree`.
+
+    The execution environment and statistics are small and kept as the
+    models they came from, shared with every model built from this runbook.
+    """
+
+    __slots__ = (
+        "id",
+        "title",
+        "description",
+        "owner_id",
+        "severity",
+        "environment",
+        "tree",
+        "version",
+        "tags",
+        "stats",
+        "created_at",
+        "updated_at",
+    )
+
+    id: ObjectId | None
+    title: str
+    description: str
+    owner_id: ObjectId
+    severity: SeverityLevel
+    environment: ExecutionEnvironment
+    tree: CompactTree
+    version: int
+    tags: tuple[str, ...]
+    stats: TreeStats | None
+    created_at: datetime
+    updated_at: datetime
+
+    def __init__(self, runbook: Runbook):
+        """
+        Initializes the compact runbook.
+
+        :param runbook: The runbook model.
+        """
+        _setattr(self, "id", runbook.id)
+        _setattr(self, "title", runbook.title)
+        _setattr(self, "description", runbook.description)
+        _setattr(self, "owner_id", runbook.owner_id)
+        _setattr(self, "severity", runbook.severity)
+        _setattr(self, "environment", runbook.execution_environment)
+        _setattr(self, "tree", CompactTree(runbook.decision_tree))
+        _setattr(self, "version", runbook.version)
+        _setattr(self, "tags", tuple(map(_intern, runbook.tags)))
+        _setattr(self, "stats", runbook.stats)
+        _setattr(self, "created_at", runbook.created_at)
+        _setattr(self, "updated_at", runbook.updated_at)
+
+    def to_document(self) -> dict[str, Any]:
+        """
+        Rebuild the runbook as stored in MongoDB.
+
+        :return: A new document, ready for
+            :func:`backend.services.bson_json.document_to_json`.
+        """
+        return {
+            "_id": self.id,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "title": self.title,
+            "description": self.description,
+            "owner_id": self.owner_id,
+            "severity": self.severity.value,
+            "execution_environment": self.environment.model_dump(),
+            "decision_tree": self.tree.to_dict(),
+            "version": self.version,
+            "tags": list(self.tags),
+            "stats": self.stats.model_dump() if self.stats is not None else None,
+        }
+
+    def to_model(self) -> Runbook:
+        """
+        Rebuild the runbook model, without validating it again.
+
+        :return: A new model.
+        """
+        return _instantiate(
+            Runbook,
+            {
+                "id": self.id,
+                "created_at": self.created_at,
+                "updated_at": self.updated_at,
+                "title": self.title,
+                "description": self.description,
+                "owner_id": self.owner_id,
+                "severity": self.severity,
+                "execution_environment": self.environment,
+                "decision_tree": self.tree.to_model(),
+                "version": self.version,
+                "tags": list(self.tags),
+                "stats": self.stats,
+            },
+        )
@@ -0,0 +1,40 @@
+"""Background job models."""
+from datetime import UTC, datetime
+from typing import Any
+
+from pydantic import BaseModel, Field
+
+from .base import BaseDBModel, PyObjectId
+from .enums import JobStatus
+
+
+class Job(BaseDBModel):
+    """A unit of background work persisted until a worker runs it."""
+
+    kind: str
+    payload: dict[str, Any] = Field(default_factory=dict)
+    status: JobStatus = JobStatus.QUEUED
+    attempts: int = 0
+    max_attempts: int = 3
+    run_after: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    progress: float = 0.0
+    progress_message: str | None = None
+    result: dict[str, Any] | None = None
+    error: str | None = None
+    cancel_requested: bool = False
+    worker_id: str | None = None
+    lease_expires_at: datetime | None = None
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    created_by: PyObjectId | None = None
+    # Set on periodic jobs to the kind and period they run for; unique, so
+    # each period is queued once however many workers schedule it.
+    schedule_key: str | None = None
+
+
+class JobCreate(BaseModel):
+    """Request to enqueue a job."""
+
+    kind: str
+    payload: dict[str, Any] = Field(default_factory=dict)
+    max_attempts: int = Field(3, ge=1, le=20)
@@ -52,6 +52,16 @@ class DecisionTree(BaseModel):
     nodes: dict[str, DecisionNode | ActionNode]
 
 
+class TreeStats(BaseModel):
+    """Complexity statistics of a decision tree, stored with the runbook."""
+
+    version: int
+    node_count: int
+    max_depth: int
+    command_count: int
+    worst_case_runtime_seconds: int
+
+
 class Runbook(BaseDBModel):
     """The main runbook model."""
 
@@ -63,6 +73,7 @@ class Runbook(BaseDBModel):
     decision_tree: DecisionTree
     version: int
     tags: list[str] = Field(default_factory=list)
+    stats: TreeStats | None = None
 
 
 class RunbookCreate(BaseModel):
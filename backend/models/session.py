@@ -1,6 +1,6 @@
 """Session and timeline models."""
 from datetime import UTC, datetime
-from typing import Any
+from typing import Any, Literal
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -22,6 +22,7 @@ class Session(BaseDBModel):
     """An execution session for a runbook."""
 
     runbook_id: PyObjectId
+    runbook_version: int | None = None
     user_id: PyObjectId
     status: SessionStatus
     current_node_id: str
@@ -51,3 +52,43 @@ class SessionUpdate(BaseModel):
     execution_path: list[str] | None = None
     container_id: str | None = None
     completed_at: datetime | None = None
+
+
+class SessionStart(BaseModel):
+    """Request to start a session on a runbook."""
+
+    runbook_id: str
+
+
+class SessionAdvance(BaseModel):
+    """Request to move a session to the next node."""
+
+    next_node_id: str
+
+
+class SessionComplete(BaseModel):
+    """Request to finish a session."""
+
+    status: SessionStatus
+
+
+class CommandRun(BaseModel):
+    """Request to run a command of the session's current action node."""
+
+    node_id: str
+    command_index: int = Field(ge=0)
+
+
+class CommandOutput(BaseDBModel):
+    """Metadata of one output stream of a command run during a session."""
+
+    session_id: PyObjectId
+    node_id: str
+    command_index: int
+    stream: Literal["stdout", "stderr"]
+    chunk_size: int
+    length: int = 0
+    line_count: int = 0
+    complete: bool = False
+    exit_code: int | None = None
+    finished_at: datetime | None = None
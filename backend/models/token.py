@@ -0,0 +1,16 @@
+"""Refresh token model."""
+from datetime import datetime
+
+from .base import BaseDBModel, PyObjectId
+
+
+class RefreshToken(BaseDBModel):
+    """A persisted refresh token belonging to a rotation family."""
+
+    jti: str
+    family_id: str
+    user_id: PyObjectId
+    expires_at: datetime
+    rotated_at: datetime | None = None
+    replaced_by: str | None = None
+    revoked_at: datetime | None = None
@@ -18,6 +18,19 @@ class User(BaseDBModel):
     is_active: bool = True
 
 
+class UserPublic(BaseModel):
+    """The user fields safe to embed in other resources."""
+
+    id: str
+    username: str
+    role: UserRole
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserPublic":
+        """Build the public view of a user."""
+        return cls(id=str(user.id), username=user.username, role=user.role)
+
+
 class UserCreate(BaseModel):
     """User creation model."""
 
@@ -34,3 +47,10 @@ class UserUpdate(BaseModel):
     email: str | None = None
     role: UserRole | None = None
     is_active: bool | None = None
+
+
+class UserLogin(BaseModel):
+    """User login credentials."""
+
+    email: str
+    password: str
@@ -1,18 +1,48 @@
 """Base repository with generic CRUD operations."""
-from typing import Generic, TypeVar
+from datetime import UTC, datetime
+from typing import Any, Generic, TypeVar
 
+import bson
 from bson import ObjectId
+from bson.raw_bson import RawBSONDocument
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from pydantic import BaseModel
+from pymongo import ReturnDocument
 
+from backend.config import settings
 from backend.models.base import BaseDBModel
+from backend.services.bson_json import RAW_CODEC_OPTIONS
+from backend.services.cache import DELETED, LRUCache, invalidation_bus
+from backend.services.single_flight import SingleFlight
+
+# Concurrent reads of the same document share one query and model build.
+repository_reads = SingleFlight("repository_reads")
 
 ModelType = TypeVar("ModelType", bound=BaseDBModel)
 
 
+class VersionConflictError(Exception):
+    """Raised when a compare-and-set update finds a newer stored version."""
+
+    def __init__(self, id: str, current_version: int | None):
+        """
+        Initializes the exception.
+
+        :param id: The document ID.
+        :param current_version: The version currently stored.
+        """
+        super().__init__(f"Document {id} is at version {current_version}")
+        self.id = str(id)
+        self.current_version = current_version
+
+
 class BaseRepository(Generic[ModelType]):
     """Base class for data repositories."""
 
+    # Subclasses may set a read-through cache for ``get``; it is invalidated on
+    # every write, in this worker and in every other one.
+    cache: LRUCache | None = None
+
     def __init__(self, model: type[ModelType], db: AsyncIOMotorDatabase):
         """
         Initializes the repository.
@@ -23,6 +53,7 @@ class BaseRepository(Generic[ModelType]):
         self.model = model
         self.db = db
         self.collection = self.db[model.__name__.lower() + "s"]
+        self.versioned = "version" in model.model_fields
 
     async def get(self, id: str) -> ModelType | None:
         """
@@ -31,10 +62,169 @@ class BaseRepository(Generic[ModelType]):
         :param id: The document ID.
         :return: The document, or None if not found.
         """
+        cached = self.get_cached(id)
+        if cached is not None:
+            return cached
+        if not settings.single_flight_reads:
+            return await self._load(id)
+        return await repository_reads.do(
+            (self.collection.name, str(id)), lambda: self._load(id)
+        )
+
+    def get_cached(self, id: str) -> ModelType | None:
+        """
+        Get a document only if the read-through cache holds it.
+
+        :param id: The document ID.
+        :return: The document, or None if it is not cached.
+        """
+        if self.cache is None:
+            return None
+        cached = self.cache.get(str(id))
+        if cached is None:
+            return None
+        if isinstance(cached, RawBSONDocument):
+            # Cached by :meth:`cache_raw`; the model is built on first use.
+            return self.cache_document(bson.decode(cached.raw), len(cached.raw))
+        return self._from_cache(cached)
+
+    def _to_cache(self, model: ModelType) -> Any:
+        """
+        Convert a model into the value held by the cache.
+
+        Subclasses may override this, with :meth:`_from_cache`, to cache a
+        more compact representation.
+
+        :param model: The model.
+        :return: The cached value.
+        """
+        return model
+
+    def _from_cache(self, value: Any) -> ModelType:
+        """
+        Convert a value held by the cache back into a model.
+
+        :param value: The cached value.
+        :return: The model.
+        """
+        return value
+
+    def cache_document(self, doc: dict, size: int | None = None) -> ModelType:
+        """
+        Build the model of a stored document and put it in the read-through
+        cache, for reads that went around :meth:`get`.
+
+        :param doc: The stored document.
+        :param size: Its encoded size, if already known.
+        :return: The model.
+        """
+        model = self.model(**doc)
+        if self.cache is not None:
+            self.cache.put(
+                str(doc["_id"]),
+                self._to_cache(model),
+                doc.get("version"),
+                size if size is not None else len(bson.encode(doc)),
+            )
+        return model
+
+    def cache_raw(self, raw: RawBSONDocument) -> None:
+        """
+        Put a raw document in the read-through cache, for raw reads that went
+        around :meth:`get`.
+
+        No model is built here, so the raw read does not pay for validation;
+        the first cache hit builds it and caches it in its place.
+
+        :param raw: The stored document.
+        """
+        if self.cache is not None:
+            self.cache.put(str(raw["_id"]), raw, raw.get("version"), len(raw.raw))
+
+    async def _load(self, id: str) -> ModelType | None:
         doc = await self.collection.find_one({"_id": ObjectId(id)})
-        if doc:
-            return self.model(**doc)
-        return None
+        return self.cache_document(doc) if doc else None
+
+    async def get_raw(self, id: str) -> RawBSONDocument | None:
+        """
+        Get a document as undecoded BSON, skipping model validation.
+
+        Meant for trusted pass-through reads that return the stored document
+        as is; see :mod:`backend.services.bson_json`.
+
+        :param id: The document ID.
+        :return: The raw document, or None if not found.
+        """
+        raw_collection = self.collection.with_options(codec_options=RAW_CODEC_OPTIONS)
+        if not settings.single_flight_reads:
+            return await raw_collection.find_one({"_id": ObjectId(id)})
+        return await repository_reads.do(
+            (self.collection.name, str(id), "raw"),
+            lambda: raw_collection.find_one({"_id": ObjectId(id)}),
+        )
+
+    async def get_many(self, ids: list[str]) -> dict[str, ModelType]:
+        """
+        Get several documents by ID with a single ``$in`` query.
+
+        Documents held by the read-through cache are not fetched again.
+
+        :param ids: The document IDs.
+        :return: The found documents, keyed by their string ID.
+        """
+        found: dict[str, ModelType] = {}
+        missing = []
+        for id in dict.fromkeys(str(id) for id in ids):
+            cached = self.get_cached(id)
+            if cached is not None:
+                found[id] = cached
+            elif ObjectId.is_valid(id):
+                missing.append(ObjectId(id))
+        if missing:
+            cursor = self.collection.find({"_id": {"$in": missing}})
+            async for doc in cursor:
+                found[str(doc["_id"])] = self.cache_document(doc)
+        return found
+
+    async def find_many(
+        self,
+        query: dict | None = None,
+        skip: int = 0,
+        limit: int = 50,
+        sort: list[tuple[str, int]] | None = None,
+    ) -> list[ModelType]:
+        """
+        List documents matching a query.
+
+        :param query: The MongoDB filter.
+        :param skip: The number of documents to skip.
+        :param limit: The maximum number of documents to return.
+        :param sort: The sort specification.
+        :return: The matching documents.
+        """
+        cursor = self.collection.find(query or {}).skip(skip).limit(limit)
+        if sort:
+            cursor = cursor.sort(sort)
+        return [self.model(**doc) for doc in await cursor.to_list(length=limit)]
+
+    def _update_fields(self, data: BaseModel) -> dict:
+        """
+        Build the fields an update sets.
+
+        Subclasses may override this to store fields derived from the update.
+
+        :param data: The update data.
+        :return: The fields to ``$set``.
+        """
+        return data.model_dump(exclude_unset=True)
+
+    async def _invalidate(self, id: str, version: float | None = None) -> None:
+        # Reads that started before this write must not be shared with
+        # callers that arrive after it.
+        repository_reads.forget((self.collection.name, str(id)))
+        repository_reads.forget((self.collection.name, str(id), "raw"))
+        if self.cache is not None:
+            await invalidation_bus.publish(self.cache.name, str(id), version)
 
     async def create(self, data: ModelType) -> ModelType:
         """
@@ -50,20 +240,98 @@ class BaseRepository(Generic[ModelType]):
         created_doc = await self.collection.find_one({"_id": result.inserted_id})
         return self.model(**created_doc)
 
-    async def update(self, id: str, data: BaseModel) -> ModelType | None:
+    async def update(
+        self,
+        id: str,
+        data: BaseModel,
+        expected_version: int | None = None,
+        conditions: dict | None = None,
+    ) -> ModelType | None:
         """
         Update a document.
 
+        Models with a ``version`` field get it incremented atomically with the
+        update. If ``expected_version`` is given, the update only applies when
+        the stored version still matches it (compare-and-set).
+
         :param id: The document ID.
         :param data: The update data.
-        :return: The updated document, or None if not found.
+        :param expected_version: The version the caller last read.
+        :param conditions: Further filters the stored document must still
+            match, for compare-and-set on fields other than the version.
+        :return: The updated document, or None if not found or if it no longer
+            matches ``conditions``.
+        :raises VersionConflictError: If the stored version no longer matches.
         """
-        doc_dict = data.model_dump(exclude_unset=True)
-        await self.collection.update_one({"_id": ObjectId(id)}, {"$set": doc_dict})
-        updated_doc = await self.collection.find_one({"_id": ObjectId(id)})
-        if updated_doc:
-            return self.model(**updated_doc)
-        return None
+        updated_doc = await self._apply_update(
+            self.collection,
+            id,
+            self._update_fields(data),
+            expected_version,
+            conditions,
+        )
+        return self.model(**updated_doc) if updated_doc is not None else None
+
+    async def create_raw(self, raw: RawBSONDocument) -> None:
+        """
+        Insert a document that was validated and encoded elsewhere.
+
+        The counterpart of :meth:`get_raw` for writes: no model is built.
+
+        :param raw: The complete document, including its ``_id``.
+        """
+        await self.collection.insert_one(raw)
+
+    async def update_raw(
+        self, id: str, fields: dict, expected_version: int | None = None
+    ) -> RawBSONDocument | None:
+        """
+        Apply already validated update fields, returning the raw document.
+
+        Behaves like :meth:`update`, but builds no model from the result.
+
+        :param id: The document ID.
+        :param fields: The fields to set.
+        :param expected_version: The version the caller last read.
+        :return: The updated raw document, or None if not found.
+        :raises VersionConflictError: If the stored version no longer matches.
+        """
+        raw_collection = self.collection.with_options(codec_options=RAW_CODEC_OPTIONS)
+        return await self._apply_update(raw_collection, id, fields, expected_version)
+
+    async def _apply_update(
+        self,
+        collection,
+        id: str,
+        fields: dict,
+        expected_version: int | None,
+        conditions: dict | None = None,
+    ):
+        fields = dict(fields)
+        fields.pop("version", None)
+        fields["updated_at"] = datetime.now(UTC)
+        query: dict = {**(conditions or {}), "_id": ObjectId(id)}
+        update: dict = {"$set": fields}
+        if self.versioned:
+            update["$inc"] = {"version": 1}
+            if expected_version is not None:
+                query["version"] = expected_version
+        updated_doc = await collection.find_one_and_update(
+            query, update, return_document=ReturnDocument.AFTER
+        )
+        if updated_doc is None:
+            current = await self.collection.find_one(
+                {"_id": ObjectId(id)}, {"version": 1}
+            )
+            if current is None:
+                await self._invalidate(id, DELETED)
+                return None
+            if expected_version is not None and self.versioned:
+                raise VersionConflictError(id, current.get("version"))
+            await self._invalidate(id, current.get("version"))
+            return None
+        await self._invalidate(id, updated_doc.get("version"))
+        return updated_doc
 
     async def delete(self, id: str) -> bool:
         """
@@ -73,4 +341,5 @@ class BaseRepository(Generic[ModelType]):
         :return: True if deleted, False otherwise.
         """
         result = await self.collection.delete_one({"_id": ObjectId(id)})
+        await self._invalidate(id, DELETED)
         return result.deleted_count > 0
@@ -0,0 +1,165 @@
+"""Command output repository."""
+import zlib
+from datetime import UTC, datetime
+
+from bson import Binary, ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING
+
+from backend.models.session import CommandOutput
+from backend.repositories.base import BaseRepository
+
+
+class CommandOutputRepository(BaseRepository[CommandOutput]):
+    """
+    Repository for command output streams, stored as compressed chunks.
+
+    Output is split into fixed-size chunks of uncompressed bytes, each
+    compressed on its own, so any byte range maps to a known set of chunks
+    and only those are read and decompressed. Every chunk also records how
+    many lines it contains, letting tail reads walk back from the end.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        super().__init__(CommandOutput, db)
+        self.chunks = db["commandoutput_chunks"]
+
+    async def ensure_indexes(self) -> None:
+        """Create the indexes used to list outputs and fetch chunks."""
+        await self.collection.create_index(
+            [("session_id", ASCENDING), ("node_id", ASCENDING)]
+        )
+        await self.chunks.create_index(
+            [("output_id", ASCENDING), ("n", ASCENDING)], unique=True
+        )
+
+    async def list_for_session(self, session_id: str) -> list[CommandOutput]:
+        """
+        List the output streams of a session, oldest first.
+
+        :param session_id: The session ID.
+        :return: The output metadata.
+        """
+        cursor = self.collection.find({"session_id": ObjectId(session_id)}).sort(
+            "created_at", ASCENDING
+        )
+        return [self.model(**doc) for doc in await cursor.to_list(length=None)]
+
+    async def put_chunk(
+        self, output_id: ObjectId, n: int, data: bytes, level: int
+    ) -> None:
+        """
+        Write or overwrite a chunk.
+
+        The last chunk of a running command is rewritten as it fills up.
+
+        :param output_id: The output stream ID.
+        :param n: The chunk number.
+        :param data: The uncompressed chunk contents.
+        :param level: The zlib compression level.
+        """
+        await self.chunks.update_one(
+            {"output_id": output_id, "n": n},
+            {
+                "$set": {
+                    "length": len(data),
+                    "lines": data.count(b"\n"),
+                    "data": Binary(zlib.compress(data, level)),
+                }
+            },
+            upsert=True,
+        )
+
+    async def set_progress(
+        self,
+        output_id: ObjectId,
+        length: int,
+        line_count: int,
+        exit_code: int | None = None,
+        complete: bool = False,
+    ) -> None:
+        """
+        Record how much output has been written.
+
+        :param output_id: The output stream ID.
+        :param length: The total uncompressed length written so far.
+        :param line_count: The total number of lines written so far.
+        :param exit_code: The command's exit code, once it finished.
+        :param complete: Whether the stream is finished.
+        """
+        fields: dict = {
+            "length": length,
+            "line_count": line_count,
+            "updated_at": datetime.now(UTC),
+        }
+        if complete:
+            fields.update(
+                complete=True, exit_code=exit_code, finished_at=fields["updated_at"]
+            )
+        await self.collection.update_one({"_id": output_id}, {"$set": fields})
+
+    async def read_range(self, output: CommandOutput, start: int, end: int) -> bytes:
+        """
+        Read a byte range of a stream.
+
+        :param output: The output metadata.
+        :param start: The first byte offset.
+        :param end: The offset past the last byte; clamped to the stream length.
+        :return: The bytes in ``[start, end)``.
+        """
+        end = min(end, output.length)
+        if start >= end:
+            return b""
+        size = output.chunk_size
+        first, last = start // size, (end - 1) // size
+        cursor = self.chunks.find(
+            {"output_id": output.id, "n": {"$gte": first, "$lte": last}},
+            {"n": 1, "data": 1},
+        ).sort("n", ASCENDING)
+        parts = []
+        async for chunk in cursor:
+            parts.append(zlib.decompress(chunk["data"]))
+        data = b"".join(parts)
+        offset = first * size
+        return data[start - offset : end - offset]
+
+    async def tail(self, output: CommandOutput, lines: int) -> tuple[bytes, int]:
+        """
+        Read the last lines of a stream.
+
+        Chunks are read backwards from the end, and only until their line
+        counts show that enough lines were found.
+
+        :param output: The output metadata.
+        :param lines: The number of lines.
+        :return: The bytes of the last ``lines`` lines, and their start offset.
+        """
+        if lines <= 0 or output.length == 0:
+            return b"", output.length
+        cursor = self.chunks.find(
+            {"output_id": output.id}, {"n": 1, "lines": 1, "data": 1}
+        ).sort("n", DESCENDING)
+        parts: list[bytes] = []
+        newlines = 0
+        trailing = 0
+        first = 0
+        async for chunk in cursor:
+            data = zlib.decompress(chunk["data"])
+            if not parts:
+                # A trailing newline ends the last line rather than starting one.
+                trailing = int(data.endswith(b"\n"))
+            parts.append(data)
+            first = chunk["n"]
+            newlines += chunk["lines"]
+            if newlines - trailing >= lines:
+                break
+        data = b"".join(reversed(parts))
+        offset = first * output.chunk_size
+        body = data[:-1] if data.endswith(b"\n") else data
+        cut = len(body)
+        for _ in range(lines):
+            cut = body.rfind(b"\n", 0, cut)
+            if cut < 0:
+                break
+        start = cut + 1
+        return data[start:], offset + start
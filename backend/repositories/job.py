@@ -0,0 +1,244 @@
+"""Background job repository."""
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from backend.models.enums import JobStatus
+from backend.models.job import Job
+from backend.repositories.base import BaseRepository
+
+
+class JobRepository(BaseRepository[Job]):
+    """
+    Repository for Job documents, doubling as the job queue.
+
+    Workers claim jobs with a single ``find_one_and_update``, which takes a
+    lease on the job. A worker renews its lease when it reports progress; a job
+    whose lease ran out (its worker died) can be claimed again.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        super().__init__(Job, db)
+
+    async def ensure_indexes(self, retention: timedelta) -> None:
+        """
+        Create the indexes used to claim jobs and expire finished ones.
+
+        :param retention: How long finished jobs are kept.
+        """
+        await self.collection.create_index(
+            [("status", ASCENDING), ("run_after", ASCENDING)]
+        )
+        await self.collection.create_index(
+            [("status", ASCENDING), ("lease_expires_at", ASCENDING)]
+        )
+        await self.collection.create_index(
+            "finished_at", expireAfterSeconds=int(retention.total_seconds())
+        )
+        await self.collection.create_index(
+            "schedule_key",
+            unique=True,
+            partialFilterExpression={"schedule_key": {"$type": "string"}},
+        )
+
+    async def enqueue_periodic(
+        self,
+        kind: str,
+        interval: float,
+        payload: dict[str, Any] | None = None,
+        key: str | None = None,
+    ) -> Job | None:
+        """
+        Queue a job for the current period of a periodic job kind.
+
+        Periods are aligned to multiples of the interval since the epoch, so
+        every worker asking during a period asks for the same job.
+
+        :param kind: The job kind.
+        :param interval: The period length in seconds.
+        :param payload: The job payload.
+        :param key: Distinguishes jobs of the same kind that each run once
+            per period, such as one per image.
+        :return: The queued job, or None if the period already has one.
+        """
+        period = int(datetime.now(UTC).timestamp() // interval)
+        schedule_key = f"{kind}:{key}:{period}" if key else f"{kind}:{period}"
+        try:
+            return await self.create(
+                Job(kind=kind, payload=payload or {}, schedule_key=schedule_key)
+            )
+        except DuplicateKeyError:
+            return None
+
+    async def claim(
+        self, worker_id: str, kinds: list[str], lease: timedelta
+    ) -> Job | None:
+        """
+        Atomically claim the oldest runnable job.
+
+        :param worker_id: The claiming worker.
+        :param kinds: The job kinds the worker can run.
+        :param lease: How long the claim lasts without a heartbeat.
+        :return: The claimed job, or None if there is nothing to run.
+        """
+        now = datetime.now(UTC)
+        doc = await self.collection.find_one_and_update(
+            {
+                "kind": {"$in": kinds},
+                "$or": [
+                    {"status": JobStatus.QUEUED.value, "run_after": {"$lte": now}},
+                    {
+                        "status": JobStatus.RUNNING.value,
+                        "lease_expires_at": {"$lt": now},
+                    },
+                ],
+            },
+            {
+                "$set": {
+                    "status": JobStatus.RUNNING.value,
+                    "worker_id": worker_id,
+                    "lease_expires_at": now + lease,
+                    "started_at": now,
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("run_after", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+        return self.model(**doc) if doc else None
+
+    def _owned(self, id: str, worker_id: str) -> dict:
+        return {
+            "_id": ObjectId(id),
+            "worker_id": worker_id,
+            "status": JobStatus.RUNNING.value,
+        }
+
+    async def heartbeat(
+        self,
+        id: str,
+        worker_id: str,
+        lease: timedelta,
+        progress: float | None = None,
+        message: str | None = None,
+    ) -> Job | None:
+        """
+        Renew a job's lease, optionally reporting progress.
+
+        :param id: The job ID.
+        :param worker_id: The worker running the job.
+        :param lease: The new lease duration.
+        :param progress: The completed fraction, between 0 and 1.
+        :param message: A short description of the current step.
+        :return: The job, or None if the worker no longer owns it.
+        """
+        now = datetime.now(UTC)
+        fields = {"lease_expires_at": now + lease, "updated_at": now}
+        if progress is not None:
+            fields["progress"] = min(1.0, max(0.0, progress))
+        if message is not None:
+            fields["progress_message"] = message
+        doc = await self.collection.find_one_and_update(
+            self._owned(id, worker_id),
+            {"$set": fields},
+            return_document=ReturnDocument.AFTER,
+        )
+        return self.model(**doc) if doc else None
+
+    async def finish(
+        self,
+        id: str,
+        worker_id: str,
+        status: JobStatus,
+        result: dict | None = None,
+        error: str | None = None,
+    ) -> bool:
+        """
+        Record the final outcome of a job.
+
+        :param id: The job ID.
+        :param worker_id: The worker running the job.
+        :param status: ``SUCCEEDED``, ``FAILED`` or ``CANCELLED``.
+        :param result: The handler's result.
+        :param error: The failure reason.
+        :return: False if the worker no longer owned the job.
+        """
+        now = datetime.now(UTC)
+        fields = {
+            "status": status.value,
+            "finished_at": now,
+            "updated_at": now,
+            "lease_expires_at": None,
+            "error": error,
+        }
+        if status == JobStatus.SUCCEEDED:
+            fields.update(progress=1.0, result=result)
+        outcome = await self.collection.update_one(
+            self._owned(id, worker_id), {"$set": fields}
+        )
+        return outcome.modified_count > 0
+
+    async def retry(
+        self, id: str, worker_id: str, error: str, run_after: datetime
+    ) -> bool:
+        """
+        Put a failed job back in the queue.
+
+        :param id: The job ID.
+        :param worker_id: The worker running the job.
+        :param error: The failure reason.
+        :param run_after: The earliest time the job may run again.
+        :return: False if the worker no longer owned the job.
+        """
+        outcome = await self.collection.update_one(
+            self._owned(id, worker_id),
+            {
+                "$set": {
+                    "status": JobStatus.QUEUED.value,
+                    "run_after": run_after,
+                    "error": error,
+                    "worker_id": None,
+                    "lease_expires_at": None,
+                    "updated_at": datetime.now(UTC),
+                }
+            },
+        )
+        return outcome.modified_count > 0
+
+    async def request_cancel(self, id: str) -> Job | None:
+        """
+        Cancel a job.
+
+        Queued jobs are cancelled immediately; running jobs are flagged and
+        stop at their next progress report.
+
+        :param id: The job ID.
+        :return: The job, or None if not found.
+        """
+        now = datetime.now(UTC)
+        doc = await self.collection.find_one_and_update(
+            {"_id": ObjectId(id), "status": JobStatus.QUEUED.value},
+            {
+                "$set": {
+                    "status": JobStatus.CANCELLED.value,
+                    "cancel_requested": True,
+                    "finished_at": now,
+                    "updated_at": now,
+                }
+            },
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc is None:
+            doc = await self.collection.find_one_and_update(
+                {"_id": ObjectId(id), "status": JobStatus.RUNNING.value},
+                {"$set": {"cancel_requested": True, "updated_at": now}},
+                return_document=ReturnDocument.AFTER,
+            )
+        if doc is None:
+            return await self.get(id)
+        return self.model(**doc)
@@ -0,0 +1,279 @@
+"""Incrementally maintained execution-path analytics."""
+import hashlib
+import math
+from datetime import UTC, datetime
+from typing import Any
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import DESCENDING
+
+from backend.models.enums import SessionStatus
+
+# Dwell times are bucketed by powers of two seconds: bucket 0 holds [0, 1),
+# bucket n holds [2**(n-1), 2**n). The last bucket is open-ended.
+DWELL_BUCKETS = 24
+
+
+def _field(key: str) -> str:
+    """Escape a node ID for use as a MongoDB field name."""
+    return key.replace("%", "%25").replace(".", "%2E").replace("$", "%24")
+
+
+def _unfield(key: str) -> str:
+    """Reverse :func:`_field`."""
+    return key.replace("%24", "$").replace("%2E", ".").replace("%25", "%")
+
+
+def _dwell_bucket(seconds: float) -> int:
+    if seconds < 1:
+        return 0
+    return min(DWELL_BUCKETS - 1, int(math.log2(seconds)) + 1)
+
+
+def _bucket_median(buckets: dict[str, int]) -> float | None:
+    """Estimate the median from dwell buckets, using each bucket's midpoint."""
+    counts = sorted((int(bucket), count) for bucket, count in buckets.items())
+    total = sum(count for _, count in counts)
+    if total == 0:
+        return None
+    seen = 0
+    for bucket, count in counts:
+        seen += count
+        if seen * 2 >= total:
+            if bucket == 0:
+                return 0.5
+            return 1.5 * 2 ** (bucket - 1)
+    return None
+
+
+class PathAnalyticsRepository:
+    """
+    Per-runbook-version counters updated as sessions move through a tree.
+
+    Each runbook version has one counters document, updated with ``$inc`` on
+    session start, advance and completion, and finished paths are counted in a
+    second collection indexed by count. Reading the analytics is a single
+    document fetch plus a bounded index scan, however many sessions ran.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        """
+        Initializes the repository.
+
+        :param db: The database instance.
+        """
+        self.db = db
+        self.collection = db["path_analytics"]
+        self.paths = db["path_analytics_paths"]
+
+    async def ensure_indexes(self) -> None:
+        """Create the index used to read the most common paths."""
+        await self.paths.create_index(
+            [("runbook_id", 1), ("version", 1), ("count", DESCENDING)]
+        )
+
+    @staticmethod
+    def _id(runbook_id: Any, version: int) -> str:
+        return f"{runbook_id}:{version}"
+
+    async def _inc(self, runbook_id: Any, version: int, inc: dict[str, int]) -> None:
+        await self.collection.update_one(
+            {"_id": self._id(runbook_id, version)},
+            {
+                "$inc": inc,
+                "$set": {"updated_at": datetime.now(UTC)},
+                "$setOnInsert": {"runbook_id": runbook_id, "version": version},
+            },
+            upsert=True,
+        )
+
+    async def record_start(self, runbook_id: Any, version: int, root: str) -> None:
+        """
+        Record a session starting at the root node.
+
+        :param runbook_id: The runbook ID.
+        :param version: The runbook version.
+        :param root: The root node ID.
+        """
+        await self._inc(
+            runbook_id,
+            version,
+            {"sessions_started": 1, f"visits.{_field(root)}": 1},
+        )
+
+    async def record_advance(
+        self,
+        runbook_id: Any,
+        version: int,
+        from_node: str,
+        to_node: str,
+        option_index: int | None,
+        dwell_seconds: float,
+    ) -> None:
+        """
+        Record a session moving from one node to the next.
+
+        :param runbook_id: The runbook ID.
+        :param version: The runbook version.
+        :param from_node: The node being left.
+        :param to_node: The node being entered.
+        :param option_index: The chosen option, if ``from_node`` is a decision.
+        :param dwell_seconds: The time spent on ``from_node``.
+        """
+        source = _field(from_node)
+        inc = {
+            f"exits.{source}": 1,
+            f"visits.{_field(to_node)}": 1,
+            f"dwell.{source}.{_dwell_bucket(dwell_seconds)}": 1,
+        }
+        if option_index is not None:
+            inc[f"option_choices.{source}.{option_index}"] = 1
+        await self._inc(runbook_id, version, inc)
+
+    async def record_completion(
+        self,
+        runbook_id: Any,
+        version: int,
+        path: list[str],
+        status: SessionStatus,
+        dwell_seconds: float,
+    ) -> None:
+        """
+        Record a session finishing, including the full path it took.
+
+        :param runbook_id: The runbook ID.
+        :param version: The runbook version.
+        :param path: The session's execution path.
+        :param status: The final session status.
+        :param dwell_seconds: The time spent on the final node.
+        """
+        last = _field(path[-1])
+        await self._inc(
+            runbook_id,
+            version,
+            {
+                f"sessions_{status.value}": 1,
+                f"terminals.{last}.{status.value}": 1,
+                f"dwell.{last}.{_dwell_bucket(dwell_seconds)}": 1,
+            },
+        )
+        path_hash = hashlib.sha1("\x1f".join(path).encode()).hexdigest()
+        await self.paths.update_one(
+            {"_id": f"{self._id(runbook_id, version)}:{path_hash}"},
+            {
+                "$inc": {"count": 1, f"outcomes.{status.value}": 1},
+                "$setOnInsert": {
+                    "runbook_id": runbook_id,
+                    "version": version,
+                    "path": path,
+                },
+            },
+            upsert=True,
+        )
+
+    async def get_option_choices(
+        self, runbook_id: Any, version: int, node_id: str
+    ) -> tuple[dict[str, int], int]:
+        """
+        Read how often each option of a decision node was chosen.
+
+        :param runbook_id: The runbook ID.
+        :param version: The runbook version.
+        :param node_id: The decision node ID.
+        :return: The choice counts by option index, and the node's visit count.
+        """
+        key = _field(node_id)
+        doc = await self.collection.find_one(
+            {"_id": self._id(runbook_id, version)},
+            {f"option_choices.{key}": 1, f"visits.{key}": 1},
+        )
+        if doc is None:
+            return {}, 0
+        choices = doc.get("option_choices", {}).get(key, {})
+        return choices, doc.get("visits", {}).get(key, 0)
+
+    async def get_summary(
+        self, runbook_id: Any, version: int, top_paths: int = 10
+    ) -> dict[str, Any] | None:
+        """
+        Build the analytics summary for a runbook version.
+
+        :param runbook_id: The runbook ID.
+        :param version: The runbook version.
+        :param top_paths: The number of most common paths to include.
+        :return: The summary, or None if no session has run on this version.
+        """
+        doc = await self.collection.find_one({"_id": self._id(runbook_id, version)})
+        if doc is None:
+            return None
+        cursor = (
+            self.paths.find(
+                {"runbook_id": runbook_id, "version": version},
+                {"_id": 0, "path": 1, "count": 1, "outcomes": 1},
+            )
+            .sort("count", DESCENDING)
+            .limit(top_paths)
+        )
+        paths = await cursor.to_list(length=top_paths)
+        return summarize(doc, paths)
+
+
+def summarize(doc: dict[str, Any], paths: list[dict[str, Any]]) -> dict[str, Any]:
+    """
+    Turn a counters document into the analytics API payload.
+
+    :param doc: The per-version counters document.
+    :param paths: The most common paths, most frequent first.
+    :return: The analytics summary.
+    """
+    visits = doc.get("visits", {})
+    exits = doc.get("exits", {})
+    terminals = doc.get("terminals", {})
+    dwell = doc.get("dwell", {})
+
+    nodes = {}
+    dead_ends = []
+    for key, visit_count in visits.items():
+        node_terminals = terminals.get(key, {})
+        failed = node_terminals.get(SessionStatus.FAILED.value, 0)
+        ended = sum(node_terminals.values())
+        # Visits that neither moved on nor finished are still in progress or
+        # were abandoned on this node.
+        stalled = max(0, visit_count - exits.get(key, 0) - ended)
+        node_id = _unfield(key)
+        nodes[node_id] = {
+            "visits": visit_count,
+            "exits": exits.get(key, 0),
+            "completed_here": node_terminals.get(SessionStatus.COMPLETED.value, 0),
+            "failed_here": failed,
+            "stalled_here": stalled,
+            "median_dwell_seconds": _bucket_median(dwell.get(key, {})),
+        }
+        if failed or stalled:
+            dead_ends.append({"node_id": node_id, "failed": failed, "stalled": stalled})
+    dead_ends.sort(key=lambda node: node["failed"] + node["stalled"], reverse=True)
+
+    options = {}
+    for key, choices in doc.get("option_choices", {}).items():
+        visit_count = visits.get(key, 0)
+        options[_unfield(key)] = {
+            index: {
+                "chosen": count,
+                "conversion_rate": count / visit_count if visit_count else 0.0,
+            }
+            for index, count in sorted(choices.items(), key=lambda i: int(i[0]))
+        }
+
+    return {
+        "runbook_id": str(doc["runbook_id"]),
+        "version": doc["version"],
+        "sessions": {
+            "started": doc.get("sessions_started", 0),
+            "completed": doc.get(f"sessions_{SessionStatus.COMPLETED.value}", 0),
+            "failed": doc.get(f"sessions_{SessionStatus.FAILED.value}", 0),
+        },
+        "nodes": nodes,
+        "options": options,
+        "dead_ends": dead_ends,
+        "top_paths": paths,
+    }
@@ -0,0 +1,63 @@
+"""Refresh token repository."""
+from datetime import UTC, datetime
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, ReturnDocument
+
+from backend.models.token import RefreshToken
+from backend.repositories.base import BaseRepository
+
+
+class RefreshTokenRepository(BaseRepository[RefreshToken]):
+    """Repository for RefreshToken documents."""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        super().__init__(RefreshToken, db)
+
+    async def ensure_indexes(self) -> None:
+        """Create the TTL and lookup indexes for the collection."""
+        await self.collection.create_index(
+            [("expires_at", ASCENDING)], expireAfterSeconds=0
+        )
+        await self.collection.create_index([("jti", ASCENDING)], unique=True)
+        await self.collection.create_index([("family_id", ASCENDING)])
+        await self.collection.create_index([("revoked_at", ASCENDING)], sparse=True)
+
+    async def rotate(self, jti: str, replaced_by: str) -> RefreshToken | None:
+        """
+        Atomically mark a live token as used and link it to its successor.
+
+        :param jti: The JWT ID of the presented token.
+        :param replaced_by: The JWT ID of the newly issued token.
+        :return: The token before rotation, or None if it was not live.
+        """
+        doc = await self.collection.find_one_and_update(
+            {"jti": jti, "rotated_at": None, "revoked_at": None},
+            {"$set": {"rotated_at": datetime.now(UTC), "replaced_by": replaced_by}},
+            return_document=ReturnDocument.BEFORE,
+        )
+        if doc:
+            return self.model(**doc)
+        return None
+
+    async def revoke_family(self, family_id: str) -> None:
+        """
+        Revoke every token in a rotation family.
+
+        :param family_id: The family ID.
+        """
+        await self.collection.update_many(
+            {"family_id": family_id, "revoked_at": None},
+            {"$set": {"revoked_at": datetime.now(UTC)}},
+        )
+
+    async def revoked_families_since(self, since: datetime) -> list[str]:
+        """
+        List the families revoked at or after ``since``.
+
+        :param since: The earliest revocation time of interest.
+        :return: The revoked family IDs.
+        """
+        return await self.collection.distinct(
+            "family_id", {"revoked_at": {"$gte": since}}
+        )
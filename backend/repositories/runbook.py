@@ -1,12 +1,127 @@
 """Runbook repository."""
+from bson.raw_bson import RawBSONDocument
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import BaseModel
+from pymongo import ASCENDING
 
-from backend.models.runbook import Runbook
+from backend.config import settings
+from backend.models.compact import CompactRunbook
+from backend.models.runbook import Runbook, RunbookUpdate
 from backend.repositories.base import BaseRepository
+from backend.services.autocomplete import autocomplete_index
+from backend.services.cache import runbook_cache
+from backend.services.runbook_uploads import (
+    DescribedRunbook,
+    PreparedRunbook,
+    runbook_uploads,
+)
+from backend.services.similarity import similarity_index
+from backend.services.tree_render import invalidate_renders
+from backend.services.tree_stats import STATS_FIELDS, tree_stats
 
 
 class RunbookRepository(BaseRepository[Runbook]):
     """Repository for Runbook documents."""
 
+    cache = runbook_cache
+
     def __init__(self, db: AsyncIOMotorDatabase):
         super().__init__(Runbook, db)
+
+    async def ensure_indexes(self) -> None:
+        """Create the indexes used to filter and sort the catalog by complexity."""
+        for field in STATS_FIELDS.values():
+            await self.collection.create_index([(field, ASCENDING)])
+
+    async def create(self, data: Runbook) -> Runbook:
+        """
+        Create a runbook with its tree statistics and add it to the similarity
+        and autocomplete indexes.
+
+        :param data: The runbook data.
+        :return: The created runbook.
+        """
+        data = data.model_copy(update={"stats": tree_stats(data.decision_tree)})
+        runbook = await super().create(data)
+        similarity_index.upsert(runbook)
+        autocomplete_index.upsert(str(runbook.id), runbook.title, runbook.tags)
+        return runbook
+
+    async def update(
+        self, id: str, data: BaseModel, expected_version: int | None = None
+    ) -> Runbook | None:
+        """
+        Update a runbook and re-index it for similarity and autocomplete.
+
+        :param id: The runbook ID.
+        :param data: The update data.
+        :param expected_version: The version the caller last read.
+        :return: The updated runbook, or None if not found.
+        """
+        runbook = await super().update(id, data, expected_version)
+        if runbook is not None:
+            similarity_index.upsert(runbook)
+            autocomplete_index.upsert(id, runbook.title, runbook.tags)
+        return runbook
+
+    async def create_prepared(self, prepared: PreparedRunbook) -> None:
+        """
+        Insert a runbook validated by :mod:`backend.services.runbook_uploads`
+        and add it to the similarity and autocomplete indexes.
+
+        :param prepared: The prepared runbook.
+        """
+        await self.create_raw(RawBSONDocument(prepared.document))
+        similarity_index.upsert_vector(prepared.id, 1, prepared.vector)
+        autocomplete_index.upsert(prepared.id, prepared.title, prepared.tags)
+
+    async def update_prepared(
+        self, id: str, fields: RawBSONDocument, expected_version: int | None = None
+    ) -> DescribedRunbook | None:
+        """
+        Apply update fields validated by :mod:`backend.services.runbook_uploads`
+        and re-index the runbook for similarity and autocomplete.
+
+        :param id: The runbook ID.
+        :param fields: The fields to set.
+        :param expected_version: The version the caller last read.
+        :return: The updated runbook encoded for the response, or None if not
+            found.
+        :raises VersionConflictError: If the stored version no longer matches.
+        """
+        raw = await self.update_raw(id, fields, expected_version)
+        if raw is None:
+            return None
+        described = await runbook_uploads.describe(raw)
+        similarity_index.upsert_vector(id, described.version, described.vector)
+        autocomplete_index.upsert(id, described.title, described.tags)
+        return described
+
+    def _to_cache(self, model: Runbook) -> Runbook | CompactRunbook:
+        return CompactRunbook(model) if settings.compact_runbook_cache else model
+
+    def _from_cache(self, value: Runbook | CompactRunbook) -> Runbook:
+        return value.to_model() if isinstance(value, CompactRunbook) else value
+
+    def _update_fields(self, data: BaseModel) -> dict:
+        fields = super()._update_fields(data)
+        if isinstance(data, RunbookUpdate) and data.decision_tree is not None:
+            fields["stats"] = tree_stats(data.decision_tree).model_dump()
+        return fields
+
+    async def delete(self, id: str) -> bool:
+        """
+        Delete a runbook and drop it from the similarity and autocomplete
+        indexes.
+
+        :param id: The runbook ID.
+        :return: True if deleted, False otherwise.
+        """
+        deleted = await super().delete(id)
+        similarity_index.remove(id)
+        autocomplete_index.remove(id)
+        return deleted
+
+    async def _invalidate(self, id: str, version: float | None = None) -> None:
+        await super()._invalidate(id, version)
+        await invalidate_renders(str(id), version)
@@ -1,8 +1,10 @@
 """Session repository."""
+from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from backend.models.session import Session
 from backend.repositories.base import BaseRepository
+from backend.services.archive import SESSION_ARCHIVE_COLLECTION, unpack_session
 
 
 class SessionRepository(BaseRepository[Session]):
@@ -10,3 +12,31 @@ class SessionRepository(BaseRepository[Session]):
 
     def __init__(self, db: AsyncIOMotorDatabase):
         super().__init__(Session, db)
+        self.archive = db[SESSION_ARCHIVE_COLLECTION]
+
+    async def get(self, id: str) -> Session | None:
+        """
+        Get a session by ID, falling through to the archive.
+
+        :param id: The session ID.
+        :return: The session, or None if not found in either tier.
+        """
+        session = await super().get(id)
+        if session is not None:
+            return session
+        archived = await self.archive.find_one({"_id": ObjectId(id)})
+        if archived:
+            return self.model(**unpack_session(archived)[0])
+        return None
+
+    async def delete(self, id: str) -> bool:
+        """
+        Delete a session from whichever tier holds it.
+
+        :param id: The session ID.
+        :return: True if deleted, False otherwise.
+        """
+        if await super().delete(id):
+            return True
+        result = await self.archive.delete_one({"_id": ObjectId(id)})
+        return result.deleted_count > 0
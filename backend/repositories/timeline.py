@@ -0,0 +1,35 @@
+"""Timeline event repository."""
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING
+
+from backend.models.session import TimelineEvent
+from backend.repositories.base import BaseRepository
+from backend.services.archive import SESSION_ARCHIVE_COLLECTION, unpack_session
+
+
+class TimelineEventRepository(BaseRepository[TimelineEvent]):
+    """Repository for TimelineEvent documents."""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        super().__init__(TimelineEvent, db)
+        self.archive = db[SESSION_ARCHIVE_COLLECTION]
+
+    async def list_for_session(self, session_id: str) -> list[TimelineEvent]:
+        """
+        List a session's events in chronological order.
+
+        Events of archived sessions are read from the session archive.
+
+        :param session_id: The session ID.
+        :return: The session's timeline events.
+        """
+        cursor = self.collection.find({"session_id": ObjectId(session_id)}).sort(
+            "timestamp", ASCENDING
+        )
+        docs = await cursor.to_list(length=None)
+        if not docs:
+            archived = await self.archive.find_one({"_id": ObjectId(session_id)})
+            if archived:
+                docs = unpack_session(archived)[1]
+        return [self.model(**doc) for doc in docs]
@@ -1,12 +1,34 @@
 """User repository."""
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.collation import Collation, CollationStrength
 
 from backend.models.user import User
 from backend.repositories.base import BaseRepository
 
+# Compares emails ignoring case, as mail servers do in practice.
+EMAIL_COLLATION = Collation(locale="en", strength=CollationStrength.SECONDARY)
+
 
 class UserRepository(BaseRepository[User]):
     """Repository for User documents."""
 
     def __init__(self, db: AsyncIOMotorDatabase):
         super().__init__(User, db)
+
+    async def ensure_indexes(self) -> None:
+        """Create the case-insensitive index used to look users up by email."""
+        await self.collection.create_index("email", collation=EMAIL_COLLATION)
+
+    async def get_by_email(self, email: str) -> User | None:
+        """
+        Get a user by email address, ignoring case.
+
+        :param email: The email address.
+        :return: The user, or None if not found.
+        """
+        doc = await self.collection.find_one(
+            {"email": email}, collation=EMAIL_COLLATION
+        )
+        if doc:
+            return self.model(**doc)
+        return None
@@ -0,0 +1,193 @@
+"""Archival of finished sessions into a compressed cold tier."""
+import uuid
+import zlib
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+import bson
+from bson import Binary
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, UpdateOne
+
+from backend.config import settings
+from backend.models.enums import SessionStatus
+
+SESSION_ARCHIVE_COLLECTION = "sessions_archive"
+ARCHIVED_STATUSES = [SessionStatus.COMPLETED.value, SessionStatus.FAILED.value]
+
+# How long a run owns the sessions it claimed; a run that dies releases its
+# claim when this runs out.
+ARCHIVE_CLAIM_TTL = timedelta(minutes=10)
+
+
+def pack_session(session: dict[str, Any], events: list[dict[str, Any]]) -> dict:
+    """
+    Build the archive document for a session and its timeline.
+
+    A handful of fields stay queryable; the rest is stored as compressed BSON.
+
+    :param session: The session document.
+    :param events: The session's timeline event documents.
+    :return: The archive document.
+    """
+    payload = bson.encode({"session": session, "events": events})
+    return {
+        "_id": session["_id"],
+        "runbook_id": session.get("runbook_id"),
+        "user_id": session.get("user_id"),
+        "status": session.get("status"),
+        "created_at": session.get("created_at"),
+        "completed_at": session.get("completed_at"),
+        "archived_at": datetime.now(UTC),
+        "event_count": len(events),
+        "payload": Binary(zlib.compress(payload, settings.session_archive_zlib_level)),
+    }
+
+
+def unpack_session(archived: dict[str, Any]) -> tuple[dict, list[dict]]:
+    """
+    Restore the session and timeline documents from an archive document.
+
+    :param archived: The archive document.
+    :return: The session document and its timeline event documents.
+    """
+    payload = bson.decode(zlib.decompress(archived["payload"]))
+    return payload["session"], payload["events"]
+
+
+class SessionArchiver:
+    """
+    Moves old finished sessions out of the live collections.
+
+    Runs through the ``archive_sessions`` job, which the job workers queue
+    once per archival interval.
+    """
+
+    def __init__(self, archive_after: timedelta, batch_size: int):
+        """
+        Initializes the archiver.
+
+        :param archive_after: How long after completion a session is archived.
+        :param batch_size: The maximum number of sessions moved per batch.
+        """
+        self.archive_after = archive_after
+        self.batch_size = batch_size
+
+    async def ensure_indexes(self, db: AsyncIOMotorDatabase) -> None:
+        """Create the indexes used to find candidates and query the archive."""
+        await db["sessions"].create_index(
+            [("status", ASCENDING), ("completed_at", ASCENDING)]
+        )
+        archive = db[SESSION_ARCHIVE_COLLECTION]
+        await archive.create_index([("runbook_id", ASCENDING)])
+        await archive.create_index([("user_id", ASCENDING)])
+
+    async def _claim(self, db: AsyncIOMotorDatabase) -> tuple[str, list[dict]]:
+        """Claim a batch of candidates, so concurrent runs move disjoint sets."""
+        now = datetime.now(UTC)
+        claimable = {
+            "status": {"$in": ARCHIVED_STATUSES},
+            "completed_at": {"$lt": now - self.archive_after},
+            "$or": [
+                {"archive_claim": {"$exists": False}},
+                {"archive_claim.expires_at": {"$lt": now}},
+            ],
+        }
+        candidates = [
+            doc["_id"]
+            async for doc in db["sessions"]
+            .find(claimable, {"_id": 1})
+            .limit(self.batch_size)
+        ]
+        if not candidates:
+            return "", []
+        token = uuid.uuid4().hex
+        await db["sessions"].update_many(
+            {**claimable, "_id": {"$in": candidates}},
+            {
+                "$set": {
+                    "archive_claim": {
+                        "token": token,
+                        "expires_at": now + ARCHIVE_CLAIM_TTL,
+                    }
+                }
+            },
+        )
+        sessions = await (
+            db["sessions"]
+            .find({"archive_claim.token": token})
+            .to_list(length=self.batch_size)
+        )
+        return token, sessions
+
+    async def archive_batch(self, db: AsyncIOMotorDatabase) -> int:
+        """
+        Archive one batch of finished sessions.
+
+        Sessions are first claimed, so concurrent runs never move the same
+        session. Archive documents are written before the live documents are
+        deleted, and an existing archive document is never replaced: a run
+        interrupted after deleting a session's events but before deleting the
+        session leaves the complete archive in place, and the next run, which
+        finds no events left, only deletes the live session.
+
+        :param db: The database instance.
+        :return: The number of sessions claimed and archived.
+        """
+        token, sessions = await self._claim(db)
+        if not sessions:
+            return 0
+
+        session_ids = [session["_id"] for session in sessions]
+        events_by_session: dict[Any, list[dict]] = {sid: [] for sid in session_ids}
+        cursor = (
+            db["timelineevents"]
+            .find({"session_id": {"$in": session_ids}})
+            .sort("timestamp", ASCENDING)
+        )
+        async for event in cursor:
+            events_by_session[event["session_id"]].append(event)
+
+        writes = []
+        for session in sessions:
+            session.pop("archive_claim", None)
+            archived = pack_session(session, events_by_session[session["_id"]])
+            writes.append(
+                UpdateOne(
+                    {"_id": session["_id"]}, {"$setOnInsert": archived}, upsert=True
+                )
+            )
+        await db[SESSION_ARCHIVE_COLLECTION].bulk_write(writes, ordered=False)
+        await db["timelineevents"].delete_many({"session_id": {"$in": session_ids}})
+        await db["sessions"].delete_many(
+            {"_id": {"$in": session_ids}, "archive_claim.token": token}
+        )
+        return len(sessions)
+
+    async def run_once(
+        self,
+        db: AsyncIOMotorDatabase,
+        progress: Callable[[int], Awaitable[None]] | None = None,
+    ) -> int:
+        """
+        Archive every eligible session, batch by batch.
+
+        :param db: The database instance.
+        :param progress: Called with the running total after each batch.
+        :return: The total number of sessions archived.
+        """
+        total = 0
+        while True:
+            archived = await self.archive_batch(db)
+            total += archived
+            if progress is not None:
+                await progress(total)
+            if archived < self.batch_size:
+                return total
+
+
+session_archiver = SessionArchiver(
+    archive_after=timedelta(days=settings.session_archive_after_days),
+    batch_size=settings.session_archive_batch_size,
+)
@@ -0,0 +1,359 @@
+"""Prefix autocomplete over runbook titles and tags, ranked by usage."""
+import asyncio
+import bisect
+import heapq
+import logging
+import re
+import time
+from collections import Counter
+from typing import Any
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import PyMongoError
+
+from backend.config import settings
+from backend.services.runbook_sync import runbook_changes
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+
+# Sorts after every character a key can contain, to bound a prefix range.
+_MAX_CHAR = "\U0010ffff"
+
+# Prefix ranges with more keys than this are answered from the ranked list.
+SCAN_LIMIT = 512
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+def _remove_sorted(items: list, item: Any) -> None:
+    position = bisect.bisect_left(items, item)
+    if position < len(items) and items[position] == item:
+        del items[position]
+
+
+def _title_keys(title: str) -> set[str]:
+    """Index a title from the start of each word, so any word can be typed."""
+    folded = _normalize(title)
+    return {folded[match.start() :] for match in _WORD.finditer(folded)}
+
+
+class AutocompleteIndex:
+    """
+    In-memory prefix index of runbook titles and tags.
+
+    Keys are kept in a sorted array of ``(key, kind, target)`` tuples, so
+    the entries matching a prefix are one contiguous range found by binary
+    search. Titles are ranked by how many sessions were started from the
+    runbook, tags by the total over their runbooks.
+
+    Scanning and ranking a wide range, as for a one-letter prefix, would
+    take milliseconds, so the titles and tags are also kept in a list sorted
+    by rank. For wide ranges that list is walked until enough matches are
+    found, which ends quickly because a prefix matching many keys also
+    matches some of the most used titles or tags. Results are memoized per
+    prefix until the index or the usage counts change.
+    """
+
+    def __init__(self, sync_interval: float, memo_entries: int):
+        """
+        Initializes the index.
+
+        :param sync_interval: Seconds between polls for runbooks changed by
+            other worker processes and for new session counts.
+        :param memo_entries: The number of prefixes whose results are kept.
+        """
+        self.sync_interval = sync_interval
+        self.memo_entries = memo_entries
+        self._keys: list[tuple[str, str, str]] = []
+        self._ranked: list[tuple] = []
+        self._ranks: dict[tuple[str, str], tuple] = {}
+        self._match_keys: dict[tuple[str, str], tuple[str, ...]] = {}
+        self._runbooks: dict[str, tuple[str, tuple[str, ...]]] = {}
+        self._tags: dict[str, set[str]] = {}
+        self._usage: Counter[str] = Counter()
+        self._tag_usage: Counter[str] = Counter()
+        self._memo: dict[tuple[str, int], list[dict[str, Any]]] = {}
+        self._versions: dict[str, int | None] = {}
+        self._synced = False
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._runbooks)
+
+    def _rank(self, kind: str, target: str) -> tuple:
+        if kind == "title":
+            uses, text = self._usage[target], self._runbooks[target][0]
+        else:
+            uses, text = self._tag_usage[target], target
+        # Most used first, then the shorter text.
+        return -uses, len(text), text, kind, target
+
+    def _add_target(self, kind: str, target: str, keys: tuple[str, ...]) -> None:
+        self._match_keys[(kind, target)] = keys
+        for key in keys:
+            bisect.insort(self._keys, (key, kind, target))
+        rank = self._ranks[(kind, target)] = self._rank(kind, target)
+        bisect.insort(self._ranked, rank)
+
+    def _drop_target(self, kind: str, target: str) -> None:
+        for key in self._match_keys.pop((kind, target)):
+            _remove_sorted(self._keys, (key, kind, target))
+        _remove_sorted(self._ranked, self._ranks.pop((kind, target)))
+
+    def _rerank(self, kind: str, target: str) -> None:
+        _remove_sorted(self._ranked, self._ranks[(kind, target)])
+        rank = self._ranks[(kind, target)] = self._rank(kind, target)
+        bisect.insort(self._ranked, rank)
+
+    def upsert(self, runbook_id: str, title: str, tags: list[str]) -> None:
+        """
+        Add or replace a runbook's title and tags.
+
+        :param runbook_id: The runbook ID.
+        :param title: The runbook title.
+        :param tags: The runbook tags.
+        """
+        runbook_id = str(runbook_id)
+        entry = (title, tuple(dict.fromkeys(tags)))
+        if self._runbooks.get(runbook_id) == entry:
+            return
+        self.remove(runbook_id)
+        self._runbooks[runbook_id] = entry
+        self._add_target("title", runbook_id, tuple(_title_keys(title)))
+        for tag in entry[1]:
+            self._tag_usage[tag] += self._usage[runbook_id]
+            runbooks = self._tags.setdefault(tag, set())
+            runbooks.add(runbook_id)
+            if len(runbooks) == 1:
+                self._add_target("tag", tag, (_normalize(tag),))
+            else:
+                self._rerank("tag", tag)
+        self._memo.clear()
+
+    def remove(self, runbook_id: str) -> None:
+        """
+        Drop a runbook's title and tags.
+
+        :param runbook_id: The runbook ID.
+        """
+        runbook_id = str(runbook_id)
+        entry = self._runbooks.get(runbook_id)
+        if entry is None:
+            return
+        self._drop_target("title", runbook_id)
+        del self._runbooks[runbook_id]
+        self._versions.pop(runbook_id, None)
+        for tag in entry[1]:
+            runbooks = self._tags[tag]
+            runbooks.discard(runbook_id)
+            self._tag_usage[tag] -= self._usage[runbook_id]
+            if runbooks:
+                self._rerank("tag", tag)
+            else:
+                self._drop_target("tag", tag)
+                del self._tags[tag]
+                del self._tag_usage[tag]
+        self._memo.clear()
+
+    def record_uses(self, uses: dict[str, int]) -> None:
+        """
+        Add to the usage counts of runbooks.
+
+        :param uses: Runbook IDs and the number of new sessions of each.
+        """
+        tags = set()
+        for runbook_id, count in uses.items():
+            runbook_id = str(runbook_id)
+            self._usage[runbook_id] += count
+            entry = self._runbooks.get(runbook_id)
+            if entry is not None:
+                self._rerank("title", runbook_id)
+                for tag in entry[1]:
+                    self._tag_usage[tag] += count
+                    tags.add(tag)
+        for tag in tags:
+            self._rerank("tag", tag)
+        if uses:
+            self._memo.clear()
+
+    def _suggestion(self, kind: str, target: str) -> dict[str, Any]:
+        if kind == "title":
+            return {
+                "type": "title",
+                "text": self._runbooks[target][0],
+                "runbook_id": target,
+                "uses": self._usage[target],
+            }
+        return {
+            "type": "tag",
+            "text": target,
+            "runbook_count": len(self._tags[target]),
+            "uses": self._tag_usage[target],
+        }
+
+    def suggest(self, prefix: str, limit: int = 10) -> list[dict[str, Any]]:
+        """
+        Suggest titles and tags starting with a prefix.
+
+        Titles match from the start of any of their words. The returned list
+        is shared with later callers and must not be modified.
+
+        :param prefix: What the user typed so far.
+        :param limit: The maximum number of suggestions.
+        :return: Suggestions, most used first; ties go to the shorter text.
+        """
+        prefix = _normalize(prefix)
+        if not prefix:
+            return []
+        memo_key = (prefix, limit)
+        cached = self._memo.get(memo_key)
+        if cached is not None:
+            return cached
+
+        low = bisect.bisect_left(self._keys, (prefix,))
+        high = bisect.bisect_left(self._keys, (prefix + _MAX_CHAR,), low)
+        if high - low <= SCAN_LIMIT:
+            # A title matching at several words appears once.
+            matches = {(kind, target) for _, kind, target in self._keys[low:high]}
+            best = heapq.nsmallest(limit, (self._ranks[match] for match in matches))
+        else:
+            best = []
+            for rank in self._ranked:
+                keys = self._match_keys[rank[3], rank[4]]
+                if any(key.startswith(prefix) for key in keys):
+                    best.append(rank)
+                    if len(best) == limit:
+                        break
+        result = [self._suggestion(rank[3], rank[4]) for rank in best]
+        if len(self._memo) >= self.memo_entries:
+            self._memo.clear()
+        self._memo[memo_key] = result
+        return result
+
+    def _rebuild(self, runbooks: dict[str, tuple[str, list[str]]]) -> None:
+        """Index many runbooks at once, sorting once instead of per insertion."""
+        self._runbooks = {
+            runbook_id: (title, tuple(dict.fromkeys(tags)))
+            for runbook_id, (title, tags) in runbooks.items()
+        }
+        self._tags = {}
+        self._match_keys = {}
+        for runbook_id, (title, tags) in self._runbooks.items():
+            self._match_keys[("title", runbook_id)] = tuple(_title_keys(title))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(runbook_id)
+        self._tag_usage = Counter(
+            {
+                tag: sum(self._usage[runbook_id] for runbook_id in ids)
+                for tag, ids in self._tags.items()
+            }
+        )
+        for tag in self._tags:
+            self._match_keys[("tag", tag)] = (_normalize(tag),)
+        self._keys = sorted(
+            (key, kind, target)
+            for (kind, target), keys in self._match_keys.items()
+            for key in keys
+        )
+        self._ranks = {match: self._rank(*match) for match in self._match_keys}
+        self._ranked = sorted(self._ranks.values())
+        self._memo.clear()
+
+    async def _session_counts(self, db: AsyncIOMotorDatabase) -> Counter[str]:
+        """
+        Count the sessions ever started per runbook.
+
+        Read from the path analytics counters, which are incremented when a
+        session starts and outlive archived sessions, so the totals are exact
+        however late a session insert becomes visible.
+        """
+        pipeline = [
+            {"$group": {"_id": "$runbook_id", "uses": {"$sum": "$sessions_started"}}}
+        ]
+        return Counter(
+            {
+                str(doc["_id"]): doc["uses"]
+                async for doc in db["path_analytics"].aggregate(pipeline)
+                if doc["_id"] is not None
+            }
+        )
+
+    async def sync(self, db: AsyncIOMotorDatabase) -> int:
+        """
+        Catch up with runbooks changed elsewhere and with the session counts.
+
+        :param db: The database instance.
+        :return: The number of runbooks re-indexed.
+        """
+        counts = await self._session_counts(db)
+        indexed = {i: self._versions.get(i) for i in self._runbooks}
+        docs, deleted = await runbook_changes(
+            db, indexed, {"title": 1, "tags": 1, "version": 1}
+        )
+        if not self._synced:
+            self._usage = counts
+            self._rebuild(
+                {
+                    str(doc["_id"]): (doc.get("title", ""), doc.get("tags", []))
+                    for doc in docs
+                }
+            )
+        else:
+            for doc in docs:
+                self.upsert(str(doc["_id"]), doc.get("title", ""), doc.get("tags", []))
+            for runbook_id in deleted:
+                self.remove(runbook_id)
+            self.record_uses(
+                {
+                    runbook_id: counts[runbook_id] - self._usage[runbook_id]
+                    for runbook_id in counts.keys() | self._usage.keys()
+                    if counts[runbook_id] != self._usage[runbook_id]
+                }
+            )
+        self._versions.update((str(doc["_id"]), doc.get("version")) for doc in docs)
+        self._synced = True
+        return len(docs)
+
+    async def start(self, db: AsyncIOMotorDatabase) -> None:
+        """
+        Build the index from MongoDB and keep polling for changes.
+
+        :param db: The database instance.
+        """
+        began = time.monotonic()
+        await self.sync(db)
+        logger.info(
+            "Autocomplete index ready: %d runbooks, %d tags, %.2fs",
+            len(self._runbooks),
+            len(self._tags),
+            time.monotonic() - began,
+        )
+        self._task = asyncio.create_task(self._poll(db))
+
+    async def stop(self) -> None:
+        """Stop polling."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _poll(self, db: AsyncIOMotorDatabase) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync(db)
+            except PyMongoError as exc:
+                logger.warning("Could not sync the autocomplete index: %s", exc)
+
+
+autocomplete_index = AutocompleteIndex(
+    sync_interval=settings.autocomplete_sync_interval_s,
+    memo_entries=settings.autocomplete_memo_entries,
+)
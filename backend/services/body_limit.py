@@ -0,0 +1,66 @@
+"""Request body size limits."""
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+TOO_LARGE = 413
+
+
+class BodySizeLimitMiddleware:
+    """
+    ASGI middleware rejecting request bodies above a size limit.
+
+    Requests that declare a larger ``Content-Length`` are rejected before the
+    body is read; chunked bodies are counted as they are received.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_bytes: int,
+        path_limits: dict[str, int] | None = None,
+    ):
+        """
+        Initializes the middleware.
+
+        :param app: The wrapped ASGI application.
+        :param max_bytes: The default limit.
+        :param path_limits: Limits for path prefixes; the longest match wins.
+        """
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_limits = sorted(
+            (path_limits or {}).items(), key=lambda item: len(item[0]), reverse=True
+        )
+
+    def limit_for(self, path: str) -> int:
+        """Return the body size limit of a path."""
+        for prefix, limit in self.path_limits:
+            if path.startswith(prefix):
+                return limit
+        return self.max_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        limit = self.limit_for(scope["path"])
+        detail = f"Request body is larger than {limit} bytes"
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > limit:
+            response = JSONResponse({"detail": detail}, status_code=TOO_LARGE)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=TOO_LARGE, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
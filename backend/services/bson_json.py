@@ -0,0 +1,73 @@
+"""Direct BSON to JSON encoding for pass-through reads."""
+import json
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Any
+
+import bson
+from bson import ObjectId
+from bson.codec_options import CodecOptions
+from bson.decimal128 import Decimal128
+from bson.raw_bson import RawBSONDocument
+
+RAW_CODEC_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
+_encoder = json.JSONEncoder(separators=(",", ":"), default=lambda v: _default(v))
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal128):
+        return str(value)
+    if isinstance(value, bytes):
+        return value.hex()
+    raise TypeError(f"Cannot encode {type(value).__name__} as JSON")
+
+
+def decode_raw(raw: RawBSONDocument) -> dict[str, Any]:
+    """
+    Decode a raw document into plain dicts and lists.
+
+    :param raw: The raw document.
+    :return: The decoded document.
+    """
+    return bson.decode(raw.raw)
+
+
+def document_to_json(doc: Mapping[str, Any]) -> str:
+    """
+    Encode a stored document as JSON, shaped like ``model_dump(mode="json")``.
+
+    ``_id`` becomes ``id`` and ObjectIds become strings, as they do when a
+    model is dumped, but nothing is validated.
+
+    :param doc: The decoded document.
+    :return: The JSON text.
+    """
+    if "_id" in doc:
+        doc = {"id": doc["_id"], **{k: v for k, v in doc.items() if k != "_id"}}
+    return _encoder.encode(doc)
+
+
+def ok_envelope(data_json: str, stale_since: datetime | None = None) -> bytes:
+    """
+    Wrap pre-encoded JSON in the API's success envelope.
+
+    :param data_json: The JSON-encoded payload.
+    :param stale_since: For data served from a snapshot, when it was taken;
+        the envelope is then flagged as stale.
+    :return: The response body.
+    """
+    if stale_since is not None:
+        flag = _encoder.encode({"snapshot_at": stale_since.isoformat()})
+        return (
+            b'{"ok":true,"stale":'
+            + flag.encode()
+            + b',"data":'
+            + data_json.encode()
+            + b"}"
+        )
+    return b'{"ok":true,"data":' + data_json.encode() + b"}"
@@ -0,0 +1,391 @@
+"""In-process read-through caches with cross-worker invalidation."""
+import asyncio
+import logging
+import math
+import os
+import uuid
+from collections import OrderedDict
+from typing import Any
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+from backend.config import settings
+from backend.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_COLLECTION = "cache_invalidations"
+
+# The invalidation version of a deleted key: a floor no cached version
+# reaches, so reads that started before the delete cannot cache it again.
+DELETED = math.inf
+
+cache_requests_total = registry.counter(
+    "cache_requests_total",
+    "Cache lookups by cache and result.",
+    ("cache", "result"),
+)
+cache_evictions_total = registry.counter(
+    "cache_evictions_total",
+    "Entries evicted to stay within the cache bounds.",
+    ("cache",),
+)
+cache_entries = registry.gauge(
+    "cache_entries", "Entries currently held by the cache.", ("cache",)
+)
+cache_bytes = registry.gauge(
+    "cache_bytes",
+    "Approximate size of the cached documents, measured as encoded BSON.",
+    ("cache",),
+)
+
+
+class _Entry:
+    __slots__ = ("version", "value", "size")
+
+    def __init__(self, version: Any, value: Any, size: int):
+        self.version = version
+        self.value = value
+        self.size = size
+
+
+class LRUCache:
+    """
+    A version-aware LRU cache bounded by entry count and, optionally,
+    approximate bytes.
+
+    Cached values are shared between callers and must be treated as read-only.
+    Pinned keys are never evicted, though they are still invalidated; a pinned
+    key that is cached again stays pinned.
+    """
+
+    def __init__(self, name: str, max_entries: int, max_bytes: int | None = None):
+        """
+        Initializes the cache.
+
+        :param name: The cache name used in metrics and invalidation messages.
+        :param max_entries: The maximum number of entries.
+        :param max_bytes: The maximum total size of the entries, or None to
+            bound the cache by its entry count alone.
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._bytes = 0
+        self._pinned: set[str] = set()
+        # The lowest version each recently invalidated key may be cached at.
+        self._floors: OrderedDict[str, Any] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    @property
+    def size_bytes(self) -> int:
+        """The approximate size of the cached entries."""
+        return self._bytes
+
+    def get(self, key: str, version: Any = None) -> Any | None:
+        """
+        Look up a value, marking it as recently used.
+
+        :param key: The cache key.
+        :param version: If given, entries at any other version count as misses.
+        :return: The cached value, or None on a miss.
+        """
+        entry = self._entries.get(key)
+        if entry is None or (version is not None and entry.version != version):
+            self.misses += 1
+            cache_requests_total.inc(self.name, "miss")
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        cache_requests_total.inc(self.name, "hit")
+        return entry.value
+
+    def version(self, key: str) -> Any | None:
+        """Return the version of a cached entry without touching its recency."""
+        entry = self._entries.get(key)
+        return entry.version if entry else None
+
+    def put(self, key: str, value: Any, version: Any = None, size: int = 0) -> None:
+        """
+        Store a value, unless a newer version is already cached or the key
+        was invalidated by a newer version.
+
+        :param key: The cache key.
+        :param value: The value to cache.
+        :param version: The value's version; older versions never replace newer.
+        :param size: The approximate size of the value in bytes.
+        """
+        floor = self._floors.get(key)
+        if floor == DELETED or (
+            version is not None and floor is not None and version < floor
+        ):
+            # Read before a write that has since invalidated the key.
+            return
+        if version is not None and floor is not None:
+            del self._floors[key]
+        existing = self._entries.get(key)
+        if existing is not None:
+            if (
+                version is not None
+                and existing.version is not None
+                and existing.version > version
+            ):
+                return
+            self._remove(key)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        self._entries[key] = _Entry(version, value, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or (
+            self.max_bytes is not None and self._bytes > self.max_bytes
+        ):
+            oldest = next((k for k in self._entries if k not in self._pinned), None)
+            if oldest is None:
+                # Only pinned entries are left; they may exceed the bounds.
+                break
+            self._remove(oldest)
+            self.evictions += 1
+            cache_evictions_total.inc(self.name)
+        self._report()
+
+    def pin(self, key: str) -> None:
+        """
+        Exempt a key from eviction.
+
+        :param key: The cache key.
+        """
+        self._pinned.add(key)
+
+    def unpin(self, key: str) -> None:
+        """
+        Make a pinned key evictable again.
+
+        :param key: The cache key.
+        """
+        self._pinned.discard(key)
+
+    def is_pinned(self, key: str) -> bool:
+        """Return whether a key is exempt from eviction."""
+        return key in self._pinned
+
+    def invalidate(self, key: str, version: Any = None) -> None:
+        """
+        Drop an entry.
+
+        :param key: The cache key.
+        :param version: If given, the entry is only dropped when it is older,
+            and older versions are not cached again, even by a read that
+            started before this invalidation and finishes after it.
+        """
+        if version is not None:
+            floor = self._floors.pop(key, None)
+            self._floors[key] = version if floor is None else max(floor, version)
+            # Reads straddling a write finish quickly; remembering as many
+            # keys as the cache holds is plenty.
+            if len(self._floors) > self.max_entries:
+                self._floors.popitem(last=False)
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        if (
+            version is not None
+            and entry.version is not None
+            and entry.version >= version
+        ):
+            return
+        self._remove(key)
+        self._report()
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        self._entries.clear()
+        self._bytes = 0
+        self._report()
+
+    def stats(self) -> dict[str, Any]:
+        """Return hit ratio and memory statistics."""
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "pinned": len(self._pinned),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _report(self) -> None:
+        cache_entries.set(len(self._entries), self.name)
+        cache_bytes.set(self._bytes, self.name)
+
+
+class CacheInvalidationBus:
+    """
+    Broadcasts cache invalidations to every worker through a capped collection.
+
+    Each worker appends invalidations to the capped collection and follows it
+    with a tailable cursor, applying messages published by other workers. This
+    works on a standalone MongoDB, with no replica set or external broker.
+    """
+
+    def __init__(self, collection_bytes: int):
+        """
+        Initializes the bus.
+
+        :param collection_bytes: The size of the capped collection.
+        """
+        self.collection_bytes = collection_bytes
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._caches: dict[str, LRUCache] = {}
+        self._db: AsyncIOMotorDatabase | None = None
+        self._task: asyncio.Task | None = None
+
+    def register(self, cache: LRUCache) -> LRUCache:
+        """
+        Register a cache so it receives remote invalidations.
+
+        :param cache: The cache.
+        :return: The same cache, for chaining.
+        """
+        self._caches[cache.name] = cache
+        return cache
+
+    def caches(self) -> list[LRUCache]:
+        """Return every registered cache."""
+        return list(self._caches.values())
+
+    async def publish(self, cache_name: str, key: str, version: Any = None) -> None:
+        """
+        Invalidate a key locally and in every other worker.
+
+        :param cache_name: The cache name.
+        :param key: The cache key.
+        :param version: The version that made the entry stale, if known.
+        """
+        cache = self._caches.get(cache_name)
+        if cache is not None:
+            cache.invalidate(key, version)
+        if self._db is None:
+            return
+        try:
+            await self._db[INVALIDATION_COLLECTION].insert_one(
+                {
+                    "cache": cache_name,
+                    "key": key,
+                    "version": version,
+                    "origin": self.origin,
+                }
+            )
+        except PyMongoError as exc:
+            logger.warning("Could not publish cache invalidation: %s", exc)
+
+    def apply(self, message: dict[str, Any]) -> None:
+        """
+        Apply an invalidation message received from the bus.
+
+        :param message: The invalidation document.
+        """
+        if message.get("origin") == self.origin:
+            return
+        cache = self._caches.get(message.get("cache"))
+        if cache is not None:
+            cache.invalidate(message["key"], message.get("version"))
+
+    async def start(self, db: AsyncIOMotorDatabase) -> None:
+        """
+        Create the capped collection and start following it.
+
+        :param db: The database instance.
+        """
+        try:
+            await db.create_collection(
+                INVALIDATION_COLLECTION, capped=True, size=self.collection_bytes
+            )
+        except CollectionInvalid:
+            pass
+        collection = db[INVALIDATION_COLLECTION]
+        # A tailable cursor on an empty capped collection dies immediately, so
+        # make sure there is always a document to start from.
+        last = await collection.find_one(sort=[("$natural", -1)])
+        if last is None:
+            result = await collection.insert_one({"cache": None, "origin": None})
+            last = {"_id": result.inserted_id}
+        self._db = db
+        self._task = asyncio.create_task(self._follow(collection, last["_id"]))
+
+    async def stop(self) -> None:
+        """Stop following the bus."""
+        self._db = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def _clear_all(self) -> None:
+        for cache in self._caches.values():
+            cache.clear()
+
+    async def _follow(self, collection, last_id) -> None:
+        # The collection is read in natural (insertion) order, skipping up to
+        # the last message seen. Resuming with ``_id > last_id`` would skip
+        # messages: ObjectIds from different processes are not ordered within
+        # the same second.
+        while True:
+            cursor = collection.find({}, cursor_type=CursorType.TAILABLE_AWAIT)
+            skipping = True
+            try:
+                while cursor.alive:
+                    async for message in cursor:
+                        if skipping:
+                            skipping = message["_id"] != last_id
+                            continue
+                        last_id = message["_id"]
+                        self.apply(message)
+                    if skipping:
+                        # Our position was overwritten before it was read
+                        # again; cached entries may have missed invalidations.
+                        logger.warning("Cache invalidation position lost")
+                        self._clear_all()
+                        skipping = False
+                    await asyncio.sleep(0.1)
+            except PyMongoError as exc:
+                # The capped collection may have wrapped past our position;
+                # cached entries could have missed invalidations meanwhile.
+                logger.warning("Cache invalidation cursor lost: %s", exc)
+                self._clear_all()
+            finally:
+                await cursor.close()
+            await asyncio.sleep(1)
+
+
+invalidation_bus = CacheInvalidationBus(settings.cache_invalidation_collection_bytes)
+
+runbook_cache = invalidation_bus.register(
+    LRUCache(
+        "runbooks",
+        max_entries=settings.runbook_cache_max_entries,
+        max_bytes=settings.runbook_cache_max_bytes,
+    )
+)
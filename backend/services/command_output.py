@@ -0,0 +1,276 @@
+"""Streaming command output into chunked storage."""
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from typing import Any
+
+from bson import ObjectId
+from starlette.concurrency import run_in_threadpool
+
+from backend.config import settings
+from backend.models.execution_environment import ExecutionEnvironment
+from backend.models.runbook import Command
+from backend.models.session import CommandOutput
+from backend.repositories.command_output import CommandOutputRepository
+
+STREAMS = ("stdout", "stderr")
+
+
+class OutputWriter:
+    """
+    Appends a running command's output to chunked storage.
+
+    Full chunks are written once; the partial last chunk is rewritten at most
+    every ``flush_interval`` seconds, so followers see output while the
+    command runs without a write per line.
+    """
+
+    def __init__(
+        self,
+        repo: CommandOutputRepository,
+        output: CommandOutput,
+        flush_interval: float,
+        level: int,
+    ):
+        """
+        Initializes the writer.
+
+        :param repo: The command output repository.
+        :param output: The stream's metadata, as created.
+        :param flush_interval: The most seconds output stays unflushed.
+        :param level: The zlib compression level.
+        """
+        self.repo = repo
+        self.output = output
+        self.flush_interval = flush_interval
+        self.level = level
+        self.length = 0
+        self.line_count = 0
+        self._buffer = bytearray()
+        self._chunk = 0
+        self._last_flush = time.monotonic()
+
+    @property
+    def id(self) -> ObjectId:
+        """The output stream ID."""
+        return self.output.id
+
+    async def write(self, data: bytes) -> None:
+        """
+        Append output.
+
+        :param data: The bytes written by the command.
+        """
+        self._buffer += data
+        self.length += len(data)
+        self.line_count += data.count(b"\n")
+        size = self.output.chunk_size
+        while len(self._buffer) >= size:
+            await self.repo.put_chunk(
+                self.id, self._chunk, bytes(self._buffer[:size]), self.level
+            )
+            del self._buffer[:size]
+            self._chunk += 1
+            await self._progress()
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write the partial last chunk and the current length."""
+        if self._buffer:
+            await self.repo.put_chunk(
+                self.id, self._chunk, bytes(self._buffer), self.level
+            )
+        await self._progress()
+
+    async def close(self, exit_code: int | None = None) -> None:
+        """
+        Flush the remaining output and mark the stream complete.
+
+        :param exit_code: The command's exit code.
+        """
+        if self._buffer:
+            await self.repo.put_chunk(
+                self.id, self._chunk, bytes(self._buffer), self.level
+            )
+        await self.repo.set_progress(
+            self.id, self.length, self.line_count, exit_code, complete=True
+        )
+
+    async def _progress(self) -> None:
+        self._last_flush = time.monotonic()
+        await self.repo.set_progress(self.id, self.length, self.line_count)
+
+
+async def open_output(
+    repo: CommandOutputRepository,
+    session_id: ObjectId,
+    node_id: str,
+    command_index: int,
+    stream: str,
+) -> OutputWriter:
+    """
+    Create an output stream for a command and return its writer.
+
+    :param repo: The command output repository.
+    :param session_id: The session running the command.
+    :param node_id: The action node the command belongs to.
+    :param command_index: The command's position in the node.
+    :param stream: ``stdout`` or ``stderr``.
+    :return: The writer.
+    """
+    output = await repo.create(
+        CommandOutput(
+            session_id=session_id,
+            node_id=node_id,
+            command_index=command_index,
+            stream=stream,
+            chunk_size=settings.command_output_chunk_bytes,
+        )
+    )
+    return OutputWriter(
+        repo,
+        output,
+        flush_interval=settings.command_output_flush_interval_s,
+        level=settings.command_output_zlib_level,
+    )
+
+
+async def _pump(container: Any, stream: str, writer: OutputWriter) -> None:
+    """Copy one stream of a container's output into its writer as it comes."""
+    loop = asyncio.get_running_loop()
+    chunks: asyncio.Queue[bytes | None] = asyncio.Queue()
+
+    def read() -> None:
+        try:
+            for data in container.logs(
+                stdout=stream == "stdout",
+                stderr=stream == "stderr",
+                stream=True,
+                follow=True,
+            ):
+                loop.call_soon_threadsafe(chunks.put_nowait, data)
+        finally:
+            loop.call_soon_threadsafe(chunks.put_nowait, None)
+
+    reader = asyncio.ensure_future(run_in_threadpool(read))
+    while (data := await chunks.get()) is not None:
+        await writer.write(data)
+    await reader
+
+
+async def run_command(
+    repo: CommandOutputRepository,
+    session_id: ObjectId,
+    node_id: str,
+    command_index: int,
+    command: Command,
+    environment: ExecutionEnvironment,
+) -> dict[str, Any]:
+    """
+    Run a command in a container of its runbook's execution environment,
+    storing its stdout and stderr while it runs.
+
+    The container is killed once the command's timeout is reached, or if the
+    caller is cancelled; the output streams are completed either way, so
+    followers stop.
+
+    :param repo: The command output repository.
+    :param session_id: The session running the command.
+    :param node_id: The action node the command belongs to.
+    :param command_index: The command's position in the node.
+    :param command: The command.
+    :param environment: The execution environment to run it in.
+    :return: The exit code, None if the command timed out, and the output IDs.
+    """
+    import docker
+
+    writers = {
+        stream: await open_output(repo, session_id, node_id, command_index, stream)
+        for stream in STREAMS
+    }
+    limits = environment.resource_limits
+    exit_code = None
+    container = None
+    pumps = None
+    try:
+        container = await run_in_threadpool(
+            lambda: docker.from_env().containers.run(
+                environment.base_image,
+                ["sh", "-c", command.command],
+                detach=True,
+                environment=environment.environment_variables,
+                network_mode=environment.network_mode,
+                mem_limit=f"{limits.memory_mb}m",
+                nano_cpus=int(limits.cpu_limit * 1e9),
+                volumes={
+                    volume.host_path: {
+                        "bind": volume.container_path,
+                        "mode": "ro" if volume.read_only else "rw",
+                    }
+                    for volume in environment.volumes
+                },
+            )
+        )
+        pumps = asyncio.gather(
+            *(_pump(container, stream, writers[stream]) for stream in STREAMS)
+        )
+        try:
+            status = await asyncio.wait_for(
+                run_in_threadpool(container.wait), command.timeout_seconds
+            )
+            exit_code = status["StatusCode"]
+        except TimeoutError:
+            await run_in_threadpool(container.kill)
+        await pumps
+    finally:
+        if pumps is not None:
+            pumps.cancel()
+        for writer in writers.values():
+            await writer.close(exit_code)
+        if container is not None:
+            await run_in_threadpool(lambda: container.remove(force=True))
+    return {
+        "exit_code": exit_code,
+        "outputs": {stream: str(writer.id) for stream, writer in writers.items()},
+    }
+
+
+async def follow(
+    repo: CommandOutputRepository,
+    output_id: str,
+    offset: int,
+    poll_interval: float,
+    max_read: int,
+    idle_timeout: float,
+) -> AsyncIterator[bytes]:
+    """
+    Yield a stream's output from an offset as it is written.
+
+    :param repo: The command output repository.
+    :param output_id: The output stream ID.
+    :param offset: The offset to start from.
+    :param poll_interval: Seconds between checks for new output.
+    :param max_read: The most bytes read per step.
+    :param idle_timeout: Seconds without new output after which to give up on
+        a stream that is never completed, as when its writer died.
+    :return: An iterator ending once the stream is complete and fully read,
+        or has been idle for ``idle_timeout``.
+    """
+    last_output = time.monotonic()
+    while True:
+        output = await repo.get(output_id)
+        if output is None:
+            return
+        while offset < output.length:
+            data = await repo.read_range(output, offset, offset + max_read)
+            if not data:
+                break
+            offset += len(data)
+            last_output = time.monotonic()
+            yield data
+        if output.complete and offset >= output.length:
+            return
+        if time.monotonic() - last_output >= idle_timeout:
+            return
+        await asyncio.sleep(poll_interval)
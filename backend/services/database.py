@@ -1,7 +1,20 @@
 """Database connection and utilities."""
+import asyncio
+import logging
+import re
+
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo.errors import PyMongoError
 
 from backend.config import settings
+from backend.services.metrics import mongo_command_metrics, registry
+from backend.services.slow_query import slow_query_recorder
+
+logger = logging.getLogger(__name__)
+
+mongodb_up = registry.gauge(
+    "mongodb_up", "Whether the last MongoDB health check succeeded."
+)
 
 
 class Database:
@@ -9,18 +22,63 @@ class Database:
 
     client: AsyncIOMotorClient | None = None
     db: AsyncIOMotorDatabase | None = None
+    # Updated by a periodic ping; read-only endpoints fall back to the local
+    # runbook snapshot while it is False.
+    healthy: bool = True
+    _health_task: asyncio.Task | None = None
 
     async def connect(self):
         """Connect to the MongoDB database."""
-        self.client = AsyncIOMotorClient(settings.mongodb_uri)
+        self.client = AsyncIOMotorClient(
+            settings.mongodb_uri,
+            event_listeners=[mongo_command_metrics, slow_query_recorder],
+        )
         self.db = self.client[settings.db_name]
-        print(f"Connected to MongoDB at {settings.mongodb_uri}")
+        await slow_query_recorder.start(self.db)
+        self._health_task = asyncio.create_task(self._check_health())
+        # Credentials in the URI must not reach the logs.
+        uri = re.sub(r"//[^@/]*@", "//***@", settings.mongodb_uri)
+        logger.info("Connected to MongoDB at %s", uri)
 
     async def disconnect(self):
         """Disconnect from the MongoDB database."""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        await slow_query_recorder.stop()
         if self.client:
             self.client.close()
-            print("Disconnected from MongoDB")
+            logger.info("Disconnected from MongoDB")
+
+    async def ping(self) -> bool:
+        """
+        Check that MongoDB answers within the health check timeout.
+
+        :return: True if it does.
+        """
+        try:
+            await asyncio.wait_for(
+                self.client.admin.command("ping"), settings.db_health_timeout_s
+            )
+        except (PyMongoError, TimeoutError):
+            return False
+        return True
+
+    async def _check_health(self) -> None:
+        while True:
+            healthy = await self.ping()
+            if healthy != self.healthy:
+                if healthy:
+                    logger.warning("MongoDB is reachable again")
+                else:
+                    logger.warning("MongoDB is unreachable; serving degraded reads")
+            self.healthy = healthy
+            mongodb_up.set(1 if healthy else 0)
+            await asyncio.sleep(settings.db_health_interval_s)
 
 
 db = Database()
@@ -0,0 +1,128 @@
+"""Per-request batched loading of referenced documents."""
+import asyncio
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Any
+
+from fastapi import Depends
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from backend.repositories.runbook import RunbookRepository
+from backend.repositories.user import UserRepository
+from backend.services.database import get_db
+from backend.services.metrics import registry
+
+dataloader_batches_total = registry.counter(
+    "dataloader_batches_total",
+    "Batched lookups issued by request dataloaders.",
+    ("loader",),
+)
+dataloader_keys_total = registry.counter(
+    "dataloader_keys_total",
+    "Keys resolved by request dataloaders, including memoized ones.",
+    ("loader", "result"),
+)
+
+BatchFn = Callable[[list[str]], Awaitable[dict[str, Any]]]
+
+
+class DataLoader:
+    """
+    Coalesces lookups made in the same event-loop tick into one batch.
+
+    Every key requested before the loop gets back to the scheduler is resolved
+    with a single call to the batch function, and results are memoized for the
+    loader's lifetime, which is meant to be a single request.
+    """
+
+    def __init__(self, name: str, batch_fn: BatchFn):
+        """
+        Initializes the loader.
+
+        :param name: The loader name used in metrics.
+        :param batch_fn: Resolves a list of keys to a dict of the found values.
+        """
+        self.name = name
+        self.batch_fn = batch_fn
+        self._futures: dict[str, asyncio.Future] = {}
+        self._queue: list[str] = []
+
+    async def load(self, key: Any) -> Any | None:
+        """
+        Load a value by key.
+
+        :param key: The key; it is normalized to a string.
+        :return: The value, or None if the batch function did not find it.
+        """
+        key = str(key)
+        future = self._futures.get(key)
+        if future is not None:
+            dataloader_keys_total.inc(self.name, "memoized")
+            return await future
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._futures[key] = future
+        if not self._queue:
+            loop.call_soon(self._dispatch)
+        self._queue.append(key)
+        return await future
+
+    async def load_many(self, keys: Iterable[Any]) -> list[Any | None]:
+        """
+        Load several values in one batch.
+
+        :param keys: The keys.
+        :return: The values, in key order, with None for missing ones.
+        """
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def prime(self, key: Any, value: Any) -> None:
+        """
+        Seed the loader with a value that is already known.
+
+        :param key: The key.
+        :param value: The value.
+        """
+        key = str(key)
+        if key not in self._futures:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(value)
+            self._futures[key] = future
+
+    def _dispatch(self) -> None:
+        keys, self._queue = self._queue, []
+        asyncio.ensure_future(self._resolve(keys))
+
+    async def _resolve(self, keys: list[str]) -> None:
+        dataloader_batches_total.inc(self.name)
+        dataloader_keys_total.inc(self.name, "fetched", amount=len(keys))
+        try:
+            found = await self.batch_fn(keys)
+        except Exception as exc:
+            for key in keys:
+                # Failed keys are retried by the next load instead of memoized.
+                future = self._futures.pop(key)
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for key in keys:
+            future = self._futures[key]
+            if not future.done():
+                future.set_result(found.get(key))
+
+
+class RequestLoaders:
+    """The dataloaders of a single request."""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        """
+        Initializes the loaders.
+
+        :param db: The database instance.
+        """
+        self.users = DataLoader("users", UserRepository(db).get_many)
+        self.runbooks = DataLoader("runbooks", RunbookRepository(db).get_many)
+
+
+async def get_loaders(db=Depends(get_db)) -> RequestLoaders:
+    """FastAPI dependency returning fresh dataloaders for each request."""
+    return RequestLoaders(db)
@@ -0,0 +1,324 @@
+"""Background job execution."""
+import asyncio
+import logging
+import random
+import time
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import PyMongoError
+from starlette.concurrency import run_in_threadpool
+
+from backend.config import settings
+from backend.models.enums import JobStatus
+from backend.models.job import Job
+from backend.repositories.command_output import CommandOutputRepository
+from backend.repositories.job import JobRepository
+from backend.repositories.runbook import RunbookRepository
+from backend.repositories.session import SessionRepository
+from backend.services.archive import session_archiver
+from backend.services.command_output import run_command
+
+logger = logging.getLogger(__name__)
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler when its job has been cancelled."""
+
+
+class JobLeaseLost(Exception):
+    """Raised inside a handler when its worker no longer owns the job."""
+
+
+class JobContext:
+    """What a job handler gets to talk back to the queue."""
+
+    def __init__(self, job: Job, repo: JobRepository, worker_id: str, lease: timedelta):
+        """
+        Initializes the context.
+
+        :param job: The job being run.
+        :param repo: The job repository.
+        :param worker_id: The worker running the job.
+        :param lease: The lease renewed on every report.
+        """
+        self.job = job
+        self.db = repo.db
+        self._repo = repo
+        self._worker_id = worker_id
+        self._lease = lease
+        self.lease_lost = False
+
+    async def report(self, progress: float | None, message: str | None = None) -> None:
+        """
+        Report progress and renew the job's lease.
+
+        :param progress: The completed fraction, or None if unknown.
+        :param message: A short description of the current step.
+        :raises JobCancelled: If the job has been cancelled.
+        :raises JobLeaseLost: If another worker took the job over.
+        """
+        job = await self._repo.heartbeat(
+            str(self.job.id), self._worker_id, self._lease, progress, message
+        )
+        if job is None:
+            self.lease_lost = True
+            raise JobLeaseLost(str(self.job.id))
+        if job.cancel_requested:
+            self.job.cancel_requested = True
+            raise JobCancelled(str(self.job.id))
+
+
+JobHandler = Callable[[JobContext, dict[str, Any]], Awaitable[dict[str, Any] | None]]
+
+job_handlers: dict[str, JobHandler] = {}
+
+
+def job_handler(kind: str) -> Callable[[JobHandler], JobHandler]:
+    """
+    Register a coroutine as the handler of a job kind.
+
+    :param kind: The job kind.
+    :return: A decorator registering the handler.
+    """
+
+    def register(handler: JobHandler) -> JobHandler:
+        job_handlers[kind] = handler
+        return handler
+
+    return register
+
+
+def retry_delay(attempt: int, base: float, maximum: float) -> float:
+    """
+    Compute the exponential backoff before retrying a job, with full jitter.
+
+    :param attempt: The attempt that just failed, starting at 1.
+    :param base: The delay after the first failure.
+    :param maximum: The largest delay.
+    :return: The delay in seconds.
+    """
+    return random.uniform(0, min(maximum, base * 2 ** (attempt - 1)))
+
+
+class JobWorker:
+    """Claims jobs from the queue and runs them, a few at a time."""
+
+    def __init__(
+        self,
+        db: AsyncIOMotorDatabase,
+        worker_id: str,
+        handlers: dict[str, JobHandler],
+        concurrency: int,
+        poll_interval: float,
+        lease: timedelta,
+        retry_base: float,
+        retry_max: float,
+        periodic: dict[str, float] | None = None,
+    ):
+        """
+        Initializes the worker.
+
+        :param db: The database instance.
+        :param worker_id: A unique name for this worker.
+        :param handlers: The handlers by job kind.
+        :param concurrency: The most jobs run at once.
+        :param poll_interval: Seconds to wait when the queue is empty.
+        :param lease: How long a claim lasts without a heartbeat.
+        :param retry_base: The backoff after a job's first failure.
+        :param retry_max: The largest backoff.
+        :param periodic: Job kinds to queue once per period, with the period
+            in seconds.
+        """
+        self.repo = JobRepository(db)
+        self.worker_id = worker_id
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.periodic = periodic or {}
+        self._running: set[asyncio.Task] = set()
+
+    async def run_once(self) -> bool:
+        """
+        Claim and run a single job.
+
+        :return: False if there was no job to run.
+        """
+        job = await self.repo.claim(self.worker_id, list(self.handlers), self.lease)
+        if job is None:
+            return False
+        await self.execute(job)
+        return True
+
+    async def schedule(self) -> None:
+        """Queue the periodic jobs, each at the start of its period."""
+        while True:
+            for kind, interval in self.periodic.items():
+                try:
+                    await self.repo.enqueue_periodic(kind, interval)
+                except PyMongoError as exc:
+                    logger.warning("Could not schedule a %s job: %s", kind, exc)
+            now = time.time()
+            await asyncio.sleep(
+                min(interval - now % interval for interval in self.periodic.values())
+            )
+
+    async def run(self) -> None:
+        """Run jobs until cancelled, keeping up to ``concurrency`` in flight."""
+        slots = asyncio.Semaphore(self.concurrency)
+        scheduler = asyncio.create_task(self.schedule()) if self.periodic else None
+        try:
+            while True:
+                await slots.acquire()
+                try:
+                    job = await self.repo.claim(
+                        self.worker_id, list(self.handlers), self.lease
+                    )
+                except PyMongoError as exc:
+                    logger.warning("Could not claim a job: %s", exc)
+                    job = None
+                if job is None:
+                    slots.release()
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                task = asyncio.create_task(self.execute(job))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+                task.add_done_callback(lambda _: slots.release())
+        finally:
+            if scheduler is not None:
+                scheduler.cancel()
+            for task in self._running:
+                task.cancel()
+            await asyncio.gather(*self._running, return_exceptions=True)
+
+    async def execute(self, job: Job) -> None:
+        """
+        Run a claimed job and record its outcome.
+
+        :param job: The claimed job.
+        """
+        id = str(job.id)
+        if job.cancel_requested:
+            await self.repo.finish(id, self.worker_id, JobStatus.CANCELLED)
+            return
+        if job.attempts > job.max_attempts:
+            # Reclaimed after its workers died too many times.
+            await self.repo.finish(
+                id, self.worker_id, JobStatus.FAILED, error="Lease expired"
+            )
+            return
+
+        context = JobContext(job, self.repo, self.worker_id, self.lease)
+        handler = asyncio.create_task(self.handlers[job.kind](context, job.payload))
+        heartbeat = asyncio.create_task(self._heartbeat(context, handler))
+        try:
+            result = await handler
+        except (JobCancelled, JobLeaseLost, asyncio.CancelledError):
+            if context.job.cancel_requested:
+                await self.repo.finish(id, self.worker_id, JobStatus.CANCELLED)
+            elif context.lease_lost:
+                logger.warning("Lost the lease on job %s", id)
+            else:
+                raise
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            if job.attempts < job.max_attempts:
+                delay = retry_delay(job.attempts, self.retry_base, self.retry_max)
+                run_after = datetime.now(UTC) + timedelta(seconds=delay)
+                await self.repo.retry(id, self.worker_id, error, run_after)
+            else:
+                await self.repo.finish(
+                    id, self.worker_id, JobStatus.FAILED, error=error
+                )
+        else:
+            await self.repo.finish(id, self.worker_id, JobStatus.SUCCEEDED, result)
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, context: JobContext, handler: asyncio.Task) -> None:
+        """Keep the lease alive for handlers that rarely report progress."""
+        while True:
+            await asyncio.sleep(self.lease.total_seconds() / 3)
+            try:
+                await context.report(None)
+            except (JobCancelled, JobLeaseLost):
+                handler.cancel()
+                return
+            except PyMongoError as exc:
+                logger.warning("Job heartbeat failed: %s", exc)
+
+
+@job_handler("archive_sessions")
+async def archive_sessions(context: JobContext, payload: dict) -> dict:
+    """Archive every eligible finished session, batch by batch."""
+
+    async def report(total: int) -> None:
+        await context.report(None, f"Archived {total} sessions")
+
+    return {"archived": await session_archiver.run_once(context.db, report)}
+
+
+# Job kinds the workers queue themselves, with their period in seconds.
+periodic_jobs: dict[str, float] = {
+    "archive_sessions": settings.session_archive_interval_s,
+}
+
+
+@job_handler("pull_image")
+async def pull_image(context: JobContext, payload: dict) -> dict:
+    """Pull an execution environment image onto the Docker host."""
+    import docker
+
+    image = payload["image"]
+    await context.report(0.0, f"Pulling {image}")
+    pulled = await run_in_threadpool(lambda: docker.from_env().images.pull(image))
+    return {"image": image, "id": pulled.id}
+
+
+@job_handler("run_command")
+async def run_action_command(context: JobContext, payload: dict) -> dict:
+    """Run one command of a session's action node, storing its output."""
+    session = await SessionRepository(context.db).get(payload["session_id"])
+    runbook = None
+    if session is not None:
+        runbook = await RunbookRepository(context.db).get(str(session.runbook_id))
+    if runbook is None:
+        raise ValueError("The session or its runbook no longer exists")
+    node = runbook.decision_tree.nodes[payload["node_id"]]
+    index = payload["command_index"]
+    await context.report(None, f"Running {node.commands[index].command}")
+    return await run_command(
+        CommandOutputRepository(context.db),
+        session.id,
+        node.id,
+        index,
+        node.commands[index],
+        runbook.execution_environment,
+    )
+
+
+def create_worker(db: AsyncIOMotorDatabase, worker_id: str) -> JobWorker:
+    """
+    Build a worker running every registered job kind with the configured limits.
+
+    :param db: The database instance.
+    :param worker_id: A unique name for the worker.
+    :return: The worker.
+    """
+    return JobWorker(
+        db,
+        worker_id,
+        job_handlers,
+        concurrency=settings.job_worker_concurrency,
+        poll_interval=settings.job_poll_interval_s,
+        lease=timedelta(seconds=settings.job_lease_s),
+        retry_base=settings.job_retry_base_s,
+        retry_max=settings.job_retry_max_s,
+        periodic=periodic_jobs,
+    )
@@ -0,0 +1,371 @@
+"""In-process metrics collection with Prometheus text exposition."""
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Iterable
+from typing import TypeVar
+
+from pymongo import monitoring
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+DEFAULT_LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value the way Prometheus expects."""
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    """Escape a label value for the text exposition format."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    """Render a label set as ``{a="1",b="2"}``."""
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape_label(value)}"'
+        for name, value in zip(names, values, strict=True)
+    )
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    """Common state shared by all metric types."""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        """
+        Initializes the metric.
+
+        :param name: The metric name.
+        :param documentation: The HELP text.
+        :param labelnames: The label names, in order.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: tuple[str, ...]) -> tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {labels}"
+            )
+        return labels
+
+    def samples(self) -> list[tuple[str, str, float]]:
+        """Return ``(suffix, labels, value)`` samples for rendering."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """Render the metric in the Prometheus text format."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """A monotonically increasing counter."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        """
+        Increment the counter.
+
+        :param labels: The label values.
+        :param amount: The amount to add.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        """Return the current value for a label set."""
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> list[tuple[str, str, float]]:
+        with self._lock:
+            items = list(self._values.items())
+        return [("", _format_labels(self.labelnames, k), v) for k, v in items]
+
+
+class Gauge(_Metric):
+    """A value that can go up and down."""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        """Increase the gauge."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        """Decrease the gauge."""
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str) -> None:
+        """Set the gauge to an absolute value."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, *labels: str) -> float:
+        """Return the current value for a label set."""
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> list[tuple[str, str, float]]:
+        with self._lock:
+            items = list(self._values.items())
+        return [("", _format_labels(self.labelnames, k), v) for k, v in items]
+
+
+class Histogram(_Metric):
+    """A histogram with fixed upper bounds."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts..., +Inf count], sum
+        self._counts: dict[tuple[str, ...], list[int]] = {}
+        self._sums: dict[tuple[str, ...], float] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        """
+        Record an observation.
+
+        :param value: The observed value.
+        :param labels: The label values.
+        """
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    def count(self, *labels: str) -> int:
+        """Return the number of observations for a label set."""
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def total(self, *labels: str) -> float:
+        """Return the sum of observations for a label set."""
+        return self._sums.get(self._key(labels), 0.0)
+
+    def samples(self) -> list[tuple[str, str, float]]:
+        with self._lock:
+            items = [(k, list(c), self._sums[k]) for k, c in self._counts.items()]
+        bucket_names = self.labelnames + ("le",)
+        out: list[tuple[str, str, float]] = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(
+                self.buckets + (float("inf"),), counts, strict=True
+            ):
+                cumulative += count
+                labels = _format_labels(bucket_names, key + (_format_value(bound),))
+                out.append(("_bucket", labels, cumulative))
+            labels = _format_labels(self.labelnames, key)
+            out.append(("_sum", labels, total))
+            out.append(("_count", labels, cumulative))
+        return out
+
+
+MetricT = TypeVar("MetricT", bound=_Metric)
+
+
+class MetricsRegistry:
+    """A collection of named metrics."""
+
+    def __init__(self):
+        """Initializes an empty registry."""
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: MetricT) -> MetricT:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"Metric {metric.name} already registered")
+                return existing  # type: ignore[return-value]
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Iterable[str] = ()
+    ) -> Counter:
+        """Get or create a counter."""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Iterable[str] = ()
+    ) -> Gauge:
+        """Get or create a gauge."""
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        """Get or create a histogram."""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Render every registered metric in the Prometheus text format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests_total = registry.counter(
+    "http_requests_total",
+    "Total HTTP requests by method, route and status code.",
+    ("method", "route", "status"),
+)
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by method and route.",
+    ("method", "route"),
+)
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served.",
+    ("method",),
+)
+mongo_commands_total = registry.counter(
+    "mongo_commands_total",
+    "MongoDB commands by collection, command and outcome.",
+    ("collection", "command", "outcome"),
+)
+mongo_command_duration_seconds = registry.histogram(
+    "mongo_command_duration_seconds",
+    "MongoDB command latency by collection and command.",
+    ("collection", "command"),
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency, status and concurrency."""
+
+    def __init__(self, app: ASGIApp, excluded_paths: Iterable[str] = ("/metrics",)):
+        """
+        Initializes the middleware.
+
+        :param app: The wrapped ASGI application.
+        :param excluded_paths: Paths that are not recorded.
+        """
+        self.app = app
+        self.excluded_paths = frozenset(excluded_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc(method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_flight.dec(method)
+            # The router stores the matched route on the scope; using its path
+            # template keeps label cardinality bounded.
+            route = scope.get("route")
+            route_name = getattr(route, "path", None) or "unmatched"
+            http_request_duration_seconds.observe(elapsed, method, route_name)
+            http_requests_total.inc(method, route_name, str(status_code))
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """pymongo command listener recording per-collection command timings."""
+
+    def __init__(self):
+        """Initializes the listener."""
+        self._pending: dict[tuple, str] = {}
+
+    @staticmethod
+    def _event_key(event) -> tuple:
+        return (event.connection_id, event.request_id)
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = "-"
+        self._pending[self._event_key(event)] = collection
+
+    def _finish(self, event, outcome: str) -> None:
+        collection = self._pending.pop(self._event_key(event), "-")
+        seconds = event.duration_micros / 1_000_000
+        mongo_command_duration_seconds.observe(seconds, collection, event.command_name)
+        mongo_commands_total.inc(collection, event.command_name, outcome)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event, "success")
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event, "failure")
+
+
+mongo_command_metrics = MongoCommandMetrics()
@@ -0,0 +1,151 @@
+"""In-process rate limiting and admission control."""
+import asyncio
+import time
+from collections import OrderedDict
+
+from backend.config import settings
+from backend.services.metrics import registry
+
+admission_rejections_total = registry.counter(
+    "admission_rejections_total",
+    "Requests shed by rate limiters and concurrency gates.",
+    ("limiter",),
+)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed by a limiter or gate."""
+
+    def __init__(self, limiter: str, retry_after: float, status_code: int = 429):
+        """
+        Initializes the exception.
+
+        :param limiter: The name of the limiter that rejected the request.
+        :param retry_after: Seconds the client should wait before retrying.
+        :param status_code: The HTTP status to answer with.
+        """
+        super().__init__(f"{limiter} rejected the request")
+        self.limiter = limiter
+        self.retry_after = retry_after
+        self.status_code = status_code
+
+
+class TokenBucketLimiter:
+    """
+    A keyed token-bucket rate limiter with bounded memory.
+
+    Each key holds a ``(tokens, updated_at)`` tuple in an LRU-ordered dict; the
+    least recently used key is evicted once ``max_keys`` is reached. An evicted
+    key simply starts again with a full bucket.
+    """
+
+    def __init__(self, name: str, rate_per_sec: float, burst: int, max_keys: int):
+        """
+        Initializes the limiter.
+
+        :param name: The limiter name used in metrics.
+        :param rate_per_sec: Tokens added to each bucket per second.
+        :param burst: The bucket capacity.
+        :param max_keys: The maximum number of tracked keys.
+        """
+        self.name = name
+        self.rate = rate_per_sec
+        self.burst = float(burst)
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def acquire(self, key: str, now: float | None = None) -> None:
+        """
+        Take one token for ``key``.
+
+        :param key: The bucket key, e.g. a client IP.
+        :param now: The current monotonic time, for testing.
+        :raises AdmissionRejected: If the bucket is empty.
+        """
+        if now is None:
+            now = time.monotonic()
+        buckets = self._buckets
+        state = buckets.pop(key, None)
+        if state is None:
+            tokens = self.burst
+            if len(buckets) >= self.max_keys:
+                buckets.popitem(last=False)
+        else:
+            tokens = min(self.burst, state[0] + (now - state[1]) * self.rate)
+
+        if tokens < 1.0:
+            buckets[key] = (tokens, now)
+            admission_rejections_total.inc(self.name)
+            raise AdmissionRejected(self.name, (1.0 - tokens) / self.rate)
+        buckets[key] = (tokens - 1.0, now)
+
+
+class ConcurrencyGate:
+    """
+    Bounds concurrent executions of an expensive operation.
+
+    Callers beyond ``max_concurrent`` wait in a bounded queue; when the queue is
+    full or the wait exceeds ``timeout`` they are rejected immediately instead
+    of piling up.
+    """
+
+    def __init__(
+        self, name: str, max_concurrent: int, max_waiting: int, timeout: float
+    ):
+        """
+        Initializes the gate.
+
+        :param name: The gate name used in metrics.
+        :param max_concurrent: The number of callers allowed in at once.
+        :param max_waiting: The number of callers allowed to queue.
+        :param timeout: The longest a caller may wait, in seconds.
+        """
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._waiting = 0
+
+    async def __aenter__(self) -> "ConcurrencyGate":
+        if self._semaphore.locked():
+            if self._waiting >= self.max_waiting:
+                admission_rejections_total.inc(self.name)
+                raise AdmissionRejected(self.name, self.timeout, 503)
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+            except TimeoutError:
+                admission_rejections_total.inc(self.name)
+                raise AdmissionRejected(self.name, self.timeout, 503) from None
+            finally:
+                self._waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._semaphore.release()
+
+
+login_ip_limiter = TokenBucketLimiter(
+    "login_ip",
+    settings.login_ip_rate_per_min / 60,
+    settings.login_ip_burst,
+    settings.rate_limit_max_keys,
+)
+login_account_limiter = TokenBucketLimiter(
+    "login_account",
+    settings.login_account_rate_per_min / 60,
+    settings.login_account_burst,
+    settings.rate_limit_max_keys,
+)
+password_verification_gate = ConcurrencyGate(
+    "password_verification",
+    settings.password_verify_max_concurrent,
+    settings.password_verify_max_waiting,
+    settings.password_verify_timeout_s,
+)
@@ -0,0 +1,119 @@
+"""In-memory revocation list for access tokens."""
+import asyncio
+import logging
+import time
+from datetime import UTC, datetime, timedelta
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import PyMongoError
+
+from backend.config import settings
+from backend.repositories.refresh_token import RefreshTokenRepository
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationList:
+    """
+    Set of revoked refresh-token families, checked on every authenticated request.
+
+    Access tokens carry the family of the refresh token they were issued with.
+    A family only needs to be remembered for as long as an access token issued
+    from it may still be valid, so entries expire after the access token TTL.
+    The list is rebuilt from MongoDB at startup and then polled periodically,
+    keeping the per-request check a local dict lookup.
+    """
+
+    def __init__(self, retention_seconds: float, poll_interval: float):
+        """
+        Initializes the revocation list.
+
+        :param retention_seconds: How long a revoked family is remembered.
+        :param poll_interval: Seconds between polls for revocations made by
+            other worker processes.
+        """
+        self.retention_seconds = retention_seconds
+        self.poll_interval = poll_interval
+        self._revoked: dict[str, float] = {}
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def revoke(self, family_id: str) -> None:
+        """
+        Mark a token family as revoked.
+
+        :param family_id: The family ID.
+        """
+        self._revoked[family_id] = time.time() + self.retention_seconds
+
+    def is_revoked(self, family_id: str | None) -> bool:
+        """
+        Check whether a token family has been revoked.
+
+        :param family_id: The family ID from the access token, if any.
+        :return: True if access tokens of this family must be rejected.
+        """
+        if family_id is None:
+            return False
+        expires = self._revoked.get(family_id)
+        if expires is None:
+            return False
+        if expires < time.time():
+            self._revoked.pop(family_id, None)
+            return False
+        return True
+
+    def purge(self) -> None:
+        """Drop entries whose access tokens have all expired."""
+        now = time.time()
+        for family_id in [k for k, v in self._revoked.items() if v < now]:
+            del self._revoked[family_id]
+
+    async def load(self, repo: RefreshTokenRepository) -> None:
+        """
+        Add every family revoked within the retention window.
+
+        :param repo: The refresh token repository.
+        """
+        since = datetime.now(UTC) - timedelta(seconds=self.retention_seconds)
+        expires = time.time() + self.retention_seconds
+        for family_id in await repo.revoked_families_since(since):
+            self._revoked.setdefault(family_id, expires)
+
+    async def start(self, db: AsyncIOMotorDatabase) -> None:
+        """
+        Rebuild the list and start polling for new revocations.
+
+        :param db: The database instance.
+        """
+        repo = RefreshTokenRepository(db)
+        await repo.ensure_indexes()
+        await self.load(repo)
+        self._task = asyncio.create_task(self._poll(repo))
+
+    async def stop(self) -> None:
+        """Stop polling for revocations."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _poll(self, repo: RefreshTokenRepository) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            self.purge()
+            try:
+                await self.load(repo)
+            except PyMongoError as exc:
+                logger.warning("Could not refresh the revocation list: %s", exc)
+
+
+revocation_list = RevocationList(
+    retention_seconds=settings.access_token_ttl_min * 60,
+    poll_interval=settings.revocation_poll_interval_s,
+)
@@ -0,0 +1,221 @@
+"""
+Local runbook snapshot for serving reads while MongoDB is unavailable.
+
+The snapshot is a single file::
+
+    header   magic, document count, index offset, creation time
+    body     the stored runbook documents as raw BSON, newest first
+    index    (ObjectId, offset, length) records sorted by ObjectId
+
+It is memory-mapped read-only, so opening it only parses the header, a
+lookup is a binary search over the index, and every worker process on the
+host shares the same pages through the page cache.
+"""
+import asyncio
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+from collections.abc import Iterator
+from datetime import UTC, datetime
+
+import bson
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import DESCENDING
+from pymongo.errors import PyMongoError
+from starlette.concurrency import run_in_threadpool
+
+from backend.config import settings
+from backend.services.bson_json import RAW_CODEC_OPTIONS
+from backend.services.database import db as database
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"RBSNAP01"
+_HEADER = struct.Struct("<8sIQd")
+_INDEX_ENTRY = struct.Struct("<12sQI")
+
+
+class RunbookSnapshot:
+    """Writes the runbook snapshot periodically and reads it on demand."""
+
+    def __init__(self, path: str, interval: float):
+        """
+        Initializes the snapshot.
+
+        :param path: The snapshot file.
+        :param interval: Seconds between snapshots.
+        """
+        self.path = path
+        self.interval = interval
+        self.count = 0
+        self.created_at: datetime | None = None
+        self._mmap: mmap.mmap | None = None
+        self._index_offset = 0
+        self._inode: int | None = None
+        self._task: asyncio.Task | None = None
+
+    async def write(self, db: AsyncIOMotorDatabase) -> int:
+        """
+        Dump every runbook into a new snapshot, replacing the old one atomically.
+
+        The documents are read on the event loop; the file is written and
+        synced in a thread, so requests are not held up by the disk.
+
+        :param db: The database instance.
+        :return: The number of runbooks written.
+        """
+        collection = db["runbooks"].with_options(codec_options=RAW_CODEC_OPTIONS)
+        cursor = collection.find({}).sort("updated_at", DESCENDING)
+        documents = [(raw["_id"].binary, raw.raw) async for raw in cursor]
+        await run_in_threadpool(self._write_file, documents)
+        return len(documents)
+
+    def _write_file(self, documents: list[tuple[bytes, bytes]]) -> None:
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        index: list[tuple[bytes, int, int]] = []
+        fd, tmp = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(b"\0" * _HEADER.size)
+                offset = _HEADER.size
+                for id, data in documents:
+                    index.append((id, offset, len(data)))
+                    f.write(data)
+                    offset += len(data)
+                index.sort()
+                for entry in index:
+                    f.write(_INDEX_ENTRY.pack(*entry))
+                f.seek(0)
+                f.write(_HEADER.pack(MAGIC, len(index), offset, time.time()))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def load(self) -> bool:
+        """
+        Map the snapshot file, or re-map it if it was replaced since.
+
+        :return: False if there is no usable snapshot.
+        """
+        try:
+            inode = os.stat(self.path).st_ino
+        except OSError:
+            return self._mmap is not None
+        if inode == self._inode:
+            return True
+        try:
+            with open(self.path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as exc:
+            logger.warning("Could not map the runbook snapshot: %s", exc)
+            return self._mmap is not None
+        if len(mapped) >= _HEADER.size:
+            magic, count, index_offset, created = _HEADER.unpack_from(mapped)
+        else:
+            magic, count, index_offset, created = b"", 0, 0, 0.0
+        if magic != MAGIC or index_offset + count * _INDEX_ENTRY.size != len(mapped):
+            logger.warning("Ignoring malformed runbook snapshot %s", self.path)
+            mapped.close()
+            return self._mmap is not None
+        if self._mmap is not None:
+            self._mmap.close()
+        self._mmap = mapped
+        self._inode = inode
+        self.count = count
+        self._index_offset = index_offset
+        self.created_at = datetime.fromtimestamp(created, UTC)
+        return True
+
+    def get(self, runbook_id: str) -> dict | None:
+        """
+        Read one runbook from the snapshot.
+
+        :param runbook_id: The runbook ID.
+        :return: The stored document, or None if it is not in the snapshot.
+        """
+        if not self.load() or not ObjectId.is_valid(runbook_id):
+            return None
+        key = ObjectId(runbook_id).binary
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            position = self._index_offset + mid * _INDEX_ENTRY.size
+            entry_id, offset, length = _INDEX_ENTRY.unpack_from(self._mmap, position)
+            if entry_id < key:
+                low = mid + 1
+            elif entry_id > key:
+                high = mid
+            else:
+                return bson.decode(self._mmap[offset : offset + length])
+        return None
+
+    def documents(self) -> Iterator[dict]:
+        """
+        Iterate over every runbook in the snapshot, most recently updated first.
+
+        :return: The stored documents.
+        """
+        if not self.load():
+            return
+        position = _HEADER.size
+        while position < self._index_offset:
+            (length,) = struct.unpack_from("<i", self._mmap, position)
+            yield bson.decode(self._mmap[position : position + length])
+            position += length
+
+    def is_fresh(self) -> bool:
+        """Return whether a snapshot was written within the last interval."""
+        try:
+            return time.time() - os.stat(self.path).st_mtime < self.interval / 2
+        except OSError:
+            return False
+
+    async def start(self, db: AsyncIOMotorDatabase) -> None:
+        """
+        Map the existing snapshot and start writing new ones periodically.
+
+        :param db: The database instance.
+        """
+        self.load()
+        self._task = asyncio.create_task(self._poll(db))
+
+    async def stop(self) -> None:
+        """Stop writing snapshots and unmap the current one."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+            self._inode = None
+
+    async def _poll(self, db: AsyncIOMotorDatabase) -> None:
+        while True:
+            # Every worker runs this loop; whichever gets there first writes
+            # the snapshot and the others pick it up.
+            if database.healthy and not self.is_fresh():
+                try:
+                    count = await self.write(db)
+                    logger.info("Wrote runbook snapshot of %d runbooks", count)
+                except PyMongoError as exc:
+                    logger.warning("Could not write the runbook snapshot: %s", exc)
+            self.load()
+            await asyncio.sleep(self.interval)
+
+
+runbook_snapshot = RunbookSnapshot(
+    path=settings.runbook_snapshot_path,
+    interval=settings.runbook_snapshot_interval_s,
+)
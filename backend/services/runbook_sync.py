@@ -0,0 +1,45 @@
+"""Catch-up of in-memory runbook indexes with writes made by other workers."""
+from collections.abc import Mapping
+from typing import Any
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+_MISSING = object()
+
+
+async def runbook_changes(
+    db: AsyncIOMotorDatabase,
+    indexed: Mapping[str, Any],
+    projection: dict[str, Any] | None = None,
+) -> tuple[list[dict], list[str]]:
+    """
+    Find the runbooks created, updated or deleted since an index last saw them.
+
+    Stored versions are compared with the indexed ones over an ``_id`` and
+    ``version`` projection. Filtering on ``updated_at`` instead would miss, for
+    good, a write stamped before the previous poll but committed after it, or
+    stamped by a worker whose clock is behind.
+
+    :param db: The database instance.
+    :param indexed: The version the index holds of each runbook, None if
+        unknown.
+    :param projection: The fields to read of changed runbooks; all if None.
+    :return: The documents of runbooks whose version differs from the
+        indexed one, and the IDs of indexed runbooks that no longer exist.
+    """
+    stored = {
+        str(doc["_id"]): doc.get("version")
+        async for doc in db["runbooks"].find({}, {"version": 1})
+    }
+    changed = [
+        ObjectId(runbook_id)
+        for runbook_id, version in stored.items()
+        if indexed.get(runbook_id, _MISSING) != version
+    ]
+    docs = []
+    if changed:
+        query = {"_id": {"$in": changed}}
+        docs = [doc async for doc in db["runbooks"].find(query, projection)]
+    deleted = [runbook_id for runbook_id in indexed if runbook_id not in stored]
+    return docs, deleted
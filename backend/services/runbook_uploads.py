@@ -0,0 +1,296 @@
+"""
+Validation of runbook uploads away from the event loop.
+
+Validating a large runbook and checking its decision tree is CPU work that
+would stall every other request served by the worker. Bodies above a size
+threshold are therefore handed, as raw bytes, to a process pool. Sending a
+validated model back would cost the event loop nearly as much to unpickle
+as validating it did, so the pool returns what the write path needs
+instead: the document encoded as BSON for MongoDB, the response encoded as
+JSON, and the runbook's similarity vector.
+"""
+import asyncio
+import logging
+import multiprocessing
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import UTC, datetime
+from typing import Any
+
+import bson
+import numpy as np
+from bson import ObjectId
+from bson.raw_bson import RawBSONDocument
+from fastapi import HTTPException, status
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+
+from backend.config import settings
+from backend.models.runbook import (
+    DecisionNode,
+    DecisionTree,
+    Runbook,
+    RunbookCreate,
+    RunbookUpdate,
+)
+from backend.services.bson_json import document_to_json
+from backend.services.similarity import runbook_terms, vectorize
+from backend.services.tree_stats import tree_stats
+
+logger = logging.getLogger(__name__)
+
+
+class PreparedRunbook:
+    """A validated new runbook, encoded for storage and for the response."""
+
+    __slots__ = ("id", "title", "tags", "document", "response", "vector")
+
+    def __init__(
+        self,
+        id: str,
+        title: str,
+        tags: list[str],
+        document: bytes,
+        response: str,
+        vector: np.ndarray,
+    ):
+        self.id = id
+        self.title = title
+        self.tags = tags
+        self.document = document
+        self.response = response
+        self.vector = vector
+
+
+class DescribedRunbook:
+    """A stored runbook encoded for the response, with its similarity vector."""
+
+    __slots__ = ("version", "title", "tags", "response", "vector")
+
+    def __init__(
+        self,
+        version: int,
+        title: str,
+        tags: list[str],
+        response: str,
+        vector: np.ndarray,
+    ):
+        self.version = version
+        self.title = title
+        self.tags = tags
+        self.response = response
+        self.vector = vector
+
+
+def tree_integrity_errors(tree: DecisionTree) -> list[dict[str, Any]]:
+    """
+    Check that a decision tree's nodes and edges fit together.
+
+    Cycles are allowed; a runbook may loop back to an earlier check.
+
+    :param tree: The decision tree.
+    :return: Errors in the format of request validation errors; empty if the
+        tree is consistent.
+    """
+    errors = []
+    loc = ("body", "decision_tree")
+
+    def error(path: tuple, msg: str, value: Any) -> None:
+        errors.append(
+            {"type": "tree_integrity", "loc": loc + path, "msg": msg, "input": value}
+        )
+
+    if tree.root_node_id not in tree.nodes:
+        error(("root_node_id",), "Root node does not exist", tree.root_node_id)
+    for key, node in tree.nodes.items():
+        path = ("nodes", key)
+        if node.id != key:
+            error(path + ("id",), "Node ID does not match its key", node.id)
+        if isinstance(node, DecisionNode):
+            if not node.options:
+                error(path + ("options",), "Decision has no options", [])
+            for index, option in enumerate(node.options):
+                if option.next_node_id not in tree.nodes:
+                    error(
+                        path + ("options", index, "next_node_id"),
+                        "Option leads to a node that does not exist",
+                        option.next_node_id,
+                    )
+        elif node.next_node_id is not None and node.next_node_id not in tree.nodes:
+            error(
+                path + ("next_node_id",),
+                "Action leads to a node that does not exist",
+                node.next_node_id,
+            )
+    return errors
+
+
+def _errors(exc: ValidationError) -> list[dict[str, Any]]:
+    # Without context and URLs the errors are plain data, so they can be
+    # sent back from a pool process.
+    return [
+        {**error, "loc": ("body", *error["loc"])}
+        for error in exc.errors(include_url=False, include_context=False)
+    ]
+
+
+def prepare_create(body: bytes, dim: int) -> PreparedRunbook | list[dict[str, Any]]:
+    """
+    Validate a ``RunbookCreate`` body and encode the runbook to insert.
+
+    :param body: The raw request body.
+    :param dim: The similarity vector size.
+    :return: The prepared runbook, or the validation errors.
+    """
+    try:
+        payload = RunbookCreate.model_validate_json(body)
+    except ValidationError as exc:
+        return _errors(exc)
+    errors = tree_integrity_errors(payload.decision_tree)
+    if errors:
+        return errors
+    runbook = Runbook(
+        **dict(payload),
+        id=ObjectId(),
+        version=1,
+        stats=tree_stats(payload.decision_tree),
+    )
+    doc = runbook.model_dump(by_alias=True)
+    return PreparedRunbook(
+        str(runbook.id),
+        runbook.title,
+        runbook.tags,
+        bson.encode(doc),
+        document_to_json(doc),
+        vectorize(runbook_terms(runbook), dim),
+    )
+
+
+def prepare_update(body: bytes) -> bytes | list[dict[str, Any]]:
+    """
+    Validate a ``RunbookUpdate`` body and encode the fields to set.
+
+    :param body: The raw request body.
+    :return: The fields as BSON, or the validation errors.
+    """
+    try:
+        payload = RunbookUpdate.model_validate_json(body)
+    except ValidationError as exc:
+        return _errors(exc)
+    fields = payload.model_dump(exclude_unset=True)
+    if payload.decision_tree is not None:
+        errors = tree_integrity_errors(payload.decision_tree)
+        if errors:
+            return errors
+        fields["stats"] = tree_stats(payload.decision_tree).model_dump()
+    fields["updated_at"] = datetime.now(UTC)
+    return bson.encode(fields)
+
+
+def describe(document: bytes, dim: int) -> DescribedRunbook:
+    """
+    Encode a stored runbook for the response and compute its vector.
+
+    :param document: The stored runbook as BSON.
+    :param dim: The similarity vector size.
+    :return: The description.
+    """
+    doc = bson.decode(document)
+    runbook = Runbook(**doc)
+    return DescribedRunbook(
+        runbook.version,
+        runbook.title,
+        runbook.tags,
+        document_to_json(doc),
+        vectorize(runbook_terms(runbook), dim),
+    )
+
+
+class RunbookUploads:
+    """Runs upload validation inline for small bodies and in a pool otherwise."""
+
+    def __init__(self, offload_bytes: int, workers: int, dim: int):
+        """
+        Initializes the validator.
+
+        :param offload_bytes: Bodies at least this large are validated in the
+            process pool.
+        :param workers: The number of pool processes.
+        :param dim: The similarity vector size.
+        """
+        self.offload_bytes = offload_bytes
+        self.workers = workers
+        self.dim = dim
+        self._pool: ProcessPoolExecutor | None = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Forking a process that runs an event loop and driver threads is
+            # unsafe; start clean interpreters instead.
+            self._pool = ProcessPoolExecutor(
+                self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    async def _run(self, size: int, fn: Callable[..., Any], *args: Any) -> Any:
+        if size < self.offload_bytes:
+            return fn(*args)
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_pool(), fn, *args)
+        except BrokenProcessPool:
+            logger.warning("Upload validation pool broke; starting a new one")
+            self._pool = None
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Validation is temporarily unavailable",
+            ) from None
+
+    async def prepare_create(self, body: bytes) -> PreparedRunbook:
+        """
+        Validate a runbook creation body.
+
+        :param body: The raw request body.
+        :return: The prepared runbook.
+        :raises RequestValidationError: If the body or its tree is invalid.
+        """
+        result = await self._run(len(body), prepare_create, body, self.dim)
+        if isinstance(result, list):
+            raise RequestValidationError(result)
+        return result
+
+    async def prepare_update(self, body: bytes) -> RawBSONDocument:
+        """
+        Validate a runbook update body.
+
+        :param body: The raw request body.
+        :return: The fields to set.
+        :raises RequestValidationError: If the body or its tree is invalid.
+        """
+        result = await self._run(len(body), prepare_update, body)
+        if isinstance(result, list):
+            raise RequestValidationError(result)
+        return RawBSONDocument(result)
+
+    async def describe(self, raw: RawBSONDocument) -> DescribedRunbook:
+        """
+        Encode a stored runbook for the response and compute its vector.
+
+        :param raw: The stored runbook.
+        :return: The description.
+        """
+        return await self._run(len(raw.raw), describe, raw.raw, self.dim)
+
+    def shutdown(self) -> None:
+        """Stop the pool processes."""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+
+runbook_uploads = RunbookUploads(
+    offload_bytes=settings.upload_validation_offload_bytes,
+    workers=settings.upload_validation_workers,
+    dim=settings.similarity_dim,
+)
@@ -2,14 +2,25 @@
 from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 
+from backend.config import settings
 from backend.models.enums import UserRole
 from backend.models.user import User
 from backend.repositories.user import UserRepository
+from backend.services.cache import LRUCache
+from backend.services.database import db as database
 from backend.services.database import get_db
+from backend.services.revocation import revocation_list
 from backend.services.token import token_service
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# Users seen on recent requests, used to authenticate while MongoDB is down.
+# The access token is still verified and checked against revocations. Users
+# are small, so the cache is only bounded by its entry count.
+last_known_users = LRUCache(
+    "last_known_users", max_entries=settings.degraded_user_cache_max_entries
+)
+
 
 async def get_current_user(
     request: Request,
@@ -31,13 +42,20 @@ async def get_current_user(
         )
 
     payload = token_service.decode_token(token)
-    if payload is None:
+    if payload is None or payload.get("type") == "refresh":
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    if revocation_list.is_revoked(payload.get("fam")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
     user_id = payload.get("sub")
     if user_id is None:
         raise HTTPException(
@@ -46,6 +64,15 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    if not database.healthy:
+        user = last_known_users.get(user_id)
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="The database is unavailable",
+            )
+        return user
+
     user_repo = UserRepository(db)
     user = await user_repo.get(user_id)
     if user is None:
@@ -55,6 +82,7 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    last_known_users.put(user_id, user)
     return user
 
 
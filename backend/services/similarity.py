@@ -0,0 +1,391 @@
+"""Similar-runbook recommendations over hashed n-gram vectors."""
+import asyncio
+import json
+import logging
+import os
+import re
+import struct
+import tempfile
+import time
+import zlib
+from collections import Counter
+
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import PyMongoError
+
+from backend.config import settings
+from backend.models.runbook import ActionNode, DecisionNode, Runbook
+from backend.services.runbook_sync import runbook_changes
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9_./-]*")
+
+# The snapshot is one file, so its IDs and rows are always replaced together:
+#
+#     header     magic, metadata length
+#     metadata   JSON: dim, ids, versions
+#     df         float32[dim], starting at a 64-byte boundary
+#     matrix     float32[len(ids), dim], memory-mapped when loaded
+SNAPSHOT_FILE = "similarity.snap"
+SNAPSHOT_MAGIC = b"SIMSNAP1"
+_SNAPSHOT_HEADER = struct.Struct("<8sQ")
+
+
+def _tokens(text: str) -> list[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def _ngrams(tokens: list[str], prefix: str) -> list[str]:
+    grams = [prefix + token for token in tokens]
+    grams += [f"{prefix}{a} {b}" for a, b in zip(tokens, tokens[1:], strict=False)]
+    return grams
+
+
+def runbook_terms(runbook: Runbook) -> list[str]:
+    """
+    List the terms a runbook is indexed by.
+
+    Prose (title, description, tags, questions, option and action text) and
+    command lines are tokenized separately, so a shared command counts as a
+    match on its own and not just as shared words.
+
+    :param runbook: The runbook.
+    :return: Word unigrams and bigrams, prefixed by where they came from.
+    """
+    prose = [runbook.title, runbook.description, " ".join(runbook.tags)]
+    commands = []
+    for node in runbook.decision_tree.nodes.values():
+        if isinstance(node, DecisionNode):
+            prose.append(node.question)
+            prose.extend(option.description for option in node.options)
+        elif isinstance(node, ActionNode):
+            prose.append(node.title)
+            commands.extend(command.command for command in node.commands)
+    terms = []
+    for text in prose:
+        terms += _ngrams(_tokens(text), "t:")
+    for command in commands:
+        terms += _ngrams(_tokens(command), "c:")
+    return terms
+
+
+def vectorize(terms: list[str], dim: int) -> np.ndarray:
+    """
+    Hash terms into a vector with sublinear term frequencies.
+
+    :param terms: The terms.
+    :param dim: The vector size.
+    :return: A ``float32`` vector of size ``dim``.
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for term, count in Counter(terms).items():
+        digest = zlib.crc32(term.encode())
+        # The sign bit keeps colliding terms from always adding up.
+        sign = 1.0 if digest & 0x80000000 else -1.0
+        vector[digest % dim] += sign * (1.0 + np.log(count))
+    return vector
+
+
+class SimilarityIndex:
+    """
+    In-memory TF-IDF index of every runbook, one row per runbook.
+
+    Rows hold hashed term frequencies; inverse document frequencies are
+    applied at query time, so adding or removing a runbook only touches its
+    own row and the document frequencies. The matrix is snapshotted to disk
+    and memory-mapped at startup, then caught up with runbooks changed since.
+    """
+
+    def __init__(self, dim: int, snapshot_dir: str, sync_interval: float):
+        """
+        Initializes the index.
+
+        :param dim: The number of hashed features.
+        :param snapshot_dir: Where snapshots are written.
+        :param sync_interval: Seconds between polls for runbooks changed by
+            other worker processes.
+        """
+        self.dim = dim
+        self.snapshot_dir = snapshot_dir
+        self.sync_interval = sync_interval
+        self._matrix = np.zeros((0, dim), dtype=np.float32)
+        self._size = 0
+        self._ids: list[str] = []
+        self._versions: list[int] = []
+        self._rows: dict[str, int] = {}
+        self._df = np.zeros(dim, dtype=np.float32)
+        self._norms: np.ndarray | None = None
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, runbook_id: str) -> bool:
+        return str(runbook_id) in self._rows
+
+    def version(self, runbook_id: str) -> int | None:
+        """Return the indexed version of a runbook, if it is indexed."""
+        row = self._rows.get(str(runbook_id))
+        return None if row is None else self._versions[row]
+
+    def _writable(self) -> None:
+        """Copy a memory-mapped snapshot into memory before the first change."""
+        if not self._matrix.flags.writeable:
+            self._matrix = np.array(self._matrix)
+
+    def upsert(self, runbook: Runbook) -> None:
+        """
+        Add or replace a runbook's row.
+
+        :param runbook: The runbook.
+        """
+        self.upsert_vector(
+            str(runbook.id),
+            runbook.version,
+            vectorize(runbook_terms(runbook), self.dim),
+        )
+
+    def upsert_vector(self, runbook_id: str, version: int, vector: np.ndarray) -> None:
+        """
+        Add or replace a runbook's row with a vector computed elsewhere.
+
+        :param runbook_id: The runbook ID.
+        :param version: The runbook version the vector was computed from.
+        :param vector: The output of :func:`vectorize` for the runbook.
+        """
+        runbook_id = str(runbook_id)
+        self._writable()
+        row = self._rows.get(runbook_id)
+        if row is None:
+            if self._size == len(self._matrix):
+                grown = np.zeros((max(64, 2 * self._size), self.dim), np.float32)
+                grown[: self._size] = self._matrix[: self._size]
+                self._matrix = grown
+            row = self._size
+            self._size += 1
+            self._ids.append(runbook_id)
+            self._versions.append(version)
+            self._rows[runbook_id] = row
+        else:
+            self._df -= self._matrix[row] != 0
+            self._versions[row] = version
+        self._matrix[row] = vector
+        self._df += vector != 0
+        self._norms = None
+
+    def remove(self, runbook_id: str) -> None:
+        """
+        Drop a runbook's row, moving the last row into its place.
+
+        :param runbook_id: The runbook ID.
+        """
+        row = self._rows.pop(str(runbook_id), None)
+        if row is None:
+            return
+        self._writable()
+        self._df -= self._matrix[row] != 0
+        last = self._size - 1
+        if row != last:
+            self._matrix[row] = self._matrix[last]
+            self._ids[row] = self._ids[last]
+            self._versions[row] = self._versions[last]
+            self._rows[self._ids[row]] = row
+        self._matrix[last] = 0
+        self._ids.pop()
+        self._versions.pop()
+        self._size = last
+        self._norms = None
+
+    def _idf(self) -> np.ndarray:
+        return np.log((1.0 + self._size) / (1.0 + self._df)) + 1.0
+
+    def similar(self, runbook_ids: list[str], k: int) -> list[list[tuple[str, float]]]:
+        """
+        Find the most similar runbooks for several runbooks at once.
+
+        :param runbook_ids: The indexed runbooks to find neighbours for.
+        :param k: The number of neighbours per runbook.
+        :return: For each runbook, ``(runbook_id, cosine)`` pairs, best first;
+            an empty list for runbooks that are not indexed.
+        """
+        rows = [self._rows.get(str(runbook_id)) for runbook_id in runbook_ids]
+        known = [row for row in rows if row is not None]
+        if not known or self._size < 2:
+            return [[] for _ in runbook_ids]
+        matrix = self._matrix[: self._size]
+        weights = self._idf() ** 2
+        if self._norms is None:
+            self._norms = np.sqrt((matrix * matrix) @ weights)
+        norms = np.where(self._norms > 0, self._norms, 1.0)
+        queries = matrix[known] * weights
+        scores = (queries @ matrix.T) / norms / norms[known][:, None]
+        scores[np.arange(len(known)), known] = -np.inf
+        top = min(k, self._size - 1)
+        best = np.argpartition(-scores, top - 1, axis=1)[:, :top]
+
+        results = {}
+        for index, row in enumerate(known):
+            order = best[index][np.argsort(-scores[index, best[index]])]
+            results[row] = [
+                (self._ids[other], float(scores[index, other]))
+                for other in order
+                if scores[index, other] > 0
+            ]
+        return [results.get(row, []) if row is not None else [] for row in rows]
+
+    @property
+    def snapshot_path(self) -> str:
+        """The snapshot file."""
+        return os.path.join(self.snapshot_dir, SNAPSHOT_FILE)
+
+    def _snapshot_is_fresh(self) -> bool:
+        try:
+            age = time.time() - os.stat(self.snapshot_path).st_mtime
+        except OSError:
+            return False
+        return age < self.sync_interval
+
+    def save(self) -> bool:
+        """
+        Write a snapshot, replacing the previous one atomically.
+
+        Every worker saves when it stops; whichever gets there first writes
+        the snapshot, and the others skip it as it is newer than a sync
+        interval.
+
+        :return: False if a fresh snapshot was already there.
+        """
+        if self._snapshot_is_fresh():
+            return False
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        meta = json.dumps(
+            {
+                "dim": self.dim,
+                "ids": self._ids,
+                "versions": self._versions,
+            }
+        ).encode()
+        data_offset = -(-(_SNAPSHOT_HEADER.size + len(meta)) // 64) * 64
+        fd, tmp = tempfile.mkstemp(dir=self.snapshot_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(meta)))
+                f.write(meta)
+                f.write(b"\0" * (data_offset - f.tell()))
+                f.write(self._df.astype(np.float32).tobytes())
+                f.write(np.ascontiguousarray(self._matrix[: self._size]).tobytes())
+            os.replace(tmp, self.snapshot_path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return True
+
+    def load(self) -> bool:
+        """
+        Memory-map the last snapshot.
+
+        :return: False if there is no usable snapshot.
+        """
+        path = self.snapshot_path
+        try:
+            with open(path, "rb") as f:
+                magic, meta_length = _SNAPSHOT_HEADER.unpack(
+                    f.read(_SNAPSHOT_HEADER.size)
+                )
+                if magic != SNAPSHOT_MAGIC:
+                    raise ValueError(f"{path} is not a similarity snapshot")
+                meta = json.loads(f.read(meta_length))
+                data_offset = -(-(_SNAPSHOT_HEADER.size + meta_length) // 64) * 64
+                f.seek(data_offset)
+                df = np.frombuffer(f.read(4 * self.dim), dtype=np.float32)
+                file_size = os.fstat(f.fileno()).st_size
+        except (OSError, ValueError, struct.error) as exc:
+            logger.info("No similarity snapshot loaded: %s", exc)
+            return False
+        rows = len(meta["ids"])
+        matrix_offset = data_offset + 4 * self.dim
+        if (
+            meta["dim"] != self.dim
+            or df.shape != (self.dim,)
+            or file_size != matrix_offset + 4 * rows * self.dim
+        ):
+            return False
+        if rows:
+            matrix = np.memmap(
+                path,
+                dtype=np.float32,
+                mode="r",
+                offset=matrix_offset,
+                shape=(rows, self.dim),
+            )
+        else:
+            matrix = np.zeros((0, self.dim), dtype=np.float32)
+        self._matrix = matrix
+        self._size = rows
+        self._ids = list(meta["ids"])
+        self._versions = list(meta["versions"])
+        self._rows = {runbook_id: row for row, runbook_id in enumerate(self._ids)}
+        self._df = df.copy()
+        self._norms = None
+        return True
+
+    async def sync(self, db: AsyncIOMotorDatabase) -> int:
+        """
+        Catch up with runbooks created, updated or deleted elsewhere.
+
+        :param db: The database instance.
+        :return: The number of runbooks re-indexed.
+        """
+        indexed = {i: self._versions[row] for i, row in self._rows.items()}
+        docs, deleted = await runbook_changes(db, indexed)
+        for doc in docs:
+            self.upsert(Runbook(**doc))
+        for runbook_id in deleted:
+            self.remove(runbook_id)
+        return len(docs)
+
+    async def start(self, db: AsyncIOMotorDatabase) -> None:
+        """
+        Load the snapshot, catch up with MongoDB and keep polling for changes.
+
+        :param db: The database instance.
+        """
+        began = time.monotonic()
+        loaded = self.load()
+        changed = await self.sync(db)
+        logger.info(
+            "Similarity index ready: %d runbooks, snapshot %s, %d re-indexed, %.2fs",
+            len(self),
+            "loaded" if loaded else "missing",
+            changed,
+            time.monotonic() - began,
+        )
+        self._task = asyncio.create_task(self._poll(db))
+
+    async def stop(self) -> None:
+        """Stop polling and write a snapshot for the next start."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self.save()
+
+    async def _poll(self, db: AsyncIOMotorDatabase) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync(db)
+            except PyMongoError as exc:
+                logger.warning("Could not sync the similarity index: %s", exc)
+
+
+similarity_index = SimilarityIndex(
+    dim=settings.similarity_dim,
+    snapshot_dir=settings.similarity_snapshot_dir,
+    sync_interval=settings.similarity_sync_interval_s,
+)
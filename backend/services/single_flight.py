@@ -0,0 +1,149 @@
+"""Coalescing of concurrent identical reads."""
+import asyncio
+import hashlib
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Any, TypeVar
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from backend.services.metrics import registry
+
+T = TypeVar("T")
+
+single_flight_requests_total = registry.counter(
+    "single_flight_requests_total",
+    "Reads by coalescing group, executed or served from another caller's read.",
+    ("group", "result"),
+)
+single_flight_in_flight = registry.gauge(
+    "single_flight_in_flight",
+    "Distinct reads currently in flight.",
+    ("group",),
+)
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time and shares its outcome.
+
+    Callers that arrive while a call for their key is in flight wait for it
+    and get the same result, or the same exception, instead of starting
+    their own. Results are shared objects and must be treated as read-only.
+    """
+
+    def __init__(self, name: str):
+        """
+        Initializes the group.
+
+        :param name: The group name used in metrics.
+        """
+        self.name = name
+        self._calls: dict[Any, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Any, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run ``fn``, or wait for the call already running for ``key``.
+
+        The call runs in its own task, so a caller that is cancelled does not
+        cancel it for the others.
+
+        :param key: Identifies identical calls.
+        :param fn: Starts the call.
+        :return: The call's result.
+        """
+        task = self._calls.get(key)
+        if task is not None:
+            single_flight_requests_total.inc(self.name, "coalesced")
+            return await asyncio.shield(task)
+        single_flight_requests_total.inc(self.name, "executed")
+        task = asyncio.ensure_future(fn())
+        self._calls[key] = task
+        single_flight_in_flight.inc(self.name)
+        task.add_done_callback(lambda _: self._done(key, task))
+        return await asyncio.shield(task)
+
+    def forget(self, key: Any) -> None:
+        """
+        Make later callers start a new call instead of joining the current one.
+
+        Used when the data was written after the current call started.
+
+        :param key: The call key.
+        """
+        if self._calls.pop(key, None) is not None:
+            single_flight_in_flight.dec(self.name)
+
+    def _done(self, key: Any, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+            single_flight_in_flight.dec(self.name)
+        if not task.cancelled():
+            # Mark the exception as retrieved if every caller went away.
+            task.exception()
+
+
+class SingleFlightMiddleware:
+    """
+    ASGI middleware coalescing identical concurrent GET requests.
+
+    Requests are identical when they have the same path, query string,
+    credentials, range and origin; the origin matters because the CORS
+    headers of a response are specific to it. Only one is passed to the application; its
+    response is buffered and sent to every waiting client. Only list paths
+    whose responses are complete, bounded and not streamed.
+    """
+
+    def __init__(self, app: ASGIApp, path_prefixes: Iterable[str] = ()):
+        """
+        Initializes the middleware.
+
+        :param app: The wrapped ASGI application.
+        :param path_prefixes: Paths whose GET responses may be coalesced.
+        """
+        self.app = app
+        self.path_prefixes = tuple(p for p in path_prefixes if p)
+        self.flight = SingleFlight("http")
+
+    @staticmethod
+    def _key(scope: Scope) -> tuple:
+        headers = dict(scope["headers"])
+        credentials = hashlib.sha256(
+            headers.get(b"cookie", b"") + b"\0" + headers.get(b"authorization", b"")
+        ).digest()
+        return (
+            scope["path"],
+            scope["query_string"],
+            credentials,
+            headers.get(b"range"),
+            headers.get(b"if-none-match"),
+            headers.get(b"origin"),
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "GET"
+            or not self.path_prefixes
+            or not scope["path"].startswith(self.path_prefixes)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def respond() -> tuple[list[Message], Any]:
+            messages: list[Message] = []
+
+            async def capture(message: Message) -> None:
+                messages.append(message)
+
+            await self.app(scope, receive, capture)
+            return messages, scope.get("route")
+
+        messages, route = await self.flight.do(self._key(scope), respond)
+        # Keep the matched route for request metrics on coalesced requests.
+        if route is not None:
+            scope.setdefault("route", route)
+        for message in messages:
+            await send(message)
@@ -0,0 +1,272 @@
+"""Slow MongoDB operation recording with one-time explain capture."""
+import asyncio
+import json
+import logging
+import threading
+import time
+from datetime import UTC, datetime
+from typing import Any
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import monitoring
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+EXPLAIN_COLLECTION = "slow_query_explains"
+
+# Commands whose query part can be explained, and where that part lives.
+_SHAPE_FIELDS: dict[str, tuple[str, ...]] = {
+    "find": ("filter", "sort", "projection"),
+    "aggregate": ("pipeline",),
+    "count": ("query",),
+    "distinct": ("key", "query"),
+    "findAndModify": ("query", "sort"),
+}
+_BULK_FIELDS = {"update": ("updates", "q"), "delete": ("deletes", "q")}
+
+# Per-connection fields that must not be forwarded to an explain command.
+_SESSION_FIELDS = {"lsid", "txnNumber", "autocommit", "startTransaction"}
+
+
+def normalize_shape(value: Any) -> Any:
+    """
+    Replace the literal values of a query with placeholders.
+
+    Operators and field names are kept, so two queries that differ only in
+    their parameters map to the same shape.
+
+    :param value: A filter, sort, projection or pipeline.
+    :return: The normalized shape.
+    """
+    if isinstance(value, dict):
+        return {key: normalize_shape(item) for key, item in value.items()}
+    if isinstance(value, list | tuple):
+        if value and all(isinstance(item, dict) for item in value):
+            return [normalize_shape(item) for item in value]
+        return ["?"] if value else []
+    return "?"
+
+
+def _query_shape(command_name: str, command: dict) -> dict | None:
+    """Extract the normalized query part of an explainable command."""
+    if command_name in _SHAPE_FIELDS:
+        return {
+            field: normalize_shape(command[field])
+            for field in _SHAPE_FIELDS[command_name]
+            if field in command
+        }
+    if command_name in _BULK_FIELDS:
+        list_field, query_field = _BULK_FIELDS[command_name]
+        statements = command.get(list_field) or [{}]
+        return {query_field: normalize_shape(statements[0].get(query_field, {}))}
+    return None
+
+
+class SlowQueryRecorder(monitoring.CommandListener):
+    """pymongo command listener that aggregates slow operations by shape."""
+
+    def __init__(self, threshold_ms: float, max_shapes: int = 500):
+        """
+        Initializes the recorder.
+
+        :param threshold_ms: Commands at or above this duration are recorded.
+        :param max_shapes: The maximum number of distinct shapes kept in memory.
+        """
+        self.threshold_ms = threshold_ms
+        self.max_shapes = max_shapes
+        self._pending: dict[tuple, tuple[str, dict]] = {}
+        self._stats: dict[str, dict[str, Any]] = {}
+        self._explained: set[str] = set()
+        self._lock = threading.Lock()
+        self._queue: asyncio.Queue | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Task | None = None
+
+    @staticmethod
+    def _event_key(event) -> tuple:
+        return (event.connection_id, event.request_id)
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        command_name = event.command_name
+        if command_name not in _SHAPE_FIELDS and command_name not in _BULK_FIELDS:
+            return
+        collection = event.command.get(command_name)
+        if not isinstance(collection, str) or collection == EXPLAIN_COLLECTION:
+            return
+        command = {
+            key: value
+            for key, value in event.command.items()
+            if not key.startswith("$") and key not in _SESSION_FIELDS
+        }
+        self._pending[self._event_key(event)] = (event.database_name, command)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        pending = self._pending.pop(self._event_key(event), None)
+        if pending is None:
+            return
+        duration_ms = event.duration_micros / 1000
+        if duration_ms >= self.threshold_ms:
+            database_name, command = pending
+            self.record(database_name, event.command_name, command, duration_ms)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._pending.pop(self._event_key(event), None)
+
+    def record(
+        self,
+        database_name: str,
+        command_name: str,
+        command: dict,
+        duration_ms: float,
+    ) -> None:
+        """
+        Record one slow command.
+
+        :param database_name: The database the command ran against.
+        :param command_name: The command name, e.g. ``find``.
+        :param command: The command document, without session fields.
+        :param duration_ms: The command duration in milliseconds.
+        """
+        collection = command[command_name]
+        shape = _query_shape(command_name, command)
+        key = json.dumps([collection, command_name, shape], sort_keys=True, default=str)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                if len(self._stats) >= self.max_shapes:
+                    cheapest = min(
+                        self._stats, key=lambda k: self._stats[k]["total_ms"]
+                    )
+                    del self._stats[cheapest]
+                stats = self._stats[key] = {
+                    "collection": collection,
+                    "command": command_name,
+                    "shape": shape,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "docs_examined": None,
+                    "keys_examined": None,
+                    "plan": None,
+                }
+            stats["count"] += 1
+            stats["total_ms"] += duration_ms
+            stats["max_ms"] = max(stats["max_ms"], duration_ms)
+            stats["last_seen"] = time.time()
+            needs_explain = self._queue is not None and key not in self._explained
+            if needs_explain:
+                self._explained.add(key)
+
+        logger.warning(
+            "Slow MongoDB %s on %s took %.1f ms: %s",
+            command_name,
+            collection,
+            duration_ms,
+            json.dumps(shape, default=str),
+        )
+        if needs_explain and self._loop is not None:
+            item = (key, database_name, command)
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+
+    def top(self, limit: int = 20) -> list[dict[str, Any]]:
+        """
+        Return the slowest shapes ordered by total time spent.
+
+        :param limit: The maximum number of shapes to return.
+        :return: Shape statistics, most expensive first.
+        """
+        with self._lock:
+            items = [dict(stats) for stats in self._stats.values()]
+        items.sort(key=lambda stats: stats["total_ms"], reverse=True)
+        for stats in items:
+            stats["avg_ms"] = stats["total_ms"] / stats["count"]
+        return items[:limit]
+
+    def reset(self) -> None:
+        """Forget every recorded shape."""
+        with self._lock:
+            self._stats.clear()
+            self._explained.clear()
+
+    async def start(self, db: AsyncIOMotorDatabase) -> None:
+        """
+        Start the background task that captures explain plans.
+
+        :param db: The database holding the capped explain collection.
+        """
+        try:
+            await db.create_collection(
+                EXPLAIN_COLLECTION,
+                capped=True,
+                size=settings.slow_query_explain_collection_bytes,
+            )
+        except CollectionInvalid:
+            pass
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._explain_worker(db))
+
+    async def stop(self) -> None:
+        """Stop the explain capture task."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._queue = None
+        self._loop = None
+
+    async def _explain_worker(self, db: AsyncIOMotorDatabase) -> None:
+        while True:
+            key, database_name, command = await self._queue.get()
+            try:
+                await self._explain(db, key, database_name, command)
+            except PyMongoError as exc:
+                logger.warning("Could not explain slow query: %s", exc)
+            except Exception:
+                # One odd command must not end explains for the process.
+                logger.exception("Could not explain slow query %s", key)
+
+    async def _explain(
+        self,
+        db: AsyncIOMotorDatabase,
+        key: str,
+        database_name: str,
+        command: dict,
+    ) -> None:
+        explain = await db.client[database_name].command(
+            {"explain": command, "verbosity": "executionStats"}
+        )
+        execution = explain.get("executionStats", {})
+        winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is not None:
+                stats["docs_examined"] = execution.get("totalDocsExamined")
+                stats["keys_examined"] = execution.get("totalKeysExamined")
+                stats["plan"] = winning_plan.get("stage")
+            shape = stats["shape"] if stats else None
+        logger.warning(
+            "Explained slow query %s: plan=%s docs_examined=%s keys_examined=%s",
+            key,
+            winning_plan.get("stage"),
+            execution.get("totalDocsExamined"),
+            execution.get("totalKeysExamined"),
+        )
+        await db[EXPLAIN_COLLECTION].insert_one(
+            {
+                "shape_key": key,
+                "shape": json.dumps(shape, default=str),
+                "captured_at": datetime.now(UTC),
+                "query_planner": explain.get("queryPlanner"),
+                "execution_stats": execution,
+            }
+        )
+
+
+slow_query_recorder = SlowQueryRecorder(settings.slow_query_threshold_ms)
@@ -0,0 +1,282 @@
+"""Speculative preparation of the actions a session is likely to reach next."""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from pymongo.errors import PyMongoError
+
+from backend.config import settings
+from backend.models.runbook import ActionNode, DecisionNode, Runbook
+from backend.repositories.job import JobRepository
+from backend.services.cache import LRUCache
+from backend.services.database import db as database
+from backend.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+speculation_started_total = registry.counter(
+    "speculation_started_total",
+    "Speculative action preparations started.",
+)
+speculation_outcomes_total = registry.counter(
+    "speculation_outcomes_total",
+    "Outcomes of entering an action node from a decision: hit (prepared), "
+    "miss (not prepared) or wasted (prepared but never entered).",
+    ("outcome",),
+)
+
+Preparer = Callable[[Runbook, ActionNode], Awaitable[None]]
+
+action_metadata_cache = LRUCache(
+    "action_metadata",
+    max_entries=settings.action_metadata_cache_max_entries,
+    max_bytes=settings.action_metadata_cache_max_bytes,
+)
+
+
+def _metadata_key(runbook: Runbook, node_id: str) -> str:
+    return f"{runbook.id}:{runbook.version}:{node_id}"
+
+
+def compile_action_metadata(runbook: Runbook, node: ActionNode) -> dict[str, Any]:
+    """
+    Build the execution metadata of an action node.
+
+    :param runbook: The runbook the node belongs to.
+    :param node: The action node.
+    :return: What an executor needs to start the action.
+    """
+    environment = runbook.execution_environment
+    return {
+        "node_id": node.id,
+        "image": environment.base_image,
+        "environment_variables": dict(environment.environment_variables),
+        "resource_limits": environment.resource_limits.model_dump(),
+        "commands": [command.model_dump() for command in node.commands],
+        "total_timeout_seconds": sum(c.timeout_seconds for c in node.commands),
+    }
+
+
+def _cache_metadata(key: str, runbook: Runbook, node: ActionNode) -> dict[str, Any]:
+    metadata = compile_action_metadata(runbook, node)
+    size = sum(len(c["command"]) + len(c["description"]) for c in metadata["commands"])
+    action_metadata_cache.put(key, metadata, runbook.version, size + 256)
+    return metadata
+
+
+async def prepare_command_metadata(
+    runbook: Runbook, node: ActionNode, pin: bool = False
+) -> None:
+    """
+    Compile and cache the command metadata of an action node.
+
+    :param runbook: The runbook the node belongs to.
+    :param node: The action node.
+    :param pin: Whether to exempt the metadata from eviction.
+    """
+    key = _metadata_key(runbook, node.id)
+    if key not in action_metadata_cache:
+        _cache_metadata(key, runbook, node)
+    if pin:
+        action_metadata_cache.pin(key)
+
+
+def get_action_metadata(runbook: Runbook, node: ActionNode) -> dict[str, Any]:
+    """
+    Return the command metadata of an action node, compiling it on a miss.
+
+    :param runbook: The runbook the node belongs to.
+    :param node: The action node.
+    :return: The action metadata.
+    """
+    key = _metadata_key(runbook, node.id)
+    metadata = action_metadata_cache.get(key)
+    if metadata is None:
+        metadata = _cache_metadata(key, runbook, node)
+    return metadata
+
+
+class ImagePrefetcher:
+    """
+    Queues ``pull_image`` jobs for execution images ahead of time.
+
+    The images are pulled by the job workers, which also run the commands.
+    Each image is queued at most once per ``interval`` across all workers, so
+    a pull that failed, say for a mistyped image, is retried the next
+    interval without holding back other images.
+    """
+
+    def __init__(self, interval: float):
+        """
+        Initializes the prefetcher.
+
+        :param interval: Seconds between pulls of the same image.
+        """
+        self.interval = interval
+        self._queued: dict[str, int] = {}
+
+    async def __call__(self, runbook: Runbook, node: ActionNode) -> None:
+        image = runbook.execution_environment.base_image
+        period = int(time.time() // self.interval)
+        if self._queued.get(image) == period or not database.healthy:
+            return
+        self._queued[image] = period
+        try:
+            await JobRepository(database.db).enqueue_periodic(
+                "pull_image", self.interval, {"image": image}, key=image
+            )
+        except PyMongoError as exc:
+            logger.warning("Could not queue a pull of %s: %s", image, exc)
+
+
+class SpeculativePreparer:
+    """
+    Prepares the most likely next actions while a responder reads a decision.
+
+    When a session enters a decision node, the options are ranked by their
+    historical conversion rate and the action nodes behind the most likely ones
+    are prepared in the background, up to a per-session budget. Entering a
+    prepared action counts as a hit; preparations that are never used count as
+    waste.
+    """
+
+    def __init__(
+        self,
+        preparers: list[Preparer],
+        budget_per_session: int,
+        min_probability: float,
+        max_sessions: int = 10000,
+    ):
+        """
+        Initializes the preparer.
+
+        :param preparers: The preparation steps run for each speculated action.
+        :param budget_per_session: The most actions prepared per decision.
+        :param min_probability: Options less likely than this are not prepared.
+        :param max_sessions: The most sessions tracked at once.
+        """
+        self.preparers = preparers
+        self.budget_per_session = budget_per_session
+        self.min_probability = min_probability
+        self.max_sessions = max_sessions
+        self._sessions: OrderedDict[str, dict[str, asyncio.Task]] = OrderedDict()
+
+    @staticmethod
+    def rank_options(
+        node: DecisionNode, choices: dict[str, int], visits: int
+    ) -> list[tuple[str, float]]:
+        """
+        Estimate how likely each option of a decision node is.
+
+        Laplace smoothing keeps unseen options possible and makes a decision
+        with no history uniform.
+
+        :param node: The decision node.
+        :param choices: How often each option index was chosen.
+        :param visits: How often the node was visited.
+        :return: ``(next_node_id, probability)`` pairs, most likely first.
+        """
+        count = len(node.options)
+        ranked = [
+            (
+                option.next_node_id,
+                (choices.get(str(index), 0) + 1) / (visits + count),
+            )
+            for index, option in enumerate(node.options)
+        ]
+        ranked.sort(key=lambda item: item[1], reverse=True)
+        return ranked
+
+    def on_decision(
+        self,
+        session_id: str,
+        runbook: Runbook,
+        node: DecisionNode,
+        choices: dict[str, int],
+        visits: int,
+    ) -> list[str]:
+        """
+        Start preparing the likely next actions of a decision node.
+
+        :param session_id: The session ID.
+        :param runbook: The runbook being executed.
+        :param node: The decision node the session entered.
+        :param choices: Historical option choice counts for this node.
+        :param visits: Historical visit count for this node.
+        :return: The action node IDs being prepared.
+        """
+        self._discard(session_id)
+        prepared: dict[str, asyncio.Task] = {}
+        for next_node_id, probability in self.rank_options(node, choices, visits):
+            if len(prepared) >= self.budget_per_session:
+                break
+            if probability < self.min_probability or next_node_id in prepared:
+                continue
+            target = runbook.decision_tree.nodes.get(next_node_id)
+            if not isinstance(target, ActionNode):
+                continue
+            prepared[next_node_id] = asyncio.create_task(self._prepare(runbook, target))
+            speculation_started_total.inc()
+        if prepared:
+            self._sessions[session_id] = prepared
+            while len(self._sessions) > self.max_sessions:
+                _, tasks = self._sessions.popitem(last=False)
+                self._waste(tasks)
+        return list(prepared)
+
+    def on_enter(self, session_id: str, node_id: str) -> bool:
+        """
+        Record that a session entered an action node from a decision,
+        settling the speculation started at that decision.
+
+        :param session_id: The session ID.
+        :param node_id: The node the session entered.
+        :return: True if the node had been prepared.
+        """
+        tasks = self._sessions.pop(session_id, None) or {}
+        hit = tasks.pop(node_id, None) is not None
+        speculation_outcomes_total.inc("hit" if hit else "miss")
+        self._waste(tasks)
+        return hit
+
+    def on_finish(self, session_id: str) -> None:
+        """
+        Drop a finished session's outstanding preparations.
+
+        :param session_id: The session ID.
+        """
+        self._discard(session_id)
+
+    def _discard(self, session_id: str) -> None:
+        self._waste(self._sessions.pop(session_id, None) or {})
+
+    def _waste(self, tasks: dict[str, asyncio.Task]) -> None:
+        for task in tasks.values():
+            speculation_outcomes_total.inc("wasted")
+            task.cancel()
+
+    async def _prepare(self, runbook: Runbook, node: ActionNode) -> None:
+        for preparer in self.preparers:
+            try:
+                await preparer(runbook, node)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("Speculative preparation of %s failed: %s", node.id, exc)
+
+
+speculative_preparer = SpeculativePreparer(
+    preparers=(
+        [
+            prepare_command_metadata,
+            ImagePrefetcher(settings.speculation_image_pull_interval_s),
+        ]
+        if settings.speculation_prefetch_images
+        else [prepare_command_metadata]
+    ),
+    budget_per_session=settings.speculation_budget_per_session,
+    min_probability=settings.speculation_min_probability,
+)
@@ -0,0 +1,293 @@
+"""
+Structured logging that never blocks the event loop.
+
+Loggers hand records to a :class:`NonBlockingQueueHandler`, which only
+stamps them with the current request ID and puts them on a bounded queue; a
+listener thread formats them as JSON and writes them out. When the queue is
+full, records are dropped and counted instead of making the caller wait.
+"""
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import time
+import uuid
+import zlib
+from contextvars import ContextVar
+from datetime import UTC, datetime
+from typing import IO, Any
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from backend.config import settings
+from backend.services.metrics import registry
+
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+log_records_dropped_total = registry.counter(
+    "log_records_dropped_total",
+    "Log records dropped because the log queue was full.",
+    ("level",),
+)
+
+# Attributes every LogRecord has; anything else was passed in ``extra``.
+_RECORD_ATTRIBUTES = frozenset(logging.makeLogRecord({}).__dict__) | {
+    "message",
+    "asctime",
+    "request_id",
+}
+
+# Incoming request IDs are echoed into logs, so only plain tokens are kept.
+_REQUEST_ID = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """
+        Format a record.
+
+        :param record: The record.
+        :return: The JSON line, with the time, level, logger, message, request
+            ID, any ``extra`` fields and the exception, if any.
+        """
+        entry: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, UTC).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id is not None:
+            entry["request_id"] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts records on a bounded queue, dropping them when it is full.
+
+    Records are prepared in the caller's thread: the request ID is read from
+    its context, the message is merged with its arguments and any exception
+    is rendered, so the listener thread needs nothing from the caller. Debug
+    records are sampled per request, so a sampled request keeps all of its
+    debug records.
+    """
+
+    def __init__(self, log_queue: queue.Queue, debug_sample_rate: float = 1.0):
+        """
+        Initializes the handler.
+
+        :param log_queue: The bounded queue the listener reads.
+        :param debug_sample_rate: The fraction of requests whose debug records
+            are kept; records outside a request are sampled individually.
+        """
+        super().__init__(log_queue)
+        self.debug_sample_rate = debug_sample_rate
+        self.dropped = 0
+        self._counter = 0
+
+    def _sampled(self, request_id: str | None) -> bool:
+        if self.debug_sample_rate >= 1:
+            return True
+        if request_id is not None:
+            return zlib.crc32(request_id.encode()) < self.debug_sample_rate * 2**32
+        # Spread records outside requests evenly instead of drawing randomly.
+        self._counter += 1
+        return (self._counter * self.debug_sample_rate) % 1 < self.debug_sample_rate
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """
+        Enqueue a record, unless it is sampled out or the queue is full.
+
+        :param record: The record.
+        """
+        request_id = request_id_var.get()
+        if record.levelno <= logging.DEBUG and not self._sampled(request_id):
+            return
+        record.request_id = request_id
+        try:
+            self.enqueue(self.prepare(record))
+        except queue.Full:
+            self.dropped += 1
+            log_records_dropped_total.inc(record.levelname)
+        except Exception:
+            self.handleError(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Copy a record with its message and exception rendered to text.
+
+        :param record: The record.
+        :return: The copy to enqueue.
+        """
+        prepared = logging.makeLogRecord(record.__dict__)
+        prepared.msg = record.getMessage()
+        prepared.args = None
+        if record.exc_info:
+            prepared.exc_text = record.exc_text or logging.Formatter().formatException(
+                record.exc_info
+            )
+        prepared.exc_info = None
+        return prepared
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # The listener is still draining, so waiting for room ends quickly;
+        # dropping the sentinel would leave the thread running.
+        self.queue.put(self._sentinel)
+
+
+class LogPipeline:
+    """Routes the root logger through a bounded queue to a writer thread."""
+
+    def __init__(
+        self,
+        level: str,
+        fmt: str,
+        max_records: int,
+        debug_sample_rate: float,
+        stream: IO[str] | None = None,
+    ):
+        """
+        Initializes the pipeline.
+
+        :param level: The root log level name.
+        :param fmt: ``json``, or ``text`` for human-readable lines.
+        :param max_records: The number of records the queue holds.
+        :param debug_sample_rate: The fraction of requests whose debug records
+            are kept.
+        :param stream: Where records are written; stdout by default.
+        """
+        self.level = level
+        self.fmt = fmt
+        self.max_records = max_records
+        self.debug_sample_rate = debug_sample_rate
+        self.stream = stream
+        self.handler: NonBlockingQueueHandler | None = None
+        self._listener: _Listener | None = None
+        self._previous: tuple[list[logging.Handler], int] | None = None
+        self._pid: int | None = None
+
+    @property
+    def dropped(self) -> int:
+        """The number of records dropped since the pipeline started."""
+        return self.handler.dropped if self.handler is not None else 0
+
+    def _formatter(self) -> logging.Formatter:
+        if self.fmt == "json":
+            return JsonFormatter()
+        return logging.Formatter(
+            "%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"
+        )
+
+    def start(self) -> None:
+        """
+        Replace the root logger's handlers with the queue and start writing.
+
+        In a process forked from one where the pipeline was running, the
+        writer thread was not copied, so a new queue and thread are set up.
+        """
+        if self._listener is not None and self._pid == os.getpid():
+            return
+        log_queue: queue.Queue = queue.Queue(self.max_records)
+        writer = logging.StreamHandler(self.stream or sys.stdout)
+        writer.setFormatter(self._formatter())
+        self.handler = NonBlockingQueueHandler(log_queue, self.debug_sample_rate)
+        inherited = self._listener is not None
+        self._listener = _Listener(log_queue, writer, respect_handler_level=True)
+        self._pid = os.getpid()
+
+        root = logging.getLogger()
+        if not inherited:
+            self._previous = (root.handlers[:], root.level)
+        root.handlers = [self.handler]
+        root.setLevel(self.level.upper())
+        self._listener.start()
+
+    def stop(self) -> None:
+        """Write out the queued records and restore the previous handlers."""
+        if self._listener is None:
+            return
+        root = logging.getLogger()
+        handlers, level = self._previous
+        root.handlers = handlers
+        root.setLevel(level)
+        self._listener.stop()
+        self._listener = None
+
+
+class RequestIdMiddleware:
+    """
+    ASGI middleware giving every request an ID for log correlation.
+
+    A well-formed ``X-Request-ID`` header from the client or a proxy is
+    kept; otherwise a new ID is generated. The ID is set for everything the
+    request runs, returned in the response header, and a debug record is
+    logged when the request completes.
+    """
+
+    def __init__(self, app: ASGIApp):
+        """
+        Initializes the middleware.
+
+        :param app: The wrapped ASGI application.
+        """
+        self.app = app
+        self.logger = logging.getLogger("backend.requests")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")
+        request_id = incoming if _REQUEST_ID.fullmatch(incoming) else uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message)["X-Request-ID"] = request_id
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(
+                    "Request completed",
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status": status_code,
+                        "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+                    },
+                )
+            request_id_var.reset(token)
+
+
+log_pipeline = LogPipeline(
+    level=settings.log_level,
+    fmt=settings.log_format,
+    max_records=settings.log_queue_max_records,
+    debug_sample_rate=settings.log_debug_sample_rate,
+)
@@ -29,6 +29,26 @@ class TokenService:
         encoded_jwt = jwt.encode(to_encode, settings.jwt_secret, algorithm="HS256")
         return encoded_jwt
 
+    @staticmethod
+    def create_refresh_token(data: dict, expires_delta: timedelta | None = None) -> str:
+        """
+        Create a new refresh token.
+
+        :param data: The data to encode in the token, including its ``jti``.
+        :param expires_delta: The token's expiration delta.
+        :return: The encoded refresh token.
+        """
+        to_encode = data.copy()
+        if expires_delta:
+            expire = datetime.now(UTC) + expires_delta
+        else:
+            expire = datetime.now(UTC) + timedelta(
+                minutes=settings.refresh_token_ttl_min
+            )
+        to_encode.update({"exp": expire, "type": "refresh"})
+        encoded_jwt = jwt.encode(to_encode, settings.jwt_secret, algorithm="HS256")
+        return encoded_jwt
+
     @staticmethod
     def decode_token(token: str) -> dict | None:
         """
@@ -0,0 +1,45 @@
+"""Topological order of decision trees, ignoring edges that close a cycle."""
+from collections.abc import Callable, Hashable, Iterable
+from typing import TypeVar
+
+NodeT = TypeVar("NodeT", bound=Hashable)
+
+
+def topological_order(
+    root: NodeT | None, children: Callable[[NodeT], Iterable[NodeT]]
+) -> tuple[list[NodeT], dict[NodeT, list[NodeT]]]:
+    """
+    Order the nodes reachable from a root so each comes before its children.
+
+    The order is the reverse of an iterative depth-first post-order. Edges
+    pointing forward in it are kept; the others point back to an ancestor
+    and close a cycle, so they are dropped.
+
+    :param root: The root node, or None if the tree has none.
+    :param children: Returns a node's children; called once per node.
+    :return: The reachable nodes in topological order, and the children of
+        each along the kept edges.
+    """
+    if root is None:
+        return [], {}
+    successors = {root: list(children(root))}
+    order: list[NodeT] = []
+    stack = [(root, iter(successors[root]))]
+    while stack:
+        node, pending = stack[-1]
+        for child in pending:
+            if child not in successors:
+                successors[child] = list(children(child))
+                stack.append((child, iter(successors[child])))
+                break
+        else:
+            stack.pop()
+            order.append(node)
+    order.reverse()
+
+    position = {node: index for index, node in enumerate(order)}
+    forward = {
+        node: [child for child in successors[node] if position[child] > position[node]]
+        for node in order
+    }
+    return order, forward
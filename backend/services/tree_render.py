@@ -0,0 +1,222 @@
+"""Server-side rendering of decision trees for drawing clients."""
+import json
+from typing import Any
+
+from backend.config import settings
+from backend.models.runbook import DecisionNode, DecisionTree
+from backend.services.cache import LRUCache, invalidation_bus
+from backend.services.tree_order import topological_order
+
+RENDER_FORMATS = ("mermaid", "dot", "layout")
+
+# Layout grid spacing, in abstract drawing units.
+NODE_SPACING_X = 240
+NODE_SPACING_Y = 140
+
+render_cache = invalidation_bus.register(
+    LRUCache(
+        "tree_renders",
+        max_entries=settings.tree_render_cache_max_entries,
+        max_bytes=settings.tree_render_cache_max_bytes,
+    )
+)
+
+
+def _label(node) -> str:
+    return node.question if isinstance(node, DecisionNode) else node.title
+
+
+def _edges(tree: DecisionTree) -> list[tuple[str, str, str | None]]:
+    """List ``(source, target, label)`` edges, skipping dangling targets."""
+    edges = []
+    for node_id, node in tree.nodes.items():
+        if isinstance(node, DecisionNode):
+            for option in node.options:
+                if option.next_node_id in tree.nodes:
+                    edges.append((node_id, option.next_node_id, option.description))
+        elif node.next_node_id is not None and node.next_node_id in tree.nodes:
+            edges.append((node_id, node.next_node_id, None))
+    return edges
+
+
+def _mermaid_text(text: str) -> str:
+    return text.replace('"', "#quot;").replace("\n", " ")
+
+
+def render_mermaid(tree: DecisionTree) -> str:
+    """
+    Render a tree as a Mermaid flowchart.
+
+    Node IDs are replaced with generated identifiers, since runbook node IDs
+    may contain characters Mermaid does not accept.
+
+    :param tree: The decision tree.
+    :return: The Mermaid source.
+    """
+    ids = {node_id: f"n{index}" for index, node_id in enumerate(tree.nodes)}
+    lines = ["flowchart TD"]
+    for node_id, node in tree.nodes.items():
+        label = _mermaid_text(_label(node))
+        if isinstance(node, DecisionNode):
+            lines.append(f'    {ids[node_id]}{{"{label}"}}')
+        else:
+            lines.append(f'    {ids[node_id]}["{label}"]')
+    for source, target, label in _edges(tree):
+        if label:
+            lines.append(
+                f'    {ids[source]} -->|"{_mermaid_text(label)}"| {ids[target]}'
+            )
+        else:
+            lines.append(f"    {ids[source]} --> {ids[target]}")
+    return "\n".join(lines) + "\n"
+
+
+def _dot_text(text: str) -> str:
+    return text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_dot(tree: DecisionTree) -> str:
+    """
+    Render a tree as a Graphviz DOT digraph.
+
+    :param tree: The decision tree.
+    :return: The DOT source.
+    """
+    lines = ["digraph runbook {", "    rankdir=TB;"]
+    for node_id, node in tree.nodes.items():
+        shape = "diamond" if isinstance(node, DecisionNode) else "box"
+        lines.append(
+            f'    "{_dot_text(node_id)}" '
+            f'[label="{_dot_text(_label(node))}", shape={shape}];'
+        )
+    for source, target, label in _edges(tree):
+        attrs = f' [label="{_dot_text(label)}"]' if label else ""
+        lines.append(f'    "{_dot_text(source)}" -> "{_dot_text(target)}"{attrs};')
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def _layers(tree: DecisionTree, edges) -> dict[str, int]:
+    """
+    Assign each node a layer.
+
+    Reachable nodes are placed by longest path from the root, so converging
+    options land below every parent. Edges that close a cycle are ignored.
+    Unreachable nodes go to a final extra layer.
+    """
+    children: dict[str, list[str]] = {node_id: [] for node_id in tree.nodes}
+    for source, target, _ in edges:
+        children[source].append(target)
+
+    root = tree.root_node_id if tree.root_node_id in tree.nodes else None
+    order, forward = topological_order(root, children.__getitem__)
+    layer = dict.fromkeys(order, 0)
+    for node_id in order:
+        for child in forward[node_id]:
+            layer[child] = max(layer[child], layer[node_id] + 1)
+
+    extra = max(layer.values(), default=-1) + 1
+    for node_id in tree.nodes:
+        layer.setdefault(node_id, extra)
+    return layer
+
+
+def render_layout(tree: DecisionTree) -> dict[str, Any]:
+    """
+    Compute drawing coordinates for every node.
+
+    Nodes are layered top to bottom, then ordered within each layer by the
+    average position of their parents to reduce edge crossings.
+
+    :param tree: The decision tree.
+    :return: Nodes with coordinates, edges and the drawing size.
+    """
+    edges = _edges(tree)
+    layer = _layers(tree, edges)
+    parents: dict[str, list[str]] = {node_id: [] for node_id in tree.nodes}
+    for source, target, _ in edges:
+        parents[target].append(source)
+
+    rows: dict[int, list[str]] = {}
+    for node_id in tree.nodes:
+        rows.setdefault(layer[node_id], []).append(node_id)
+
+    column: dict[str, float] = {}
+    for depth in sorted(rows):
+        row = rows[depth]
+
+        def barycenter(node_id: str) -> float:
+            placed = [column[p] for p in parents[node_id] if p in column]
+            return sum(placed) / len(placed) if placed else float("inf")
+
+        row.sort(key=barycenter)
+        for index, node_id in enumerate(row):
+            column[node_id] = index
+
+    width = max((len(row) for row in rows.values()), default=0)
+    nodes = []
+    for depth in sorted(rows):
+        row = rows[depth]
+        offset = (width - len(row)) / 2
+        for index, node_id in enumerate(row):
+            node = tree.nodes[node_id]
+            nodes.append(
+                {
+                    "id": node_id,
+                    "type": node.type,
+                    "label": _label(node),
+                    "layer": depth,
+                    "x": (offset + index) * NODE_SPACING_X,
+                    "y": depth * NODE_SPACING_Y,
+                }
+            )
+    return {
+        "root_node_id": tree.root_node_id,
+        "nodes": nodes,
+        "edges": [
+            {"source": source, "target": target, "label": label}
+            for source, target, label in edges
+        ],
+        "width": max(0, width - 1) * NODE_SPACING_X,
+        "height": (max(rows, default=0)) * NODE_SPACING_Y,
+    }
+
+
+_RENDERERS = {
+    "mermaid": render_mermaid,
+    "dot": render_dot,
+    "layout": render_layout,
+}
+
+
+def render(runbook_id: str, version: int, tree: DecisionTree, fmt: str) -> Any:
+    """
+    Render a tree, reusing the cached result for this runbook version.
+
+    :param runbook_id: The runbook ID.
+    :param version: The runbook version the tree belongs to.
+    :param tree: The decision tree.
+    :param fmt: One of :data:`RENDER_FORMATS`.
+    :return: The rendered text, or the layout dict.
+    """
+    key = f"{runbook_id}:{fmt}"
+    cached = render_cache.get(key, version)
+    if cached is not None:
+        return cached
+    rendered = _RENDERERS[fmt](tree)
+    size = len(rendered) if isinstance(rendered, str) else len(json.dumps(rendered))
+    render_cache.put(key, rendered, version, size)
+    return rendered
+
+
+async def invalidate_renders(runbook_id: str, version: float | None = None) -> None:
+    """
+    Drop every cached rendering of a runbook, in all workers.
+
+    :param runbook_id: The runbook ID.
+    :param version: The new version, if known.
+    """
+    for fmt in RENDER_FORMATS:
+        await invalidation_bus.publish(
+            render_cache.name, f"{runbook_id}:{fmt}", version
+        )
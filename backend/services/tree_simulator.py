@@ -0,0 +1,271 @@
+"""
+Dry-run simulation of decision trees.
+
+A tree is compiled once into integer-indexed adjacency lists; every path
+statistic is then a single dynamic-programming pass over the nodes in
+reverse topological order. Trees whose options converge can have
+exponentially many paths, but each node is visited once, so counting and
+finding extreme paths stays linear in the size of the tree.
+
+Paths are sequences of nodes from the root to a node with nowhere further
+to go. As for tree statistics and layout, edges that close a cycle are
+ignored, so a path ends where it would loop back. A node's runtime is the
+sum of its commands' timeouts, the worst case for an execution.
+"""
+import random
+from typing import Any
+
+from backend.models.runbook import DecisionTree
+from backend.services.tree_order import topological_order
+
+
+class CompiledTree:
+    """A decision tree as an indexed graph, with its path statistics."""
+
+    __slots__ = (
+        "tree",
+        "ids",
+        "index",
+        "edges",
+        "children",
+        "cost",
+        "order",
+        "count",
+        "longest",
+        "shortest",
+        "steps",
+        "_next_longest",
+        "_next_shortest",
+    )
+
+    def __init__(self, tree: DecisionTree):
+        """
+        Initializes the compiled tree.
+
+        :param tree: The decision tree.
+        """
+        self.tree = tree
+        self.ids = list(tree.nodes)
+        self.index = index = {node_id: i for i, node_id in enumerate(self.ids)}
+        # Outgoing edges as {target: option description}; options leading to
+        # the same node are the same path.
+        self.edges: list[dict[int, str | None]] = []
+        self.cost: list[int] = []
+        for node in tree.nodes.values():
+            # Comparing the type tag is much cheaper than isinstance on models.
+            if node.type == "decision":
+                out: dict[int, str | None] = {}
+                for option in node.options:
+                    if option.next_node_id in index:
+                        out.setdefault(index[option.next_node_id], option.description)
+                self.cost.append(0)
+            else:
+                out = {}
+                if node.next_node_id in index:
+                    out[index[node.next_node_id]] = None
+                self.cost.append(sum(c.timeout_seconds for c in node.commands))
+            self.edges.append(out)
+
+        self.order, forward = topological_order(
+            index.get(tree.root_node_id), self.edges.__getitem__
+        )
+        self.children: list[list[int]] = [
+            forward.get(i, []) for i in range(len(self.ids))
+        ]
+
+        size = len(self.ids)
+        self.count = [0] * size
+        self.longest = [0] * size
+        self.shortest = [0] * size
+        self.steps = [0] * size
+        self._next_longest = [-1] * size
+        self._next_shortest = [-1] * size
+        for node in reversed(self.order):
+            children = self.children[node]
+            if not children:
+                self.count[node] = 1
+                self.longest[node] = self.shortest[node] = self.cost[node]
+                self.steps[node] = 1
+                continue
+            self.count[node] = sum(self.count[child] for child in children)
+            via_longest = max(children, key=self.longest.__getitem__)
+            via_shortest = min(children, key=self.shortest.__getitem__)
+            self.longest[node] = self.cost[node] + self.longest[via_longest]
+            self.shortest[node] = self.cost[node] + self.shortest[via_shortest]
+            self.steps[node] = 1 + max(self.steps[child] for child in children)
+            self._next_longest[node] = via_longest
+            self._next_shortest[node] = via_shortest
+
+    @property
+    def root(self) -> int | None:
+        """The root's index, or None if the root does not exist."""
+        return self.order[0] if self.order else None
+
+    def _follow(self, successors: list[int]) -> list[str]:
+        path = []
+        node = self.root
+        while node is not None and node >= 0:
+            path.append(self.ids[node])
+            node = successors[node]
+        return path
+
+    def summary(self) -> dict[str, Any]:
+        """
+        Summarize the paths through the tree.
+
+        :return: Node and path counts, the most steps on a path, and the
+            longest and shortest path runtimes in seconds.
+        """
+        root = self.root
+        return {
+            "node_count": len(self.ids),
+            "reachable_nodes": len(self.order),
+            "path_count": self.count[root] if root is not None else 0,
+            "max_steps": self.steps[root] if root is not None else 0,
+            "longest_runtime_seconds": self.longest[root] if root is not None else 0,
+            "shortest_runtime_seconds": (
+                self.shortest[root] if root is not None else 0
+            ),
+        }
+
+    def longest_path(self) -> list[str]:
+        """Return the path with the longest runtime."""
+        return self._follow(self._next_longest)
+
+    def shortest_path(self) -> list[str]:
+        """Return the path with the shortest runtime."""
+        return self._follow(self._next_shortest)
+
+    def sample_paths(self, k: int, seed: int | None = None) -> list[list[str]]:
+        """
+        Draw paths uniformly at random.
+
+        At each node a child is chosen with probability proportional to the
+        number of paths through it, so every path is equally likely however
+        the tree is shaped.
+
+        :param k: The number of paths to draw.
+        :param seed: Seeds the draws, for repeatable samples.
+        :return: The paths, which may repeat.
+        """
+        root = self.root
+        if root is None:
+            return []
+        rng = random.Random(seed)
+        paths = []
+        for _ in range(k):
+            path = [self.ids[root]]
+            node = root
+            while children := self.children[node]:
+                if len(children) == 1:
+                    node = children[0]
+                else:
+                    pick = rng.randrange(self.count[node])
+                    for node in children:
+                        pick -= self.count[node]
+                        if pick < 0:
+                            break
+                path.append(self.ids[node])
+            paths.append(path)
+        return paths
+
+    def dry_run(self, path: list[str]) -> list[dict[str, Any]]:
+        """
+        Build the timeline of executing a path, without executing anything.
+
+        Decisions take no time; each command takes its full timeout. The path
+        may follow any edge of the tree, including one that loops back.
+
+        :param path: Node IDs, starting at the root.
+        :return: One step per node, with start and end offsets in seconds.
+        :raises ValueError: If the path does not follow the tree's edges.
+        """
+        index = self.index
+        if not path or path[0] != self.tree.root_node_id or path[0] not in index:
+            raise ValueError("The path must start at the root node")
+        nodes = []
+        for position, node_id in enumerate(path):
+            if node_id not in index:
+                raise ValueError(f"Node {node_id!r} does not exist")
+            if position and index[node_id] not in self.edges[nodes[-1]]:
+                raise ValueError(
+                    f"No edge leads from {path[position - 1]!r} to {node_id!r}"
+                )
+            nodes.append(index[node_id])
+
+        timeline = []
+        clock = 0
+        for position, node in enumerate(nodes):
+            tree_node = self.tree.nodes[self.ids[node]]
+            step: dict[str, Any] = {
+                "node_id": self.ids[node],
+                "type": tree_node.type,
+                "start_s": clock,
+            }
+            if tree_node.type == "action":
+                step["label"] = tree_node.title
+                step["commands"] = []
+                for command in tree_node.commands:
+                    step["commands"].append(
+                        {
+                            "command": command.command,
+                            "start_s": clock,
+                            "end_s": clock + command.timeout_seconds,
+                        }
+                    )
+                    clock += command.timeout_seconds
+            else:
+                step["label"] = tree_node.question
+                if position + 1 < len(nodes):
+                    step["choice"] = self.edges[node][nodes[position + 1]]
+            step["end_s"] = clock
+            timeline.append(step)
+        return timeline
+
+
+def simulate(
+    tree: DecisionTree,
+    samples: int = 3,
+    seed: int | None = None,
+    path: list[str] | None = None,
+) -> dict[str, Any]:
+    """
+    Summarize a tree's paths and dry-run representative ones.
+
+    The representative paths are the longest and shortest by runtime and
+    ``samples`` uniformly drawn ones, without duplicates.
+
+    :param tree: The decision tree.
+    :param samples: The number of paths to draw.
+    :param seed: Seeds the draws.
+    :param path: Dry-run only this path instead.
+    :return: The summary, and each path with its runtime and timeline.
+    :raises ValueError: If ``path`` does not follow the tree's edges.
+    """
+    compiled = CompiledTree(tree)
+    if path is not None:
+        candidates = [("requested", path)]
+    elif compiled.root is None:
+        candidates = []
+    else:
+        candidates = [
+            ("longest", compiled.longest_path()),
+            ("shortest", compiled.shortest_path()),
+        ] + [("sample", sampled) for sampled in compiled.sample_paths(samples, seed)]
+
+    paths = []
+    seen = set()
+    for kind, node_ids in candidates:
+        if tuple(node_ids) in seen:
+            continue
+        seen.add(tuple(node_ids))
+        timeline = compiled.dry_run(node_ids)
+        paths.append(
+            {
+                "kind": kind,
+                "node_ids": node_ids,
+                "runtime_seconds": timeline[-1]["end_s"],
+                "timeline": timeline,
+            }
+        )
+    return {**compiled.summary(), "paths": paths}
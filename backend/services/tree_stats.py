@@ -0,0 +1,65 @@
+"""Complexity statistics of decision trees, denormalized onto runbooks."""
+from backend.models.runbook import ActionNode, DecisionNode, DecisionTree, TreeStats
+from backend.services.tree_order import topological_order
+
+# Bump when the way statistics are computed changes, so the backfill
+# migration recomputes them for every stored runbook.
+TREE_STATS_VERSION = 1
+
+# Catalog sort keys and the stored fields they map to.
+STATS_FIELDS = {
+    "node_count": "stats.node_count",
+    "max_depth": "stats.max_depth",
+    "command_count": "stats.command_count",
+    "worst_case_runtime": "stats.worst_case_runtime_seconds",
+}
+
+
+def _children(tree: DecisionTree, node_id: str) -> list[str]:
+    node = tree.nodes[node_id]
+    if isinstance(node, DecisionNode):
+        targets = [option.next_node_id for option in node.options]
+    else:
+        targets = [node.next_node_id] if node.next_node_id is not None else []
+    return [target for target in targets if target in tree.nodes]
+
+
+def _cost(node: DecisionNode | ActionNode) -> int:
+    if isinstance(node, ActionNode):
+        return sum(command.timeout_seconds for command in node.commands)
+    return 0
+
+
+def tree_stats(tree: DecisionTree) -> TreeStats:
+    """
+    Compute the statistics stored with a runbook.
+
+    Depth and worst-case runtime follow the longest path from the root, where
+    a path's runtime is the sum of its commands' timeouts. Edges that close a
+    cycle are ignored, as they are when the tree is laid out.
+
+    :param tree: The decision tree.
+    :return: The statistics.
+    """
+    root = tree.root_node_id if tree.root_node_id in tree.nodes else None
+    order, forward = topological_order(root, lambda node_id: _children(tree, node_id))
+    depth = dict.fromkeys(order, 1)
+    runtime = {node_id: _cost(tree.nodes[node_id]) for node_id in order}
+    for node_id in order:
+        for child in forward[node_id]:
+            depth[child] = max(depth[child], depth[node_id] + 1)
+            runtime[child] = max(
+                runtime[child], runtime[node_id] + _cost(tree.nodes[child])
+            )
+
+    return TreeStats(
+        version=TREE_STATS_VERSION,
+        node_count=len(tree.nodes),
+        max_depth=max(depth.values(), default=0),
+        command_count=sum(
+            len(node.commands)
+            for node in tree.nodes.values()
+            if isinstance(node, ActionNode)
+        ),
+        worst_case_runtime_seconds=max(runtime.values(), default=0),
+    )
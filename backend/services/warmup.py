@@ -0,0 +1,168 @@
+"""Startup warm-up of the in-process caches."""
+import asyncio
+import logging
+import time
+from typing import Any
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import DESCENDING
+from pymongo.errors import PyMongoError
+
+from backend.config import settings
+from backend.models.enums import SeverityLevel
+from backend.models.runbook import ActionNode, Runbook
+from backend.repositories.runbook import RunbookRepository
+from backend.services.cache import runbook_cache
+from backend.services.speculation import prepare_command_metadata
+from backend.services.tree_render import RENDER_FORMATS, render, render_cache
+
+logger = logging.getLogger(__name__)
+
+
+class CacheWarmer:
+    """
+    Preloads runbooks into the caches before the worker reports ready.
+
+    Critical runbooks are loaded first and pinned, so responders never hit a
+    cold cache for them; then the runbooks behind the most recent sessions
+    are loaded without pinning. Each runbook is cached together with its
+    renderings and the metadata of its actions.
+    """
+
+    def __init__(self, budget_s: float, max_critical: int, recent_runbooks: int):
+        """
+        Initializes the warmer.
+
+        :param budget_s: How long warm-up may delay readiness.
+        :param max_critical: The maximum number of critical runbooks to pin.
+        :param recent_runbooks: The number of recently used runbooks to load.
+        """
+        self.budget_s = budget_s
+        self.max_critical = max_critical
+        self.recent_runbooks = recent_runbooks
+        self.ready = False
+        self.timed_out = False
+        self.pinned = 0
+        self.warmed = 0
+        self.elapsed_s: float | None = None
+        self._task: asyncio.Task | None = None
+
+    def state(self) -> dict[str, Any]:
+        """Return the readiness state and what was warmed."""
+        return {
+            "ready": self.ready,
+            "timed_out": self.timed_out,
+            "pinned": self.pinned,
+            "warmed": self.warmed,
+            "elapsed_s": self.elapsed_s,
+        }
+
+    async def _compile(self, runbook: Runbook, pin: bool) -> None:
+        runbook_id = str(runbook.id)
+        for fmt in RENDER_FORMATS:
+            render(runbook_id, runbook.version, runbook.decision_tree, fmt)
+            if pin:
+                render_cache.pin(f"{runbook_id}:{fmt}")
+        for node in runbook.decision_tree.nodes.values():
+            if isinstance(node, ActionNode):
+                await prepare_command_metadata(runbook, node, pin=pin)
+        if pin:
+            self.pinned += 1
+        self.warmed += 1
+        # Warm-up shares the event loop with requests already being served.
+        await asyncio.sleep(0)
+
+    async def _recent_runbook_ids(self, db: AsyncIOMotorDatabase) -> list[str]:
+        cursor = (
+            db["sessions"]
+            .find({}, {"runbook_id": 1})
+            .sort("_id", DESCENDING)
+            .limit(self.recent_runbooks * 10)
+        )
+        ids = dict.fromkeys(
+            [str(doc["runbook_id"]) async for doc in cursor if doc.get("runbook_id")]
+        )
+        return list(ids)[: self.recent_runbooks]
+
+    async def warm(self, db: AsyncIOMotorDatabase) -> None:
+        """
+        Load critical and recently used runbooks into the caches.
+
+        :param db: The database instance.
+        """
+        repo = RunbookRepository(db)
+        cursor = (
+            repo.collection.find({"severity": SeverityLevel.CRITICAL.value}, {"_id": 1})
+            .sort("updated_at", DESCENDING)
+            .limit(self.max_critical)
+        )
+        critical = [str(doc["_id"]) async for doc in cursor]
+        # Pin before loading, so loading one runbook cannot evict another.
+        for runbook_id in critical:
+            runbook_cache.pin(runbook_id)
+        for runbook in (await repo.get_many(critical)).values():
+            await self._compile(runbook, pin=True)
+
+        recent = [
+            runbook_id
+            for runbook_id in await self._recent_runbook_ids(db)
+            if not runbook_cache.is_pinned(runbook_id)
+        ]
+        for runbook in (await repo.get_many(recent)).values():
+            await self._compile(runbook, pin=False)
+
+    async def run(self, db: AsyncIOMotorDatabase) -> None:
+        """
+        Warm the caches within the time budget, then report ready.
+
+        Readiness is reported even if warm-up fails, runs out of time or is
+        cancelled; the caches then fill on demand as they would without
+        warm-up.
+
+        :param db: The database instance.
+        """
+        began = time.monotonic()
+        try:
+            await asyncio.wait_for(self.warm(db), self.budget_s)
+        except TimeoutError:
+            self.timed_out = True
+            logger.warning("Cache warm-up ran out of its %.0fs budget", self.budget_s)
+        except PyMongoError as exc:
+            logger.warning("Cache warm-up failed: %s", exc)
+        except Exception:
+            # A bad runbook must not keep the worker out of rotation.
+            logger.exception("Cache warm-up failed")
+        finally:
+            self.elapsed_s = round(time.monotonic() - began, 3)
+            self.ready = True
+        logger.info(
+            "Cache warm-up done: %d runbooks warmed, %d pinned, %.2fs",
+            self.warmed,
+            self.pinned,
+            self.elapsed_s,
+        )
+
+    def start(self, db: AsyncIOMotorDatabase) -> None:
+        """
+        Start warming the caches in the background.
+
+        :param db: The database instance.
+        """
+        self._task = asyncio.create_task(self.run(db))
+
+    async def stop(self) -> None:
+        """Cancel warm-up if it is still running."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+cache_warmer = CacheWarmer(
+    budget_s=settings.warmup_budget_s,
+    max_critical=settings.warmup_max_critical,
+    recent_runbooks=settings.warmup_recent_runbooks,
+)
@@ -0,0 +1,116 @@
+"""Integration tests for session archival."""
+import asyncio
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from backend.models.enums import SessionStatus
+from backend.services.archive import (
+    SESSION_ARCHIVE_COLLECTION,
+    SessionArchiver,
+    unpack_session,
+)
+
+pytestmark = pytest.mark.integration
+
+
+class _Interrupted(Exception):
+    pass
+
+
+class _SessionDeleteFails:
+    """A database whose sessions collection fails to delete, like a crash."""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+
+    def __getitem__(self, name):
+        collection = self.db[name]
+        if name != "sessions":
+            return collection
+
+        class Collection:
+            def __getattr__(self, attr):
+                return getattr(collection, attr)
+
+            async def delete_many(self, *args, **kwargs):
+                raise _Interrupted
+
+        return Collection()
+
+
+async def _finished_session(db: AsyncIOMotorDatabase, events: int) -> ObjectId:
+    completed = datetime.now(UTC) - timedelta(days=60)
+    session_id = (
+        await db["sessions"].insert_one(
+            {
+                "runbook_id": ObjectId(),
+                "user_id": ObjectId(),
+                "status": SessionStatus.COMPLETED.value,
+                "current_node_id": "node1",
+                "execution_path": ["node1"],
+                "created_at": completed,
+                "updated_at": completed,
+                "completed_at": completed,
+            }
+        )
+    ).inserted_id
+    await db["timelineevents"].insert_many(
+        [
+            {"session_id": session_id, "timestamp": completed, "data": {"n": i}}
+            for i in range(events)
+        ]
+    )
+    return session_id
+
+
+async def _clear(db: AsyncIOMotorDatabase) -> None:
+    for name in ("sessions", "timelineevents", SESSION_ARCHIVE_COLLECTION):
+        await db[name].delete_many({})
+
+
+@pytest.mark.asyncio
+async def test_interrupted_run_keeps_the_archived_events(
+    test_db: AsyncIOMotorDatabase, monkeypatch
+):
+    """Test that a run dying between the two deletes loses no events."""
+    await _clear(test_db)
+    # Let the next run take over the dead run's claim straight away.
+    monkeypatch.setattr("backend.services.archive.ARCHIVE_CLAIM_TTL", timedelta(0))
+    archiver = SessionArchiver(timedelta(days=30), batch_size=10)
+    session_id = await _finished_session(test_db, events=3)
+
+    with pytest.raises(_Interrupted):
+        await archiver.archive_batch(_SessionDeleteFails(test_db))
+    assert await test_db["timelineevents"].count_documents({}) == 0
+    assert await test_db["sessions"].count_documents({}) == 1
+
+    assert await archiver.archive_batch(test_db) == 1
+    assert await test_db["sessions"].count_documents({}) == 0
+    archived = await test_db[SESSION_ARCHIVE_COLLECTION].find_one({"_id": session_id})
+    session, events = unpack_session(archived)
+    assert [event["data"]["n"] for event in events] == [0, 1, 2]
+    assert "archive_claim" not in session
+    await _clear(test_db)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_runs_move_each_session_once(
+    test_db: AsyncIOMotorDatabase,
+):
+    """Test that overlapping runs archive every session with all its events."""
+    await _clear(test_db)
+    archiver = SessionArchiver(timedelta(days=30), batch_size=5)
+    ids = [await _finished_session(test_db, events=2) for _ in range(20)]
+
+    counts = await asyncio.gather(*(archiver.run_once(test_db) for _ in range(4)))
+
+    assert sum(counts) == 20
+    async for archived in test_db[SESSION_ARCHIVE_COLLECTION].find(
+        {"_id": {"$in": ids}}
+    ):
+        assert len(unpack_session(archived)[1]) == 2
+    assert await test_db["sessions"].count_documents({}) == 0
+    await _clear(test_db)
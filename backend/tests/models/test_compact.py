@@ -0,0 +1,104 @@
+"""Unit tests for compact cached runbooks."""
+import bson
+import pytest
+from bson import ObjectId
+
+from backend.models.compact import CompactRunbook
+from backend.models.enums import SeverityLevel
+from backend.models.runbook import ActionNode, Runbook
+from backend.services.tree_stats import tree_stats
+
+
+def _runbook(**tree_overrides):
+    tree = {
+        "root_node_id": "node1",
+        "nodes": {
+            "node1": {
+                "id": "node1",
+                "type": "decision",
+                "question": "Is the service down?",
+                "description": "Check the dashboard.",
+                "options": [
+                    {"description": "Yes", "next_node_id": "node2"},
+                    {"description": "No", "next_node_id": "gone"},
+                ],
+            },
+            "node2": {
+                "id": "node2",
+                "type": "action",
+                "title": "Restart",
+                "description": "Restart the service.",
+                "commands": [
+                    {"command": "restart", "description": "Restart"},
+                    {
+                        "command": "check",
+                        "description": "Check",
+                        "timeout_seconds": 5,
+                        "expected_exit_codes": [0, 3],
+                    },
+                ],
+                "next_node_id": "node1",
+            },
+            "node3": {
+                "id": "renamed",
+                "type": "decision",
+                "question": "Orphan?",
+                "description": "",
+                "options": [],
+            },
+        },
+    }
+    tree.update(tree_overrides)
+    runbook = Runbook(
+        id=ObjectId(),
+        title="Service Down",
+        description="A runbook for when the main service is down.",
+        owner_id=ObjectId(),
+        severity=SeverityLevel.HIGH,
+        execution_environment={"name": "test-env", "base_image": "ubuntu:latest"},
+        decision_tree=tree,
+        version=3,
+        tags=["web", "prod"],
+    )
+    return runbook.model_copy(update={"stats": tree_stats(runbook.decision_tree)})
+
+
+@pytest.mark.parametrize("root", ["node1", "missing"])
+def test_round_trip(root):
+    """Test that models and documents rebuilt from the compact form are equal
+    to the originals, including dangling edges and mismatched node IDs."""
+    runbook = _runbook(root_node_id=root)
+    compact = CompactRunbook(runbook)
+
+    rebuilt = compact.to_model()
+    assert rebuilt == runbook
+    assert isinstance(rebuilt.decision_tree.nodes["node2"], ActionNode)
+    assert rebuilt.severity is SeverityLevel.HIGH
+    assert rebuilt.model_dump(mode="json") == runbook.model_dump(mode="json")
+
+    stored = bson.decode(bson.encode(runbook.model_dump(by_alias=True)))
+    assert bson.decode(bson.encode(compact.to_document())) == stored
+
+
+def test_compact_runbooks_are_immutable():
+    """Test that compact runbooks and trees reject attribute changes."""
+    compact = CompactRunbook(_runbook())
+    with pytest.raises(AttributeError):
+        compact.title = "Changed"
+    with pytest.raises(AttributeError):
+        compact.tree.root = 0
+    with pytest.raises(AttributeError):
+        compact.extra = 1
+
+
+def test_repeated_strings_are_shared():
+    """Test that node IDs, labels, commands and exit codes are shared across
+    runbooks."""
+    first, second = CompactRunbook(_runbook()), CompactRunbook(_runbook())
+    assert first.tree.names[0] is second.tree.names[0]
+    assert first.tree.edge_labels[0] is second.tree.edge_labels[0]
+    assert first.tree.commands[0] is second.tree.commands[0]
+    assert first.tree.exit_codes[0] is second.tree.exit_codes[0]
+    # Node IDs are only stored twice when they differ from their keys.
+    assert first.tree.ids is not None
+    assert CompactRunbook(_runbook(nodes={})).tree.ids is None
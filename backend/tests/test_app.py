@@ -1,6 +1,12 @@
+from unittest.mock import AsyncMock
+
+import pytest
 from fastapi.testclient import TestClient
+from pymongo.errors import PyMongoError
 
-from backend.app import app
+from backend.app import _retry_startup_steps, app
+from backend.config import settings
+from backend.services.warmup import cache_warmer
 
 client = TestClient(app)
 
@@ -24,3 +30,46 @@ def test_root():
     response = client.get("/")
     assert response.status_code == 200
     assert response.json() == {"message": "Decision First Runbooks API is running!"}
+
+
+def test_metrics():
+    """Tests that the /metrics endpoint exposes request metrics."""
+    client.get("/health")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert (
+        'http_requests_total{method="GET",route="/health",status="200"}'
+        in response.text
+    )
+
+
+def test_ready_waits_for_warm_up():
+    """Tests that /ready reports 503 until the cache warm-up has finished."""
+    cache_warmer.ready = False
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["error"]["code"] == "warming_up"
+
+    cache_warmer.ready = True
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["data"]["ready"] is True
+
+
+@pytest.mark.asyncio
+async def test_startup_steps_resume_after_a_failure(monkeypatch):
+    """Tests that steps failing while MongoDB is down are retried in order,
+    without running the ones that already succeeded again."""
+    monkeypatch.setattr(settings, "db_health_interval_s", 0)
+    first = AsyncMock()
+    second = AsyncMock(side_effect=[PyMongoError("down"), None])
+    third = AsyncMock()
+    steps = [first, second, third]
+
+    await _retry_startup_steps(steps)
+
+    assert steps == []
+    assert first.await_count == 1
+    assert second.await_count == 2
+    assert third.await_count == 1
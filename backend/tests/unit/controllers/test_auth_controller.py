@@ -0,0 +1,116 @@
+"""Unit tests for the AuthController."""
+from unittest.mock import AsyncMock
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from backend.controllers.auth_controller import AuthController
+from backend.models.enums import UserRole
+from backend.models.token import RefreshToken
+from backend.models.user import User, UserLogin
+from backend.services.revocation import revocation_list
+from backend.services.token import token_service
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def user():
+    """Return a sample user."""
+    return User(
+        id=ObjectId(),
+        username="testuser",
+        email="test@example.com",
+        password_hash="hashed",
+        role=UserRole.VIEWER,
+    )
+
+
+@pytest.fixture
+def controller(user):
+    """Return an AuthController with mocked repositories."""
+    controller = AuthController.__new__(AuthController)
+    controller.user_repo = AsyncMock()
+    controller.user_repo.get.return_value = user
+    controller.refresh_token_repo = AsyncMock()
+    return controller
+
+
+def _refresh_token(user, family_id, jti):
+    return token_service.create_refresh_token(
+        {"sub": str(user.id), "jti": jti, "fam": family_id}
+    )
+
+
+async def test_refresh_rotates_token(controller, user):
+    """Test that a live refresh token is rotated within its family."""
+    controller.refresh_token_repo.rotate.return_value = RefreshToken(
+        jti="jti-1",
+        family_id="family-ok",
+        user_id=user.id,
+        expires_at="2100-01-01T00:00:00Z",
+    )
+
+    _, access_token, refresh_token = await controller.refresh(
+        _refresh_token(user, "family-ok", "jti-1")
+    )
+
+    access = token_service.decode_token(access_token)
+    refresh = token_service.decode_token(refresh_token)
+    assert access["fam"] == refresh["fam"] == "family-ok"
+    assert refresh["jti"] != "jti-1"
+    controller.refresh_token_repo.create.assert_awaited_once()
+
+
+async def test_refresh_reuse_revokes_family(controller, user):
+    """Test that presenting an already rotated token revokes its family."""
+    controller.refresh_token_repo.rotate.return_value = None
+
+    with pytest.raises(HTTPException) as excinfo:
+        await controller.refresh(_refresh_token(user, "family-reused", "jti-1"))
+
+    assert excinfo.value.status_code == 401
+    controller.refresh_token_repo.revoke_family.assert_awaited_once_with(
+        "family-reused"
+    )
+    assert revocation_list.is_revoked("family-reused")
+
+
+async def test_refresh_rejects_access_token(controller, user):
+    """Test that an access token cannot be used as a refresh token."""
+    access_token = token_service.create_access_token({"sub": str(user.id)})
+
+    with pytest.raises(HTTPException):
+        await controller.refresh(access_token)
+    controller.refresh_token_repo.rotate.assert_not_awaited()
+
+
+async def test_login_verifies_a_password_even_without_an_account(
+    controller, user, monkeypatch
+):
+    """Test that unknown and inactive accounts cost the same bcrypt work, and
+    that the normalized email is what is looked up."""
+    checked = []
+    monkeypatch.setattr(
+        "backend.controllers.auth_controller.password_service.verify_password",
+        lambda password, hash: checked.append(hash) or True,
+    )
+    monkeypatch.setattr(
+        "backend.controllers.auth_controller._dummy_hash", lambda: "dummy"
+    )
+    credentials = UserLogin(email="  Nobody@Example.com ", password="secret")
+
+    controller.user_repo.get_by_email.return_value = None
+    with pytest.raises(HTTPException) as excinfo:
+        await controller.login(credentials, "192.0.2.10")
+    assert excinfo.value.status_code == 401
+    controller.user_repo.get_by_email.assert_awaited_with("nobody@example.com")
+
+    controller.user_repo.get_by_email.return_value = user.model_copy(
+        update={"is_active": False}
+    )
+    with pytest.raises(HTTPException):
+        await controller.login(credentials, "192.0.2.10")
+
+    assert checked == ["dummy", "dummy"]
@@ -0,0 +1,227 @@
+"""Unit tests for the SessionController."""
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from backend.controllers.session_controller import SessionController
+from backend.models.enums import SessionStatus, SeverityLevel
+from backend.models.runbook import Command, Runbook
+from backend.models.session import Session
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def runbook():
+    """Return a sample runbook."""
+    return Runbook(
+        id=ObjectId(),
+        title="Service Down",
+        description="A runbook for when the main service is down.",
+        owner_id=ObjectId(),
+        severity=SeverityLevel.CRITICAL,
+        execution_environment={"name": "test-env", "base_image": "ubuntu:latest"},
+        decision_tree={
+            "root_node_id": "node1",
+            "nodes": {
+                "node1": {
+                    "id": "node1",
+                    "type": "decision",
+                    "question": "Is the service down?",
+                    "description": "Check the main dashboard.",
+                    "options": [
+                        {"description": "Yes", "next_node_id": "node2"},
+                        {"description": "No", "next_node_id": "node3"},
+                    ],
+                },
+                "node2": {
+                    "id": "node2",
+                    "type": "action",
+                    "title": "Restart the service",
+                    "description": "Use the restart script.",
+                    "commands": [],
+                },
+                "node3": {
+                    "id": "node3",
+                    "type": "action",
+                    "title": "Check for latency",
+                    "description": "Look at the latency graphs.",
+                    "commands": [],
+                },
+            },
+        },
+        version=3,
+    )
+
+
+@pytest.fixture
+def session(runbook):
+    """Return an active session at the root node."""
+    return Session(
+        id=ObjectId(),
+        runbook_id=runbook.id,
+        runbook_version=3,
+        user_id=ObjectId(),
+        status=SessionStatus.ACTIVE,
+        current_node_id="node1",
+        execution_path=["node1"],
+    )
+
+
+@pytest.fixture
+def controller(runbook, session):
+    """Return a SessionController with mocked repositories."""
+    controller = SessionController.__new__(SessionController)
+    controller.session_repo = AsyncMock()
+    controller.session_repo.get.return_value = session
+    controller.session_repo.update.return_value = session
+    controller.runbook_repo = AsyncMock()
+    controller.runbook_repo.get.return_value = runbook
+    controller.analytics_repo = AsyncMock()
+    controller.analytics_repo.get_option_choices.return_value = ({}, 0)
+    return controller
+
+
+async def test_advance_records_option_choice(controller, session):
+    """Test that choosing an option updates the path and the analytics."""
+    await controller.advance(str(session.id), "node3")
+
+    update = controller.session_repo.update.await_args.args[1]
+    assert update.execution_path == ["node1", "node3"]
+    args = controller.analytics_repo.record_advance.await_args.args
+    assert args[:5] == (session.runbook_id, 3, "node1", "node3", 1)
+
+
+async def test_start_speculates_on_root_decision(controller, runbook, monkeypatch):
+    """Test that starting at a decision prepares its likely next actions."""
+    preparer = MagicMock()
+    monkeypatch.setattr(
+        "backend.controllers.session_controller.speculative_preparer", preparer
+    )
+    controller.session_repo.create.return_value = Session(
+        id=ObjectId(),
+        runbook_id=runbook.id,
+        user_id=ObjectId(),
+        status=SessionStatus.ACTIVE,
+        current_node_id="node1",
+    )
+    controller.analytics_repo.get_option_choices.return_value = ({"1": 4}, 5)
+
+    await controller.start(str(runbook.id), MagicMock(id=ObjectId()))
+
+    args = preparer.on_decision.call_args.args
+    assert args[2] is runbook.decision_tree.nodes["node1"]
+    assert args[3:] == ({"1": 4}, 5)
+
+
+async def test_advance_into_action_settles_speculation(
+    controller, session, monkeypatch
+):
+    """Test that entering an action node reports it to the preparer."""
+    preparer = MagicMock()
+    monkeypatch.setattr(
+        "backend.controllers.session_controller.speculative_preparer", preparer
+    )
+    await controller.advance(str(session.id), "node2")
+    preparer.on_enter.assert_called_once_with(str(session.id), "node2")
+
+
+async def test_advance_into_action_returns_its_metadata(controller, session):
+    """Test that entering an action node returns what is needed to run it."""
+    updated, action = await controller.advance(str(session.id), "node2")
+    assert updated is session
+    assert action["node_id"] == "node2"
+    assert action["image"] == "ubuntu:latest"
+
+
+async def test_action_to_action_is_not_a_speculation_outcome(
+    controller, runbook, session, monkeypatch
+):
+    """Test that only actions entered from a decision count as hits or misses."""
+    preparer = MagicMock()
+    monkeypatch.setattr(
+        "backend.controllers.session_controller.speculative_preparer", preparer
+    )
+    runbook.decision_tree.nodes["node2"].next_node_id = "node3"
+    session.current_node_id = "node2"
+    session.execution_path = ["node1", "node2"]
+
+    _, action = await controller.advance(str(session.id), "node3")
+
+    assert action["node_id"] == "node3"
+    preparer.on_enter.assert_not_called()
+
+
+async def test_advance_rejects_unreachable_node(controller, session):
+    """Test that a session cannot jump to a node that is not an option."""
+    with pytest.raises(HTTPException) as excinfo:
+        await controller.advance(str(session.id), "node9")
+    assert excinfo.value.status_code == 400
+    controller.analytics_repo.record_advance.assert_not_awaited()
+
+
+async def test_complete_records_path(controller, session):
+    """Test that completing a session records its terminal path."""
+    await controller.complete(str(session.id), SessionStatus.FAILED)
+
+    args = controller.analytics_repo.record_completion.await_args.args
+    assert args[:4] == (session.runbook_id, 3, ["node1"], SessionStatus.FAILED)
+
+
+async def test_complete_rejects_non_final_status(controller, session):
+    """Test that only final statuses can complete a session."""
+    with pytest.raises(HTTPException) as excinfo:
+        await controller.complete(str(session.id), SessionStatus.PAUSED)
+    assert excinfo.value.status_code == 400
+
+
+async def test_advance_is_conditional_on_the_state_read(controller, session):
+    """Test that a concurrent advance makes the losing request fail with 409."""
+    await controller.advance(str(session.id), "node3")
+    conditions = controller.session_repo.update.await_args.kwargs["conditions"]
+    assert conditions == {"status": "active", "current_node_id": "node1"}
+
+    controller.session_repo.update.reset_mock()
+    controller.analytics_repo.record_advance.reset_mock()
+    controller.session_repo.update.return_value = None
+    with pytest.raises(HTTPException) as excinfo:
+        await controller.advance(str(session.id), "node3")
+    assert excinfo.value.status_code == 409
+    controller.analytics_repo.record_advance.assert_not_awaited()
+
+
+async def test_complete_conflicts_with_a_concurrent_change(controller, session):
+    """Test that completing a session changed meanwhile records nothing."""
+    controller.session_repo.update.return_value = None
+    with pytest.raises(HTTPException) as excinfo:
+        await controller.complete(str(session.id), SessionStatus.COMPLETED)
+    assert excinfo.value.status_code == 409
+    controller.analytics_repo.record_completion.assert_not_awaited()
+
+
+async def test_run_command_queues_a_single_attempt(controller, runbook, session):
+    """Test that a command of the current action is queued to run once, and
+    commands of other nodes are refused."""
+    runbook.decision_tree.nodes["node2"].commands = [
+        Command(command="./restart.sh", description="Restart")
+    ]
+    session.current_node_id = "node2"
+    controller.job_repo = AsyncMock()
+    controller.job_repo.create.side_effect = lambda job: job
+    user = MagicMock(id=ObjectId())
+
+    job = await controller.run_command(str(session.id), "node2", 0, user)
+
+    assert job.kind == "run_command"
+    assert job.max_attempts == 1
+    assert job.payload == {
+        "session_id": str(session.id),
+        "node_id": "node2",
+        "command_index": 0,
+    }
+    for node_id, index in (("node2", 1), ("node3", 0)):
+        with pytest.raises(HTTPException) as excinfo:
+            await controller.run_command(str(session.id), node_id, index, user)
+        assert excinfo.value.status_code == 400
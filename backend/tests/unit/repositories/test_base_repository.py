@@ -0,0 +1,145 @@
+"""Unit tests for the BaseRepository write paths."""
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from bson import ObjectId
+
+from backend.models.runbook import RunbookUpdate
+from backend.models.session import SessionUpdate
+from backend.repositories.base import VersionConflictError
+from backend.repositories.runbook import RunbookRepository
+from backend.repositories.session import SessionRepository
+from backend.services.cache import LRUCache
+
+pytestmark = pytest.mark.asyncio
+
+
+def _db(collection):
+    db = MagicMock()
+    db.__getitem__.return_value = collection
+    return db
+
+
+@pytest.fixture
+def runbook_doc():
+    """Return a stored runbook document."""
+    return {
+        "_id": ObjectId(),
+        "title": "Renamed",
+        "description": "A runbook for when the main service is down.",
+        "owner_id": ObjectId(),
+        "severity": "critical",
+        "execution_environment": {"name": "test-env", "base_image": "ubuntu"},
+        "decision_tree": {"root_node_id": "node1", "nodes": {}},
+        "version": 4,
+    }
+
+
+async def test_update_matches_and_increments_version(runbook_doc):
+    """Test that versioned updates compare-and-set on the version."""
+    collection = MagicMock()
+    collection.find_one_and_update = AsyncMock(return_value=runbook_doc)
+    repo = RunbookRepository(_db(collection))
+
+    runbook = await repo.update(
+        str(runbook_doc["_id"]), RunbookUpdate(title="Renamed"), expected_version=3
+    )
+
+    query, update = collection.find_one_and_update.await_args.args
+    assert query == {"_id": runbook_doc["_id"], "version": 3}
+    assert update["$inc"] == {"version": 1}
+    assert update["$set"]["title"] == "Renamed"
+    assert runbook.version == 4
+
+
+async def test_update_conflict_reports_current_version(runbook_doc):
+    """Test that a stale expected version raises a conflict."""
+    collection = MagicMock()
+    collection.find_one_and_update = AsyncMock(return_value=None)
+    collection.find_one = AsyncMock(return_value={"version": 7})
+    repo = RunbookRepository(_db(collection))
+
+    with pytest.raises(VersionConflictError) as excinfo:
+        await repo.update(
+            str(runbook_doc["_id"]), RunbookUpdate(title="x"), expected_version=3
+        )
+    assert excinfo.value.current_version == 7
+
+
+async def test_update_missing_document_returns_none(runbook_doc):
+    """Test that updating a missing document is not reported as a conflict."""
+    collection = MagicMock()
+    collection.find_one_and_update = AsyncMock(return_value=None)
+    collection.find_one = AsyncMock(return_value=None)
+    repo = RunbookRepository(_db(collection))
+
+    assert (
+        await repo.update(
+            str(runbook_doc["_id"]), RunbookUpdate(title="x"), expected_version=3
+        )
+        is None
+    )
+
+
+async def test_unversioned_update_has_no_version_check():
+    """Test that models without a version are updated unconditionally."""
+    collection = MagicMock()
+    collection.find_one_and_update = AsyncMock(return_value=None)
+    collection.find_one = AsyncMock(return_value=None)
+    repo = SessionRepository(_db(collection))
+    session_id = ObjectId()
+
+    await repo.update(str(session_id), SessionUpdate(current_node_id="node2"))
+
+    query, update = collection.find_one_and_update.await_args.args
+    assert query == {"_id": session_id}
+    assert "$inc" not in update
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for doc in self.docs:
+            yield doc
+
+
+async def test_get_many_uses_one_in_query_and_the_cache(runbook_doc, monkeypatch):
+    """Test that uncached IDs are fetched together with a single $in query."""
+    cache = LRUCache("test_runbooks", max_entries=10, max_bytes=1 << 20)
+    monkeypatch.setattr(RunbookRepository, "cache", cache)
+    collection = MagicMock()
+    collection.find = MagicMock(return_value=_Cursor([runbook_doc]))
+    repo = RunbookRepository(_db(collection))
+    cached_id = str(ObjectId())
+    cache.put(cached_id, "cached-runbook", 1)
+    fetched_id = str(runbook_doc["_id"])
+
+    found = await repo.get_many([fetched_id, cached_id, fetched_id, str(ObjectId())])
+
+    query = collection.find.call_args.args[0]
+    assert len(query["_id"]["$in"]) == 2
+    assert found[cached_id] == "cached-runbook"
+    assert found[fetched_id].version == 4
+    assert len(found) == 2
+    assert fetched_id in cache
+
+
+async def test_runbook_update_stores_tree_stats(runbook_doc):
+    """Test that replacing the decision tree recomputes its statistics."""
+    collection = MagicMock()
+    collection.find_one_and_update = AsyncMock(return_value=runbook_doc)
+    repo = RunbookRepository(_db(collection))
+
+    await repo.update(str(runbook_doc["_id"]), RunbookUpdate(title="Renamed"))
+    _, update = collection.find_one_and_update.await_args.args
+    assert "stats" not in update["$set"]
+
+    tree = {"root_node_id": "node1", "nodes": {}}
+    await repo.update(str(runbook_doc["_id"]), RunbookUpdate(decision_tree=tree))
+    _, update = collection.find_one_and_update.await_args.args
+    assert update["$set"]["stats"]["node_count"] == 0
@@ -0,0 +1,216 @@
+"""Unit tests for chunked command output storage."""
+from unittest.mock import MagicMock
+
+import pytest
+from bson import ObjectId
+
+from backend.models.execution_environment import ExecutionEnvironment
+from backend.models.runbook import Command
+from backend.models.session import CommandOutput
+from backend.repositories.command_output import CommandOutputRepository
+from backend.services.command_output import OutputWriter, follow, run_command
+
+pytestmark = pytest.mark.asyncio
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs.sort(key=lambda doc: doc[key], reverse=direction < 0)
+        return self
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for doc in self.docs:
+            yield doc
+
+
+class _Chunks:
+    """A minimal in-memory stand-in for the chunk collection."""
+
+    def __init__(self):
+        self.docs = {}
+        self.reads = 0
+
+    async def update_one(self, query, update, upsert=False):
+        key = (query["output_id"], query["n"])
+        self.docs[key] = {**query, **update["$set"]}
+
+    def find(self, query, projection=None):
+        bounds = query.get("n", {})
+        docs = [
+            doc
+            for (output_id, n), doc in self.docs.items()
+            if output_id == query["output_id"]
+            and bounds.get("$gte", n) <= n <= bounds.get("$lte", n)
+        ]
+        self.reads += len(docs)
+        return _Cursor(docs)
+
+
+class _Repo(CommandOutputRepository):
+    def __init__(self):
+        super().__init__(MagicMock())
+        self.chunks = _Chunks()
+        self.outputs = {}
+
+    async def set_progress(
+        self, output_id, length, line_count, exit_code=None, complete=False
+    ):
+        output = self.outputs[output_id]
+        output.length, output.line_count, output.complete = length, line_count, complete
+
+    async def get(self, id):
+        return self.outputs.get(ObjectId(id))
+
+    async def create(self, output):
+        output = output.model_copy(update={"id": ObjectId()})
+        self.outputs[output.id] = output
+        return output
+
+
+async def _write(repo, data, chunk_size=16):
+    output = CommandOutput(
+        id=ObjectId(),
+        session_id=ObjectId(),
+        node_id="node1",
+        command_index=0,
+        stream="stdout",
+        chunk_size=chunk_size,
+    )
+    repo.outputs[output.id] = output
+    writer = OutputWriter(repo, output, flush_interval=60, level=1)
+    for start in range(0, len(data), 7):
+        await writer.write(data[start : start + 7])
+    return writer, output
+
+
+@pytest.fixture
+def log():
+    """Return 40 numbered lines of output."""
+    return b"".join(b"line %02d\n" % i for i in range(40))
+
+
+async def test_writes_fixed_size_compressed_chunks(log):
+    """Test that output is split into full chunks plus a flushed remainder."""
+    repo = _Repo()
+    writer, output = await _write(repo, log)
+    await writer.close(exit_code=0)
+
+    sizes = [doc["length"] for _, doc in sorted(repo.chunks.docs.items())]
+    assert sizes == [16] * 20
+    assert output.length == len(log)
+    assert output.line_count == 40
+    assert output.complete is True
+
+
+async def test_range_reads_only_touch_needed_chunks(log):
+    """Test that a byte range is served from the chunks covering it."""
+    repo = _Repo()
+    writer, output = await _write(repo, log)
+    await writer.close()
+
+    repo.chunks.reads = 0
+    assert await repo.read_range(output, 20, 45) == log[20:45]
+    assert repo.chunks.reads == 2
+    assert await repo.read_range(output, 300, 400) == log[300:]
+
+
+async def test_tail_returns_last_lines(log):
+    """Test that tail reads return the last lines and where they start."""
+    repo = _Repo()
+    writer, output = await _write(repo, log)
+    await writer.close()
+
+    data, offset = await repo.tail(output, 3)
+    assert data == b"line 37\nline 38\nline 39\n"
+    assert offset == len(log) - len(data)
+
+    data, offset = await repo.tail(output, 100)
+    assert data == log and offset == 0
+
+
+async def test_tail_without_trailing_newline():
+    """Test that an unterminated last line counts as a line."""
+    repo = _Repo()
+    writer, output = await _write(repo, b"a\nb\nc")
+    await writer.close()
+    assert (await repo.tail(output, 2))[0] == b"b\nc"
+
+
+async def test_follow_streams_until_complete(log):
+    """Test that follow yields everything from the offset once complete."""
+    repo = _Repo()
+    writer, output = await _write(repo, log)
+    await writer.close()
+
+    received = [part async for part in follow(repo, str(output.id), 100, 0, 64, 60)]
+    assert b"".join(received) == log[100:]
+
+
+async def test_follow_gives_up_on_an_idle_stream(log):
+    """Test that follow ends when a stream is never completed."""
+    repo = _Repo()
+    writer, output = await _write(repo, log)
+    await writer.flush()
+
+    received = [part async for part in follow(repo, str(output.id), 0, 0.01, 64, 0.05)]
+    assert b"".join(received) == log
+    assert not output.complete
+
+
+class _Container:
+    def __init__(self, output, status):
+        self.output = output
+        self.status = status
+        self.removed = False
+
+    def logs(self, stdout, stderr, stream, follow):
+        return iter(self.output["stdout" if stdout else "stderr"])
+
+    def wait(self):
+        return self.status
+
+    def kill(self):
+        pass
+
+    def remove(self, force):
+        self.removed = True
+
+
+async def test_run_command_stores_both_streams(monkeypatch):
+    """Test that a command's stdout and stderr are stored while it runs and
+    completed with its exit code."""
+    container = _Container(
+        {"stdout": [b"line 1\n", b"line 2\n"], "stderr": [b"warning\n"]},
+        {"StatusCode": 3},
+    )
+    client = MagicMock()
+    client.containers.run.return_value = container
+    monkeypatch.setattr("docker.from_env", lambda: client)
+    repo = _Repo()
+
+    result = await run_command(
+        repo,
+        ObjectId(),
+        "node2",
+        0,
+        Command(command="./check.sh", description="", timeout_seconds=5),
+        ExecutionEnvironment(name="env", base_image="ubuntu:latest"),
+    )
+
+    assert result["exit_code"] == 3
+    stdout = repo.outputs[ObjectId(result["outputs"]["stdout"])]
+    stderr = repo.outputs[ObjectId(result["outputs"]["stderr"])]
+    assert stdout.complete and stderr.complete
+    assert await repo.read_range(stdout, 0, stdout.length) == b"line 1\nline 2\n"
+    assert await repo.read_range(stderr, 0, stderr.length) == b"warning\n"
+    assert client.containers.run.call_args.args == (
+        "ubuntu:latest",
+        ["sh", "-c", "./check.sh"],
+    )
+    assert container.removed
@@ -0,0 +1,60 @@
+"""Unit tests for the JobRepository queue operations."""
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from bson import ObjectId
+
+from backend.models.enums import JobStatus
+from backend.repositories.job import JobRepository
+
+pytestmark = pytest.mark.asyncio
+
+
+def _repo(collection):
+    db = MagicMock()
+    db.__getitem__.return_value = collection
+    return JobRepository(db)
+
+
+async def test_claim_takes_queued_or_expired_jobs():
+    """Test that claiming is one atomic update taking a lease."""
+    collection = MagicMock()
+    collection.find_one_and_update = AsyncMock(
+        return_value={"_id": ObjectId(), "kind": "export", "attempts": 1}
+    )
+    repo = _repo(collection)
+
+    job = await repo.claim("worker-1", ["export"], timedelta(seconds=30))
+
+    query, update = collection.find_one_and_update.await_args.args
+    statuses = {clause["status"] for clause in query["$or"]}
+    assert statuses == {JobStatus.QUEUED.value, JobStatus.RUNNING.value}
+    assert update["$set"]["worker_id"] == "worker-1"
+    assert update["$inc"] == {"attempts": 1}
+    assert job.kind == "export"
+
+
+async def test_cancel_running_job_sets_flag():
+    """Test that cancelling a running job flags it for its worker."""
+    job_id = ObjectId()
+    collection = MagicMock()
+    collection.find_one_and_update = AsyncMock(
+        side_effect=[
+            None,
+            {
+                "_id": job_id,
+                "kind": "export",
+                "status": "running",
+                "cancel_requested": True,
+            },
+        ]
+    )
+    repo = _repo(collection)
+
+    job = await repo.request_cancel(str(job_id))
+
+    queued_query = collection.find_one_and_update.await_args_list[0].args[0]
+    assert queued_query["status"] == JobStatus.QUEUED.value
+    assert job.status == JobStatus.RUNNING
+    assert job.cancel_requested is True
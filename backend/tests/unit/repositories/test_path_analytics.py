@@ -0,0 +1,103 @@
+"""Unit tests for the path analytics counters."""
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from bson import ObjectId
+
+from backend.models.enums import SessionStatus
+from backend.repositories.path_analytics import (
+    PathAnalyticsRepository,
+    _bucket_median,
+    _dwell_bucket,
+    _field,
+    _unfield,
+    summarize,
+)
+
+
+def test_field_escaping_round_trips():
+    """Test that node IDs with reserved characters survive escaping."""
+    node_id = "$step.1%"
+    assert "." not in _field(node_id)
+    assert "$" not in _field(node_id)
+    assert _unfield(_field(node_id)) == node_id
+
+
+def test_dwell_median():
+    """Test that the median is estimated from the bucket holding it."""
+    buckets = {
+        str(_dwell_bucket(0.2)): 1,
+        str(_dwell_bucket(5)): 3,
+        str(_dwell_bucket(100)): 1,
+    }
+    # 5 seconds falls into [4, 8), whose midpoint is 6.
+    assert _bucket_median(buckets) == 6
+    assert _bucket_median({}) is None
+
+
+def test_summarize():
+    """Test conversion rates and dead ends in the summary."""
+    runbook_id = ObjectId()
+    doc = {
+        "runbook_id": runbook_id,
+        "version": 2,
+        "sessions_started": 10,
+        "sessions_completed": 6,
+        "sessions_failed": 2,
+        "visits": {"root": 10, "fix": 7, "escalate": 3},
+        "exits": {"root": 10},
+        "option_choices": {"root": {"0": 7, "1": 3}},
+        "terminals": {
+            "fix": {"completed": 6},
+            "escalate": {"failed": 2},
+        },
+    }
+
+    summary = summarize(doc, [])
+
+    assert summary["runbook_id"] == str(runbook_id)
+    assert summary["sessions"] == {"started": 10, "completed": 6, "failed": 2}
+    assert summary["options"]["root"]["0"]["conversion_rate"] == pytest.approx(0.7)
+    dead_ends = {node["node_id"]: node for node in summary["dead_ends"]}
+    assert dead_ends["escalate"] == {"node_id": "escalate", "failed": 2, "stalled": 1}
+    assert dead_ends["fix"]["stalled"] == 1
+    assert "root" not in dead_ends
+
+
+@pytest.mark.asyncio
+async def test_record_advance_increments_counters():
+    """Test that an advance is recorded with a single upsert."""
+    collection = MagicMock()
+    collection.update_one = AsyncMock()
+    db = MagicMock()
+    db.__getitem__.return_value = collection
+    repo = PathAnalyticsRepository(db)
+
+    await repo.record_advance("rb", 1, "root", "fix", 0, 3.0)
+
+    filter_doc, update = collection.update_one.await_args.args
+    assert filter_doc == {"_id": "rb:1"}
+    assert update["$inc"] == {
+        "exits.root": 1,
+        "visits.fix": 1,
+        "dwell.root.2": 1,
+        "option_choices.root.0": 1,
+    }
+    assert collection.update_one.await_args.kwargs == {"upsert": True}
+
+
+@pytest.mark.asyncio
+async def test_record_completion_counts_path():
+    """Test that completing a session counts its terminal node and path."""
+    collection = MagicMock()
+    collection.update_one = AsyncMock()
+    db = MagicMock()
+    db.__getitem__.return_value = collection
+    repo = PathAnalyticsRepository(db)
+
+    await repo.record_completion("rb", 1, ["root", "fix"], SessionStatus.COMPLETED, 0.5)
+
+    counters_update = collection.update_one.await_args_list[0].args[1]
+    path_update = collection.update_one.await_args_list[1].args[1]
+    assert counters_update["$inc"]["terminals.fix.completed"] == 1
+    assert path_update["$setOnInsert"]["path"] == ["root", "fix"]
@@ -0,0 +1,87 @@
+"""Unit tests for session archival."""
+from datetime import UTC, datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from bson import ObjectId
+
+from backend.models.enums import SessionStatus
+from backend.repositories.session import SessionRepository
+from backend.services.archive import SessionArchiver, pack_session, unpack_session
+
+
+@pytest.fixture
+def session_doc():
+    """Return a finished session document."""
+    return {
+        "_id": ObjectId(),
+        "runbook_id": ObjectId(),
+        "user_id": ObjectId(),
+        "status": SessionStatus.COMPLETED.value,
+        "current_node_id": "node2",
+        "execution_path": ["node1", "node2"],
+        "created_at": datetime(2024, 1, 1, tzinfo=UTC),
+        "updated_at": datetime(2024, 1, 1, tzinfo=UTC),
+        "completed_at": datetime(2024, 1, 1, tzinfo=UTC),
+    }
+
+
+def test_pack_and_unpack_round_trip(session_doc):
+    """Test that sessions and events survive compression."""
+    events = [
+        {"_id": ObjectId(), "session_id": session_doc["_id"], "data": {"n": i}}
+        for i in range(3)
+    ]
+
+    archived = pack_session(session_doc, events)
+    session, restored_events = unpack_session(archived)
+
+    assert archived["_id"] == session_doc["_id"]
+    assert archived["event_count"] == 3
+    assert session["execution_path"] == ["node1", "node2"]
+    assert [event["data"]["n"] for event in restored_events] == [0, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_get_falls_through_to_archive(session_doc):
+    """Test that archived sessions are still returned by the repository."""
+    live = MagicMock()
+    live.find_one = AsyncMock(return_value=None)
+    archive = MagicMock()
+    archive.find_one = AsyncMock(return_value=pack_session(session_doc, []))
+    db = MagicMock()
+    db.__getitem__.side_effect = lambda name: (
+        archive if name == "sessions_archive" else live
+    )
+
+    session = await SessionRepository(db).get(str(session_doc["_id"]))
+
+    assert session is not None
+    assert session.id == session_doc["_id"]
+    assert session.status == SessionStatus.COMPLETED
+
+
+@pytest.mark.asyncio
+async def test_archive_batch_never_replaces_an_archive(session_doc):
+    """Test that archives are insert-only and deletes are bound to the claim."""
+    session_doc["archive_claim"] = {"token": "t1", "expires_at": datetime.now(UTC)}
+    archiver = SessionArchiver(timedelta(days=30), batch_size=10)
+    archiver._claim = AsyncMock(return_value=("t1", [session_doc]))
+    collections = {name: MagicMock() for name in ("timelineevents", "sessions")}
+    collections["sessions_archive"] = MagicMock(bulk_write=AsyncMock())
+    events = collections["timelineevents"].find.return_value.sort.return_value
+    events.__aiter__.return_value = []
+    for name in ("timelineevents", "sessions"):
+        collections[name].delete_many = AsyncMock()
+    db = MagicMock()
+    db.__getitem__.side_effect = collections.__getitem__
+
+    assert await archiver.archive_batch(db) == 1
+
+    (write,) = collections["sessions_archive"].bulk_write.await_args.args[0]
+    assert set(write._doc) == {"$setOnInsert"}
+    assert write._upsert
+    archived = write._doc["$setOnInsert"]
+    assert "archive_claim" not in unpack_session(archived)[0]
+    query = collections["sessions"].delete_many.await_args.args[0]
+    assert query["archive_claim.token"] == "t1"
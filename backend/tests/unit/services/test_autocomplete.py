@@ -0,0 +1,175 @@
+"""Unit tests for runbook title and tag autocomplete."""
+import pytest
+from bson import ObjectId
+
+from backend.services import autocomplete
+from backend.services.autocomplete import AutocompleteIndex
+
+
+def _index():
+    index = AutocompleteIndex(sync_interval=60, memo_entries=100)
+    index.upsert("a", "Database restart", ["db", "prod"])
+    index.upsert("b", "Disk full on database host", ["db"])
+    index.upsert("c", "DNS outage", ["network", "prod"])
+    return index
+
+
+def _texts(suggestions):
+    return [(s["type"], s["text"]) for s in suggestions]
+
+
+def test_suggest_matches_word_starts_case_insensitively():
+    """Test that any word of a title can be typed, in any case."""
+    index = _index()
+    assert _texts(index.suggest("DATA")) == [
+        ("title", "Database restart"),
+        ("title", "Disk full on database host"),
+    ]
+    assert _texts(index.suggest("  restart ")) == [("title", "Database restart")]
+    assert _texts(index.suggest("net")) == [("tag", "network")]
+    assert index.suggest("tart") == []
+    assert index.suggest("") == []
+
+
+def test_suggestions_are_ranked_by_usage():
+    """Test that titles rank by sessions and tags by their runbooks' total."""
+    index = _index()
+    assert _texts(index.suggest("d")) == [
+        ("tag", "db"),
+        ("title", "DNS outage"),
+        ("title", "Database restart"),
+        ("title", "Disk full on database host"),
+    ]
+
+    index.record_uses({"b": 3, "c": 1})
+    suggestions = index.suggest("d")
+    assert _texts(suggestions) == [
+        ("tag", "db"),
+        ("title", "Disk full on database host"),
+        ("title", "DNS outage"),
+        ("title", "Database restart"),
+    ]
+    assert suggestions[0] == {
+        "type": "tag",
+        "text": "db",
+        "runbook_count": 2,
+        "uses": 3,
+    }
+    assert _texts(index.suggest("d", limit=2)) == [
+        ("tag", "db"),
+        ("title", "Disk full on database host"),
+    ]
+
+
+def test_upsert_and_remove_keep_the_index_in_sync():
+    """Test that renamed, retagged and removed runbooks stop being suggested."""
+    index = _index()
+    index.record_uses({"c": 5})
+    assert index.suggest("prod")[0]["uses"] == 5
+
+    index.upsert("c", "Resolver outage", ["network"])
+    assert _texts(index.suggest("dns")) == []
+    assert _texts(index.suggest("res")) == [
+        ("title", "Resolver outage"),
+        ("title", "Database restart"),
+    ]
+    assert index.suggest("prod")[0]["uses"] == 0
+
+    index.remove("a")
+    assert _texts(index.suggest("prod")) == []
+    assert index.suggest("db")[0]["runbook_count"] == 1
+    assert len(index) == 2
+
+
+def test_wide_prefixes_walk_the_ranked_list(monkeypatch):
+    """Test that walking the ranked list gives the same results as scanning."""
+    index = AutocompleteIndex(sync_interval=60, memo_entries=100)
+    for i in range(200):
+        index.upsert(f"r{i}", f"Service {i} down", [f"team-{i % 7}"])
+    index.record_uses({f"r{i}": i % 13 for i in range(200)})
+
+    scanned = {p: index.suggest(p, 15) for p in ("s", "service 1", "t", "d")}
+    monkeypatch.setattr(autocomplete, "SCAN_LIMIT", 0)
+    index._memo.clear()
+    for prefix, expected in scanned.items():
+        assert index.suggest(prefix, 15) == expected
+
+
+def test_rebuild_matches_incremental_updates():
+    """Test that bulk loading builds the same index as one upsert at a time."""
+    incremental = _index()
+    incremental.record_uses({"a": 2, "c": 4})
+    bulk = AutocompleteIndex(sync_interval=60, memo_entries=100)
+    bulk.record_uses({"a": 2, "c": 4})
+    bulk._rebuild(
+        {
+            "a": ("Database restart", ["db", "prod"]),
+            "b": ("Disk full on database host", ["db"]),
+            "c": ("DNS outage", ["network", "prod"]),
+        }
+    )
+    for prefix in ("d", "prod", "o", "n"):
+        assert bulk.suggest(prefix) == incremental.suggest(prefix)
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def __aiter__(self):
+        for doc in self.docs:
+            yield doc
+
+
+class _Collection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        if "_id" in query:
+            return _Cursor([d for d in self.docs if d["_id"] in query["_id"]["$in"]])
+        return _Cursor(self.docs)
+
+    def aggregate(self, pipeline):
+        self.queries.append(pipeline)
+        return _Cursor(self.docs)
+
+
+@pytest.mark.asyncio
+async def test_sync_loads_changes_and_session_counts():
+    """Test the initial load and catch-up from MongoDB, with usage read from
+    the persistent per-runbook session counters."""
+    keep, drop, same = ObjectId(), ObjectId(), ObjectId()
+    runbooks = _Collection(
+        [
+            {"_id": keep, "title": "Database restart", "tags": ["db"], "version": 1},
+            {"_id": drop, "title": "Disk full", "tags": ["db"], "version": 1},
+            {"_id": same, "title": "Network outage", "tags": [], "version": 4},
+        ]
+    )
+    counters = _Collection([{"_id": keep, "uses": 2}])
+    db = {"runbooks": runbooks, "path_analytics": counters}
+    index = AutocompleteIndex(sync_interval=60, memo_entries=100)
+
+    assert await index.sync(db) == 3
+    assert index.suggest("db")[0]["uses"] == 2
+
+    # Changes are found by version, whatever their update time.
+    runbooks.docs = [
+        {"_id": keep, "title": "Database failover", "tags": ["db"], "version": 2},
+        {"_id": same, "title": "Network outage", "tags": [], "version": 4},
+    ]
+    counters.docs = [{"_id": keep, "uses": 3}]
+    assert await index.sync(db) == 1
+    assert runbooks.queries[-1] == {"_id": {"$in": [keep]}}
+    assert _texts(index.suggest("d")) == [
+        ("tag", "db"),
+        ("title", "Database failover"),
+    ]
+    assert index.suggest("db")[0]["uses"] == 3
+
+    # Totals are absolute, so a repeated sync does not count sessions twice.
+    assert await index.sync(db) == 0
+    assert index.suggest("db")[0]["uses"] == 3
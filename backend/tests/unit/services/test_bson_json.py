@@ -0,0 +1,68 @@
+"""Unit tests for the raw BSON to JSON read path."""
+import json
+from datetime import datetime
+
+import bson
+from bson import ObjectId
+from bson.raw_bson import RawBSONDocument
+
+from backend.models.runbook import Runbook
+from backend.services.bson_json import decode_raw, document_to_json, ok_envelope
+
+
+def _stored_runbook():
+    """Return a runbook document as it is written by the repository."""
+    runbook = Runbook(
+        id=ObjectId(),
+        title="Service Down",
+        description="A runbook for when the main service is down.",
+        owner_id=ObjectId(),
+        severity="critical",
+        execution_environment={"name": "test-env", "base_image": "ubuntu:latest"},
+        decision_tree={
+            "root_node_id": "node1",
+            "nodes": {
+                "node1": {
+                    "id": "node1",
+                    "type": "action",
+                    "title": "Restart",
+                    "description": "Restart the service.",
+                    "commands": [
+                        {"command": "systemctl restart app", "description": "Restart"}
+                    ],
+                }
+            },
+        },
+        version=2,
+        tags=["web"],
+        created_at=datetime(2024, 1, 2, 3, 4, 5, 123000),
+        updated_at=datetime(2024, 1, 2, 3, 4, 6),
+    )
+    return runbook.model_dump(by_alias=True)
+
+
+def test_raw_json_matches_model_dump():
+    """Test that the raw path produces the same JSON as dumping the model."""
+    doc = _stored_runbook()
+    raw = RawBSONDocument(bson.encode(doc))
+
+    raw_json = json.loads(document_to_json(decode_raw(raw)))
+
+    assert raw_json == Runbook(**doc).model_dump(mode="json")
+
+
+def test_ok_envelope_wraps_payload():
+    """Test that pre-encoded JSON is wrapped in the success envelope."""
+    body = ok_envelope(document_to_json({"_id": ObjectId("0" * 24), "n": 1}))
+    assert json.loads(body) == {"ok": True, "data": {"id": "0" * 24, "n": 1}}
+
+
+def test_ok_envelope_flags_stale_data():
+    """Test that snapshot data is flagged as stale with the snapshot time."""
+    taken = datetime(2024, 5, 1, 12, 0)
+    body = json.loads(ok_envelope('{"n":1}', stale_since=taken))
+    assert body == {
+        "ok": True,
+        "stale": {"snapshot_at": "2024-05-01T12:00:00"},
+        "data": {"n": 1},
+    }
@@ -0,0 +1,249 @@
+"""Unit tests for the in-process caches."""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import bson
+import pytest
+from bson import ObjectId
+from bson.raw_bson import RawBSONDocument
+
+from backend.models.compact import CompactRunbook
+from backend.repositories.runbook import RunbookRepository
+from backend.services.cache import (
+    DELETED,
+    CacheInvalidationBus,
+    LRUCache,
+    runbook_cache,
+)
+from backend.views.runbook_routes import _read_document
+
+
+def test_lru_evicts_by_entry_count():
+    """Test that the least recently used entry is evicted first."""
+    cache = LRUCache("test", max_entries=2, max_bytes=1000)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert cache.stats()["evictions"] == 1
+
+
+def test_pinned_entries_are_not_evicted():
+    """Test that eviction skips pinned keys, even when they are oldest."""
+    cache = LRUCache("test", max_entries=2, max_bytes=1000)
+    cache.pin("a")
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.put("c", 3)
+    assert "a" in cache and "b" not in cache and "c" in cache
+
+    # Invalidation still drops a pinned entry; it stays pinned when re-cached.
+    cache.invalidate("a")
+    assert "a" not in cache and cache.is_pinned("a")
+
+    # With every other entry pinned, a new entry is the one evicted.
+    cache.pin("c")
+    cache.put("a", 1)
+    cache.put("d", 4)
+    assert "a" in cache and "c" in cache and "d" not in cache
+    assert cache.stats()["pinned"] == 2
+
+
+def test_lru_evicts_by_size():
+    """Test that the cache stays within its byte budget."""
+    cache = LRUCache("test", max_entries=10, max_bytes=100)
+    cache.put("a", 1, size=60)
+    cache.put("b", 2, size=60)
+
+    assert len(cache) == 1
+    assert cache.size_bytes == 60
+
+
+def test_lru_without_a_byte_bound():
+    """Test that a cache without max_bytes is bounded by entry count alone."""
+    cache = LRUCache("test", max_entries=2)
+    cache.put("a", 1, size=10**12)
+    cache.put("b", 2, size=10**12)
+    cache.put("c", 3)
+    assert "a" not in cache and "b" in cache and "c" in cache
+
+
+def test_older_versions_do_not_replace_newer():
+    """Test that a stale read cannot overwrite a newer cached version."""
+    cache = LRUCache("test", max_entries=10, max_bytes=1000)
+    cache.put("a", "v2", version=2)
+    cache.put("a", "v1", version=1)
+    assert cache.get("a") == "v2"
+
+
+def test_versioned_invalidation():
+    """Test that an invalidation only drops entries older than its version."""
+    cache = LRUCache("test", max_entries=10, max_bytes=1000)
+    cache.put("a", "v2", version=2)
+    cache.invalidate("a", version=2)
+    assert "a" in cache
+    cache.invalidate("a", version=3)
+    assert "a" not in cache
+
+
+def test_read_straddling_a_write_is_not_cached():
+    """Test that a version read before an invalidation is not cached after it."""
+    cache = LRUCache("test", max_entries=10, max_bytes=1000)
+    # A read loaded v1, then an update to v2 invalidated the uncached key.
+    cache.invalidate("a", version=2)
+    cache.put("a", "v1", version=1)
+    assert "a" not in cache
+    cache.put("a", "v2", version=2)
+    assert cache.get("a") == "v2"
+
+
+def test_read_straddling_a_delete_is_not_cached():
+    """Test that a document read before its delete is never cached again."""
+    cache = LRUCache("test", max_entries=10, max_bytes=1000)
+    cache.put("a", "v3", version=3)
+    cache.invalidate("a", version=DELETED)
+    assert "a" not in cache
+    cache.put("a", "v3", version=3)
+    cache.put("a", "unversioned")
+    assert "a" not in cache
+
+
+def test_invalidation_floors_are_bounded():
+    """Test that only as many floors as entries are remembered."""
+    cache = LRUCache("test", max_entries=2, max_bytes=1000)
+    for key in "abc":
+        cache.invalidate(key, version=2)
+    cache.put("a", "v1", version=1)
+    cache.put("c", "v1", version=1)
+    assert "a" in cache and "c" not in cache
+
+
+def test_hit_ratio():
+    """Test that hits and misses are reported."""
+    cache = LRUCache("test", max_entries=10, max_bytes=1000)
+    cache.put("a", 1)
+    cache.get("a")
+    cache.get("b")
+    assert cache.stats()["hit_ratio"] == 0.5
+
+
+def test_bus_ignores_own_messages():
+    """Test that a worker does not re-apply its own invalidations."""
+    bus = CacheInvalidationBus(1024)
+    cache = bus.register(LRUCache("test", max_entries=10, max_bytes=1000))
+    cache.put("a", 1)
+
+    bus.apply({"cache": "test", "key": "a", "origin": bus.origin})
+    assert "a" in cache
+    bus.apply({"cache": "test", "key": "a", "origin": "other-worker"})
+    assert "a" not in cache
+
+
+class _TailCursor:
+    def __init__(self, messages):
+        self.messages = messages
+        self.alive = True
+
+    async def __aiter__(self):
+        for message in self.messages:
+            yield message
+        self.alive = False
+
+    async def close(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_bus_follows_insertion_order_not_ids():
+    """Test that a message with a lower ObjectId inserted after the start
+    position, as another process may do within a second, is applied."""
+    bus = CacheInvalidationBus(1024)
+    cache = bus.register(LRUCache("test", max_entries=10, max_bytes=1000))
+    cache.put("old", 1)
+    cache.put("new", 1)
+    lower, start = ObjectId(), ObjectId()
+    messages = [
+        {"_id": ObjectId(), "cache": "test", "key": "old", "origin": "w2"},
+        {"_id": start, "cache": None, "origin": None},
+        {"_id": lower, "cache": "test", "key": "new", "origin": "w2"},
+    ]
+    collection = MagicMock()
+    collection.find.return_value = _TailCursor(messages)
+
+    task = asyncio.create_task(bus._follow(collection, start))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert collection.find.call_args.args[0] == {}
+    assert "old" in cache
+    assert "new" not in cache
+
+
+@pytest.mark.asyncio
+async def test_repository_reads_through_cache():
+    """Test that repeated reads hit MongoDB once and writes invalidate."""
+    runbook_id = ObjectId()
+    doc = {
+        "_id": runbook_id,
+        "title": "Service Down",
+        "description": "A runbook for when the main service is down.",
+        "owner_id": ObjectId(),
+        "severity": "critical",
+        "execution_environment": {"name": "test-env", "base_image": "ubuntu"},
+        "decision_tree": {"root_node_id": "node1", "nodes": {}},
+        "version": 1,
+    }
+    collection = MagicMock()
+    collection.find_one = AsyncMock(return_value=doc)
+    collection.delete_one = AsyncMock(return_value=MagicMock(deleted_count=1))
+    db = MagicMock()
+    db.__getitem__.return_value = collection
+    repo = RunbookRepository(db)
+    runbook_cache.clear()
+
+    first = await repo.get(str(runbook_id))
+    second = await repo.get(str(runbook_id))
+    # Runbooks are cached compactly; every hit builds a fresh model.
+    assert first == second
+    assert isinstance(runbook_cache.get(str(runbook_id)), CompactRunbook)
+    assert collection.find_one.await_count == 1
+
+    await repo.delete(str(runbook_id))
+    assert str(runbook_id) not in runbook_cache
+
+
+@pytest.mark.asyncio
+async def test_raw_runbook_reads_fill_the_cache():
+    """Test that a runbook read as raw BSON is cached for later reads."""
+    runbook_id = ObjectId()
+    raw = RawBSONDocument(
+        bson.encode(
+            {
+                "_id": runbook_id,
+                "title": "Service Down",
+                "description": "A runbook for when the main service is down.",
+                "owner_id": ObjectId(),
+                "severity": "critical",
+                "execution_environment": {"name": "test-env", "base_image": "ubuntu"},
+                "decision_tree": {"root_node_id": "node1", "nodes": {}},
+                "version": 4,
+            }
+        )
+    )
+    repo = RunbookRepository(MagicMock())
+    repo.get_raw = AsyncMock(return_value=raw)
+    runbook_cache.clear()
+
+    doc, snapshot_at = await _read_document(repo, str(runbook_id))
+
+    assert doc["version"] == 4 and snapshot_at is None
+    # The read itself builds no model; the first cache hit does.
+    assert runbook_cache.get(str(runbook_id)) is raw
+    assert repo.get_cached(str(runbook_id)).title == "Service Down"
+    assert isinstance(runbook_cache.get(str(runbook_id)), CompactRunbook)
+    assert runbook_cache.version(str(runbook_id)) == 4
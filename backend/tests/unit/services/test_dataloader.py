@@ -0,0 +1,64 @@
+"""Unit tests for the per-request dataloader."""
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from backend.services.dataloader import DataLoader
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_loads_in_one_tick_are_batched():
+    """Test that concurrent loads are resolved with a single batch call."""
+    batch = AsyncMock(side_effect=lambda keys: {k: k.upper() for k in keys})
+    loader = DataLoader("test", batch)
+
+    values = await asyncio.gather(loader.load("a"), loader.load("b"), loader.load("a"))
+
+    assert values == ["A", "B", "A"]
+    batch.assert_awaited_once_with(["a", "b"])
+
+
+async def test_results_are_memoized():
+    """Test that a key is fetched at most once per loader."""
+    batch = AsyncMock(side_effect=lambda keys: {k: k for k in keys})
+    loader = DataLoader("test", batch)
+
+    await loader.load_many(["a", "b"])
+    assert await loader.load_many(["b", "a", "c"]) == ["b", "a", "c"]
+
+    assert [call.args[0] for call in batch.await_args_list] == [["a", "b"], ["c"]]
+
+
+async def test_missing_keys_resolve_to_none():
+    """Test that keys the batch function did not find load as None."""
+    loader = DataLoader("test", AsyncMock(return_value={}))
+    assert await loader.load("missing") is None
+
+
+async def test_keys_are_normalized_to_strings():
+    """Test that ObjectId-like keys share entries with their string form."""
+    batch = AsyncMock(side_effect=lambda keys: {k: int(k) for k in keys})
+    loader = DataLoader("test", batch)
+    assert await loader.load_many([1, "1"]) == [1, 1]
+    batch.assert_awaited_once_with(["1"])
+
+
+async def test_failures_are_not_memoized():
+    """Test that a failed batch is retried by the next load."""
+    batch = AsyncMock(side_effect=[RuntimeError("down"), {"a": 1}])
+    loader = DataLoader("test", batch)
+
+    with pytest.raises(RuntimeError):
+        await loader.load("a")
+    assert await loader.load("a") == 1
+
+
+async def test_primed_values_skip_the_batch():
+    """Test that primed values are returned without a lookup."""
+    batch = AsyncMock(return_value={})
+    loader = DataLoader("test", batch)
+    loader.prime("a", "known")
+    assert await loader.load("a") == "known"
+    batch.assert_not_awaited()
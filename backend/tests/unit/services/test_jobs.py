@@ -0,0 +1,112 @@
+"""Unit tests for the background job worker."""
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from bson import ObjectId
+
+from backend.models.enums import JobStatus
+from backend.models.job import Job
+from backend.services.jobs import JobWorker, retry_delay
+
+
+def _worker(handlers):
+    worker = JobWorker(
+        MagicMock(),
+        "worker-1",
+        handlers,
+        concurrency=1,
+        poll_interval=0.01,
+        lease=timedelta(seconds=30),
+        retry_base=1,
+        retry_max=10,
+    )
+    worker.repo = AsyncMock()
+    return worker
+
+
+def _job(**fields):
+    return Job(**{"id": ObjectId(), "kind": "test", "attempts": 1, **fields})
+
+
+@pytest.mark.asyncio
+async def test_success_records_result():
+    """Test that a handler's return value is stored as the job result."""
+    worker = _worker({"test": AsyncMock(return_value={"rows": 3})})
+    job = _job()
+
+    await worker.execute(job)
+
+    worker.repo.finish.assert_awaited_once_with(
+        str(job.id), "worker-1", JobStatus.SUCCEEDED, {"rows": 3}
+    )
+
+
+@pytest.mark.asyncio
+async def test_failure_is_retried_with_backoff():
+    """Test that a failing job goes back to the queue while attempts remain."""
+    worker = _worker({"test": AsyncMock(side_effect=RuntimeError("boom"))})
+    job = _job()
+
+    await worker.execute(job)
+
+    id, worker_id, error, run_after = worker.repo.retry.await_args.args
+    assert error == "RuntimeError: boom"
+    assert run_after > job.run_after
+    worker.repo.finish.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_last_attempt_fails_the_job():
+    """Test that a job fails for good once its attempts are used up."""
+    worker = _worker({"test": AsyncMock(side_effect=RuntimeError("boom"))})
+    job = _job(attempts=3)
+
+    await worker.execute(job)
+
+    worker.repo.retry.assert_not_awaited()
+    assert worker.repo.finish.await_args.args[2] == JobStatus.FAILED
+
+
+@pytest.mark.asyncio
+async def test_cancellation_observed_on_progress_report():
+    """Test that a handler reporting progress stops once cancellation is asked."""
+
+    async def handler(context, payload):
+        await context.report(0.5)
+        raise AssertionError("the handler should have been stopped")
+
+    worker = _worker({"test": handler})
+    worker.repo.heartbeat.return_value = _job(cancel_requested=True)
+    job = _job()
+
+    await worker.execute(job)
+
+    assert worker.repo.finish.await_args.args[2] == JobStatus.CANCELLED
+
+
+@pytest.mark.asyncio
+async def test_cancel_requested_before_start_skips_handler():
+    """Test that a reclaimed job that was cancelled is not run."""
+    handler = AsyncMock()
+    worker = _worker({"test": handler})
+
+    await worker.execute(_job(status=JobStatus.RUNNING, cancel_requested=True))
+
+    handler.assert_not_awaited()
+    assert worker.repo.finish.await_args.args[2] == JobStatus.CANCELLED
+
+
+@pytest.mark.asyncio
+async def test_run_once_reports_empty_queue():
+    """Test that run_once returns False when no job can be claimed."""
+    worker = _worker({"test": AsyncMock()})
+    worker.repo.claim.return_value = None
+    assert await worker.run_once() is False
+
+
+def test_retry_delay_is_bounded():
+    """Test that the backoff grows exponentially up to the maximum."""
+    assert all(0 <= retry_delay(1, 2, 100) <= 2 for _ in range(50))
+    assert all(0 <= retry_delay(4, 2, 100) <= 16 for _ in range(50))
+    assert all(0 <= retry_delay(20, 2, 100) <= 100 for _ in range(50))
@@ -0,0 +1,78 @@
+"""Unit tests for the metrics service."""
+from types import SimpleNamespace
+
+import pytest
+
+from backend.services import metrics
+from backend.services.metrics import MetricsRegistry, MongoCommandMetrics
+
+
+def test_counter_render():
+    """Test that counters render with their labels."""
+    registry = MetricsRegistry()
+    counter = registry.counter("jobs_total", "Jobs processed.", ("kind",))
+    counter.inc("export")
+    counter.inc("export", amount=2)
+
+    text = registry.render()
+    assert "# TYPE jobs_total counter" in text
+    assert 'jobs_total{kind="export"} 3' in text
+
+
+def test_registry_returns_existing_metric():
+    """Test that registering the same name twice returns the same metric."""
+    registry = MetricsRegistry()
+    first = registry.gauge("depth", "Queue depth.")
+    assert registry.gauge("depth", "Queue depth.") is first
+    with pytest.raises(ValueError):
+        registry.counter("depth", "Queue depth.")
+
+
+def test_histogram_buckets_are_cumulative():
+    """Test that histogram buckets, sum and count are rendered correctly."""
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency", "Latency.", ("route",), (0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5.0, "/a")
+
+    text = registry.render()
+    assert 'latency_bucket{route="/a",le="0.1"} 1' in text
+    assert 'latency_bucket{route="/a",le="1"} 2' in text
+    assert 'latency_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'latency_count{route="/a"} 3' in text
+    assert histogram.total("/a") == pytest.approx(5.55)
+
+
+def test_label_count_mismatch():
+    """Test that a wrong number of label values is rejected."""
+    registry = MetricsRegistry()
+    counter = registry.counter("x_total", "X.", ("a", "b"))
+    with pytest.raises(ValueError):
+        counter.inc("only-one")
+
+
+def test_mongo_command_listener_records_collection():
+    """Test that the command listener attributes timings to the collection."""
+    listener = MongoCommandMetrics()
+    started = SimpleNamespace(
+        connection_id=("localhost", 27017),
+        request_id=42,
+        command_name="find",
+        command={"find": "runbooks", "filter": {}},
+    )
+    succeeded = SimpleNamespace(
+        connection_id=("localhost", 27017),
+        request_id=42,
+        command_name="find",
+        duration_micros=1500,
+    )
+    before = metrics.mongo_command_duration_seconds.count("runbooks", "find")
+
+    listener.started(started)
+    listener.succeeded(succeeded)
+
+    assert metrics.mongo_command_duration_seconds.count("runbooks", "find") == (
+        before + 1
+    )
+    assert metrics.mongo_commands_total.value("runbooks", "find", "success") >= 1
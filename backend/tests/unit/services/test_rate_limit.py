@@ -0,0 +1,92 @@
+"""Unit tests for the rate limiting services."""
+import asyncio
+
+import pytest
+
+from backend.services.rate_limit import (
+    AdmissionRejected,
+    ConcurrencyGate,
+    TokenBucketLimiter,
+)
+
+
+def test_token_bucket_allows_burst_then_rejects():
+    """Test that a bucket allows its burst and then rejects with a retry hint."""
+    limiter = TokenBucketLimiter("test", rate_per_sec=1.0, burst=3, max_keys=10)
+    for _ in range(3):
+        limiter.acquire("1.2.3.4", now=100.0)
+
+    with pytest.raises(AdmissionRejected) as excinfo:
+        limiter.acquire("1.2.3.4", now=100.0)
+    assert excinfo.value.status_code == 429
+    assert excinfo.value.retry_after == pytest.approx(1.0)
+
+
+def test_token_bucket_refills():
+    """Test that tokens are refilled over time."""
+    limiter = TokenBucketLimiter("test", rate_per_sec=0.5, burst=1, max_keys=10)
+    limiter.acquire("a", now=0.0)
+    with pytest.raises(AdmissionRejected):
+        limiter.acquire("a", now=1.0)
+    limiter.acquire("a", now=3.0)
+
+
+def test_token_bucket_keys_are_independent():
+    """Test that one key running dry does not affect another."""
+    limiter = TokenBucketLimiter("test", rate_per_sec=1.0, burst=1, max_keys=10)
+    limiter.acquire("a", now=0.0)
+    limiter.acquire("b", now=0.0)
+
+
+def test_token_bucket_evicts_least_recently_used():
+    """Test that the limiter never tracks more than max_keys keys."""
+    limiter = TokenBucketLimiter("test", rate_per_sec=1.0, burst=1, max_keys=2)
+    limiter.acquire("a", now=0.0)
+    limiter.acquire("b", now=0.0)
+    limiter.acquire("c", now=0.0)
+
+    assert len(limiter) == 2
+    # "a" was evicted, so it starts over with a full bucket.
+    limiter.acquire("a", now=0.0)
+    with pytest.raises(AdmissionRejected):
+        limiter.acquire("c", now=0.0)
+
+
+@pytest.mark.asyncio
+async def test_concurrency_gate_sheds_when_queue_is_full():
+    """Test that callers beyond the waiting limit are rejected immediately."""
+    gate = ConcurrencyGate("test", max_concurrent=1, max_waiting=0, timeout=1.0)
+    async with gate:
+        with pytest.raises(AdmissionRejected) as excinfo:
+            async with gate:
+                pass
+    assert excinfo.value.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_concurrency_gate_times_out():
+    """Test that waiting callers are rejected once the timeout expires."""
+    gate = ConcurrencyGate("test", max_concurrent=1, max_waiting=1, timeout=0.01)
+    async with gate:
+        with pytest.raises(AdmissionRejected):
+            async with gate:
+                pass
+
+
+@pytest.mark.asyncio
+async def test_concurrency_gate_limits_parallelism():
+    """Test that no more than max_concurrent callers run at once."""
+    gate = ConcurrencyGate("test", max_concurrent=2, max_waiting=10, timeout=1.0)
+    running = 0
+    peak = 0
+
+    async def work():
+        nonlocal running, peak
+        async with gate:
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    await asyncio.gather(*(work() for _ in range(6)))
+    assert peak == 2
@@ -0,0 +1,40 @@
+"""Unit tests for the revocation list."""
+from unittest.mock import AsyncMock
+
+import pytest
+
+from backend.services.revocation import RevocationList
+
+
+def test_revoke_and_check():
+    """Test that revoked families are reported as revoked."""
+    revocations = RevocationList(retention_seconds=60, poll_interval=30)
+    revocations.revoke("family-1")
+
+    assert revocations.is_revoked("family-1")
+    assert not revocations.is_revoked("family-2")
+    assert not revocations.is_revoked(None)
+
+
+def test_entries_expire():
+    """Test that entries are dropped once the retention window has passed."""
+    revocations = RevocationList(retention_seconds=-1, poll_interval=30)
+    revocations.revoke("family-1")
+
+    assert not revocations.is_revoked("family-1")
+    revocations.revoke("family-2")
+    revocations.purge()
+    assert len(revocations) == 0
+
+
+@pytest.mark.asyncio
+async def test_load_from_repository():
+    """Test that the list is rebuilt from persisted revocations."""
+    repo = AsyncMock()
+    repo.revoked_families_since.return_value = ["family-1", "family-2"]
+    revocations = RevocationList(retention_seconds=60, poll_interval=30)
+
+    await revocations.load(repo)
+
+    assert revocations.is_revoked("family-1")
+    assert revocations.is_revoked("family-2")
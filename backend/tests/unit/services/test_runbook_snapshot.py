@@ -0,0 +1,111 @@
+"""Unit tests for the degraded-mode runbook snapshot."""
+import os
+import threading
+
+import bson
+import pytest
+from bson import ObjectId
+from bson.raw_bson import RawBSONDocument
+
+from backend.services.runbook_snapshot import RunbookSnapshot
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, *args):
+        return self
+
+    async def __aiter__(self):
+        for doc in self.docs:
+            yield RawBSONDocument(bson.encode(doc))
+
+
+class _Collection:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def with_options(self, codec_options):
+        return self
+
+    def find(self, query):
+        return _Cursor(self.docs)
+
+
+def _db(docs):
+    return {"runbooks": _Collection(docs)}
+
+
+def _docs(n):
+    return [
+        {"_id": ObjectId(), "title": f"Runbook {i}", "version": 1, "tags": ["db"]}
+        for i in range(n)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_snapshot_round_trip(tmp_path):
+    """Test that every runbook can be looked up and listed from the snapshot."""
+    docs = _docs(50)
+    snapshot = RunbookSnapshot(str(tmp_path / "runbooks.snap"), interval=60)
+    assert await snapshot.write(_db(docs)) == 50
+
+    reader = RunbookSnapshot(snapshot.path, interval=60)
+    assert reader.load()
+    assert reader.count == 50
+    assert reader.created_at is not None
+    for doc in docs:
+        assert reader.get(str(doc["_id"])) == doc
+    assert reader.get(str(ObjectId())) is None
+    assert reader.get("not-an-id") is None
+    # Documents keep the order they were written in, newest first.
+    assert [doc["title"] for doc in reader.documents()] == [d["title"] for d in docs]
+    await reader.stop()
+
+
+@pytest.mark.asyncio
+async def test_snapshot_is_remapped_when_replaced(tmp_path):
+    """Test that readers pick up a new snapshot and keep serving the old one
+    until then."""
+    path = str(tmp_path / "runbooks.snap")
+    writer = RunbookSnapshot(path, interval=60)
+    reader = RunbookSnapshot(path, interval=60)
+    first, second = _docs(2), _docs(3)
+
+    await writer.write(_db(first))
+    assert reader.get(str(first[0]["_id"])) == first[0]
+    await writer.write(_db(second))
+    assert reader.get(str(first[0]["_id"])) is None
+    assert reader.get(str(second[2]["_id"])) == second[2]
+
+    os.remove(path)
+    assert reader.get(str(second[2]["_id"])) == second[2]
+    await reader.stop()
+
+
+def test_snapshot_ignores_missing_and_malformed_files(tmp_path):
+    """Test that no snapshot is served from a missing or foreign file."""
+    path = tmp_path / "runbooks.snap"
+    reader = RunbookSnapshot(str(path), interval=60)
+    assert not reader.load()
+
+    path.write_bytes(b"not a snapshot at all, just some bytes")
+    assert not reader.load()
+    assert list(reader.documents()) == []
+
+
+@pytest.mark.asyncio
+async def test_snapshot_file_is_written_off_the_event_loop(tmp_path, monkeypatch):
+    """Test that the disk writes and fsync run in a worker thread."""
+    loop_thread = threading.get_ident()
+    fsync_threads = []
+    fsync = os.fsync
+    monkeypatch.setattr(
+        os, "fsync", lambda fd: fsync_threads.append(threading.get_ident()) or fsync(fd)
+    )
+    snapshot = RunbookSnapshot(str(tmp_path / "runbooks.snap"), interval=60)
+
+    assert await snapshot.write(_db(_docs(3))) == 3
+
+    assert fsync_threads and loop_thread not in fsync_threads
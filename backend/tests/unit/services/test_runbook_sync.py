@@ -0,0 +1,46 @@
+"""Unit tests for the runbook index catch-up."""
+import pytest
+from bson import ObjectId
+
+from backend.services.runbook_sync import runbook_changes
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def __aiter__(self):
+        for doc in self.docs:
+            yield doc
+
+
+class _Collection:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        if "_id" in query:
+            return _Cursor([d for d in self.docs if d["_id"] in query["_id"]["$in"]])
+        return _Cursor(self.docs)
+
+
+@pytest.mark.asyncio
+async def test_changes_are_found_by_version():
+    """Test that new, updated and deleted runbooks are found whatever their
+    update time, and unchanged ones are not read again."""
+    same, updated, new, deleted = (ObjectId() for _ in range(4))
+    db = {
+        "runbooks": _Collection(
+            [
+                {"_id": same, "version": 2},
+                {"_id": updated, "version": 3},
+                {"_id": new, "version": 1},
+            ]
+        )
+    }
+    indexed = {str(same): 2, str(updated): 2, str(deleted): 1}
+
+    docs, gone = await runbook_changes(db, indexed)
+
+    assert [doc["_id"] for doc in docs] == [updated, new]
+    assert gone == [str(deleted)]
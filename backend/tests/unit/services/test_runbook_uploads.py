@@ -0,0 +1,154 @@
+"""Unit tests for runbook upload validation."""
+import json
+
+import bson
+import pytest
+from bson import ObjectId
+from fastapi import FastAPI, Request
+from fastapi.exceptions import RequestValidationError
+from httpx import AsyncClient
+
+from backend.models.runbook import DecisionTree
+from backend.services.body_limit import BodySizeLimitMiddleware
+from backend.services.runbook_uploads import RunbookUploads, tree_integrity_errors
+
+
+def _tree(**overrides):
+    tree = {
+        "root_node_id": "start",
+        "nodes": {
+            "start": {
+                "id": "start",
+                "type": "decision",
+                "question": "Is it down?",
+                "description": "",
+                "options": [{"description": "Yes", "next_node_id": "restart"}],
+            },
+            "restart": {
+                "id": "restart",
+                "type": "action",
+                "title": "Restart",
+                "description": "",
+                "commands": [{"command": "./restart.sh", "description": ""}],
+                "next_node_id": "start",
+            },
+        },
+    }
+    tree.update(overrides)
+    return tree
+
+
+def _create_body(tree=None):
+    return json.dumps(
+        {
+            "title": "Service down",
+            "description": "When the API stops answering.",
+            "owner_id": str(ObjectId()),
+            "severity": "critical",
+            "execution_environment": {"name": "env", "base_image": "ubuntu"},
+            "decision_tree": tree or _tree(),
+        }
+    ).encode()
+
+
+def test_tree_integrity_errors():
+    """Test that dangling edges, a missing root and mismatched IDs are reported,
+    while cycles are allowed."""
+    assert tree_integrity_errors(DecisionTree(**_tree())) == []
+
+    tree = _tree(root_node_id="gone")
+    tree["nodes"]["start"]["options"].append(
+        {"description": "No", "next_node_id": "missing"}
+    )
+    tree["nodes"]["restart"]["id"] = "reboot"
+    errors = tree_integrity_errors(DecisionTree(**tree))
+    assert {error["loc"][2:] for error in errors} == {
+        ("root_node_id",),
+        ("nodes", "start", "options", 1, "next_node_id"),
+        ("nodes", "restart", "id"),
+    }
+
+
+@pytest.mark.asyncio
+async def test_prepare_create_inline():
+    """Test that a small body is validated and encoded for insertion."""
+    uploads = RunbookUploads(offload_bytes=1 << 20, workers=1, dim=64)
+    prepared = await uploads.prepare_create(_create_body())
+
+    doc = bson.decode(prepared.document)
+    assert str(doc["_id"]) == prepared.id
+    assert doc["version"] == 1
+    assert doc["stats"]["node_count"] == 2
+    assert json.loads(prepared.response)["id"] == prepared.id
+    assert prepared.vector.shape == (64,)
+
+
+@pytest.mark.asyncio
+async def test_prepare_rejects_invalid_bodies():
+    """Test that schema and tree errors are raised as request validation
+    errors located in the body."""
+    uploads = RunbookUploads(offload_bytes=1 << 20, workers=1, dim=64)
+    with pytest.raises(RequestValidationError) as excinfo:
+        await uploads.prepare_create(b'{"title": 1}')
+    assert all(error["loc"][0] == "body" for error in excinfo.value.errors())
+
+    with pytest.raises(RequestValidationError) as excinfo:
+        await uploads.prepare_update(
+            json.dumps({"decision_tree": _tree(root_node_id="x")}).encode()
+        )
+    assert excinfo.value.errors()[0]["type"] == "tree_integrity"
+
+
+@pytest.mark.asyncio
+async def test_prepare_update_sets_stats_only_with_a_tree():
+    """Test that update fields carry tree stats only when the tree changes."""
+    uploads = RunbookUploads(offload_bytes=1 << 20, workers=1, dim=64)
+    fields = await uploads.prepare_update(b'{"title": "Renamed"}')
+    assert set(fields) == {"title", "updated_at"}
+
+    fields = await uploads.prepare_update(
+        json.dumps({"decision_tree": _tree()}).encode()
+    )
+    assert fields["stats"]["max_depth"] == 2
+
+
+@pytest.mark.asyncio
+async def test_large_bodies_are_validated_in_the_pool():
+    """Test that bodies above the threshold go through the process pool."""
+    uploads = RunbookUploads(offload_bytes=0, workers=1, dim=64)
+    try:
+        prepared = await uploads.prepare_create(_create_body())
+        with pytest.raises(RequestValidationError):
+            await uploads.prepare_create(b"{}")
+    finally:
+        uploads.shutdown()
+    assert bson.decode(prepared.document)["title"] == "Service down"
+
+
+@pytest.mark.asyncio
+async def test_body_size_limit():
+    """Test that declared and streamed bodies above the limit are rejected."""
+    app = FastAPI()
+
+    @app.post("/api/runbooks")
+    async def upload(request: Request):
+        return {"size": len(await request.body())}
+
+    @app.post("/api/other")
+    async def other(request: Request):
+        return {"size": len(await request.body())}
+
+    app.add_middleware(
+        BodySizeLimitMiddleware, max_bytes=10, path_limits={"/api/runbooks": 100}
+    )
+
+    async def chunks():
+        for _ in range(20):
+            yield b"x" * 10
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        assert (await client.post("/api/runbooks", content=b"x" * 50)).json() == {
+            "size": 50
+        }
+        assert (await client.post("/api/other", content=b"x" * 50)).status_code == 413
+        assert (await client.post("/api/runbooks", content=chunks())).status_code == 413
@@ -107,3 +107,36 @@ async def test_requires_role_failure():
     with pytest.raises(HTTPException) as excinfo:
         await role_checker(current_user=await mock_get_current_user())
     assert excinfo.value.status_code == 403
+
+
+async def test_get_current_user_while_database_is_down(
+    mock_request, mock_db, mock_token_service, mock_user_repo, monkeypatch
+):
+    """Test that recently seen users are authenticated from memory in an outage."""
+    from backend.services import security
+
+    user_id = ObjectId()
+    mock_request.cookies["access_token"] = "test_token"
+    mock_token_service.decode_token.return_value = {"sub": str(user_id)}
+    mock_user_repo.get.return_value = User(
+        id=user_id,
+        username="oncall",
+        email="oncall@example.com",
+        password_hash="hashed",
+        role=UserRole.EDITOR,
+    )
+    monkeypatch.setattr(security, "token_service", mock_token_service)
+    monkeypatch.setattr(
+        security, "UserRepository", MagicMock(return_value=mock_user_repo)
+    )
+    user = await get_current_user(mock_request, mock_db)
+
+    monkeypatch.setattr(security.database, "healthy", False)
+    mock_user_repo.get.reset_mock()
+    assert await get_current_user(mock_request, mock_db) == user
+    mock_user_repo.get.assert_not_called()
+
+    mock_token_service.decode_token.return_value = {"sub": str(ObjectId())}
+    with pytest.raises(HTTPException) as excinfo:
+        await get_current_user(mock_request, mock_db)
+    assert excinfo.value.status_code == 503
@@ -0,0 +1,165 @@
+"""Unit tests for the similar-runbook index."""
+import os
+
+import numpy as np
+import pytest
+from bson import ObjectId
+
+from backend.models.enums import SeverityLevel
+from backend.models.runbook import Runbook
+from backend.services.similarity import SNAPSHOT_FILE, SimilarityIndex, runbook_terms
+
+
+def _runbook(title, question, commands, version=1):
+    return Runbook(
+        id=ObjectId(),
+        title=title,
+        description=title,
+        owner_id=ObjectId(),
+        severity=SeverityLevel.HIGH,
+        execution_environment={"name": "env", "base_image": "ubuntu"},
+        decision_tree={
+            "root_node_id": "q",
+            "nodes": {
+                "q": {
+                    "id": "q",
+                    "type": "decision",
+                    "question": question,
+                    "description": "",
+                    "options": [{"description": "Yes", "next_node_id": "a"}],
+                },
+                "a": {
+                    "id": "a",
+                    "type": "action",
+                    "title": "Fix it",
+                    "description": "",
+                    "commands": [
+                        {"command": command, "description": "Run"}
+                        for command in commands
+                    ],
+                },
+            },
+        },
+        version=version,
+    )
+
+
+@pytest.fixture
+def runbooks():
+    """Return two related database runbooks and an unrelated DNS one."""
+    return [
+        _runbook(
+            "Postgres replication lag",
+            "Is the replica lagging behind the primary?",
+            ["psql -c 'select * from pg_stat_replication'"],
+        ),
+        _runbook(
+            "Postgres replica down",
+            "Is the replica reachable from the primary?",
+            [
+                "psql -c 'select * from pg_stat_replication'",
+                "systemctl status postgresql",
+            ],
+        ),
+        _runbook(
+            "DNS resolution failures",
+            "Do lookups time out?",
+            ["dig example.com @8.8.8.8"],
+        ),
+    ]
+
+
+def _index(tmp_path, runbooks):
+    index = SimilarityIndex(dim=1024, snapshot_dir=str(tmp_path), sync_interval=60)
+    for runbook in runbooks:
+        index.upsert(runbook)
+    return index
+
+
+def test_terms_separate_prose_and_commands(runbooks):
+    """Test that command tokens are indexed apart from prose."""
+    terms = runbook_terms(runbooks[2])
+    assert "t:dns" in terms
+    assert "c:dig" in terms
+    assert "c:dig example.com" in terms
+
+
+def test_related_runbooks_rank_first(tmp_path, runbooks):
+    """Test that runbooks sharing symptoms and commands are most similar."""
+    index = _index(tmp_path, runbooks)
+    ids = [str(r.id) for r in runbooks]
+
+    results = index.similar([ids[0], ids[2]], k=2)
+
+    scores = dict(results[0])
+    assert results[0][0][0] == ids[1]
+    assert scores[ids[1]] > 5 * scores.get(ids[2], 0)
+    assert all(0 < score <= 1.0001 for _, score in results[0])
+    assert ids[2] not in {other for other, _ in results[1]}
+
+
+def test_update_and_remove_keep_rows_consistent(tmp_path, runbooks):
+    """Test that replacing and removing rows keeps IDs and frequencies right."""
+    index = _index(tmp_path, runbooks)
+    ids = [str(r.id) for r in runbooks]
+    df_before = index._df.copy()
+
+    replaced = runbooks[1].model_copy(update={"version": 2})
+    index.upsert(replaced)
+    assert index.version(ids[1]) == 2
+    assert np.array_equal(index._df, df_before)
+
+    index.remove(ids[0])
+    assert len(index) == 2 and ids[0] not in index
+    assert [other for other, _ in index.similar([ids[2]], k=5)[0]] in ([ids[1]], [])
+    assert index.similar([ids[0]], k=5) == [[]]
+
+
+def test_snapshot_is_memory_mapped(tmp_path, runbooks):
+    """Test that a saved snapshot loads memory-mapped and serves queries."""
+    index = _index(tmp_path, runbooks)
+    ids = [str(r.id) for r in runbooks]
+    expected = index.similar(ids, k=2)
+    index.save()
+
+    loaded = SimilarityIndex(dim=1024, snapshot_dir=str(tmp_path), sync_interval=60)
+    assert loaded.load()
+    assert isinstance(loaded._matrix, np.memmap)
+    assert loaded.similar(ids, k=2) == expected
+
+    # The first write copies the mapped matrix into memory.
+    loaded.upsert(_runbook("Disk full", "Is /var full?", ["df -h"]))
+    assert not isinstance(loaded._matrix, np.memmap)
+    assert len(loaded) == 4
+
+
+def test_snapshot_with_other_dimension_is_ignored(tmp_path, runbooks):
+    """Test that a snapshot built with another vector size is not loaded."""
+    _index(tmp_path, runbooks).save()
+    other = SimilarityIndex(dim=2048, snapshot_dir=str(tmp_path), sync_interval=60)
+    assert other.load() is False
+
+
+def test_snapshot_is_written_once_per_interval(tmp_path, runbooks):
+    """Test that a worker stopping right after another keeps its snapshot."""
+    first = _index(tmp_path, runbooks)
+    second = _index(tmp_path, list(reversed(runbooks)))
+    assert first.save() is True
+    assert second.save() is False
+    assert os.listdir(tmp_path) == [SNAPSHOT_FILE]
+
+    loaded = SimilarityIndex(dim=1024, snapshot_dir=str(tmp_path), sync_interval=60)
+    assert loaded.load()
+    ids = [str(r.id) for r in runbooks]
+    assert loaded._ids == ids
+    assert loaded.similar(ids, k=2) == first.similar(ids, k=2)
+
+
+def test_truncated_snapshot_is_ignored(tmp_path, runbooks):
+    """Test that a snapshot whose size does not match its metadata is not loaded."""
+    index = _index(tmp_path, runbooks)
+    index.save()
+    path = tmp_path / SNAPSHOT_FILE
+    path.write_bytes(path.read_bytes()[:-4])
+    other = SimilarityIndex(dim=1024, snapshot_dir=str(tmp_path), sync_interval=60)
+    assert other.load() is False
@@ -0,0 +1,161 @@
+"""Unit tests for request coalescing."""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from httpx import AsyncClient
+
+from backend.repositories.session import SessionRepository
+from backend.services.single_flight import (
+    SingleFlight,
+    SingleFlightMiddleware,
+    single_flight_requests_total,
+)
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_concurrent_calls_share_one_execution():
+    """Test that identical calls in flight run once and share the result."""
+    flight = SingleFlight("test_share")
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"n": calls}
+
+    results = await asyncio.gather(*(flight.do("a", load) for _ in range(10)))
+
+    assert calls == 1
+    assert all(result is results[0] for result in results)
+    assert single_flight_requests_total.value("test_share", "executed") == 1
+    assert single_flight_requests_total.value("test_share", "coalesced") == 9
+    assert len(flight) == 0
+    # Once finished, the next call runs again.
+    assert await flight.do("a", load) == {"n": 2}
+
+
+async def test_errors_are_shared_and_cancellation_is_not():
+    """Test that every waiter sees the error, and a cancelled caller does not
+    cancel the call for the others."""
+    flight = SingleFlight("test_errors")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    first = asyncio.ensure_future(flight.do("k", fail))
+    second = asyncio.ensure_future(flight.do("k", fail))
+    await asyncio.sleep(0)
+    first.cancel()
+    with pytest.raises(ValueError):
+        await second
+
+
+async def test_forget_starts_a_new_call():
+    """Test that callers after ``forget`` do not join the earlier call."""
+    flight = SingleFlight("test_forget")
+
+    async def load(value):
+        await asyncio.sleep(0.01)
+        return value
+
+    before = asyncio.ensure_future(flight.do("k", lambda: load("before")))
+    await asyncio.sleep(0)
+    joined = asyncio.ensure_future(flight.do("k", lambda: load("joined")))
+    await asyncio.sleep(0)
+    flight.forget("k")
+    after = asyncio.ensure_future(flight.do("k", lambda: load("after")))
+
+    assert await asyncio.gather(before, joined, after) == ["before", "before", "after"]
+
+
+async def test_repository_get_is_coalesced():
+    """Test that concurrent gets of one document issue a single query."""
+    session_id = ObjectId()
+    doc = {
+        "_id": session_id,
+        "runbook_id": ObjectId(),
+        "user_id": ObjectId(),
+        "status": "active",
+        "current_node_id": "start",
+    }
+
+    async def find_one(query):
+        await asyncio.sleep(0.01)
+        return doc
+
+    collection = MagicMock()
+    collection.name = "sessions"
+    collection.find_one = AsyncMock(side_effect=find_one)
+    db = MagicMock()
+    db.__getitem__.return_value = collection
+    repo = SessionRepository(db)
+
+    sessions = await asyncio.gather(*(repo.get(str(session_id)) for _ in range(20)))
+
+    assert collection.find_one.await_count == 1
+    assert all(session is sessions[0] for session in sessions)
+
+
+async def test_middleware_coalesces_identical_gets():
+    """Test that identical GETs reach the application once and differing
+    credentials are not coalesced."""
+    app = FastAPI()
+    hits = 0
+
+    @app.get("/api/runbooks/{runbook_id}")
+    async def get_runbook(runbook_id: str):
+        nonlocal hits
+        hits += 1
+        await asyncio.sleep(0.02)
+        return {"id": runbook_id, "hits": hits}
+
+    app.add_middleware(SingleFlightMiddleware, path_prefixes=["/api/runbooks"])
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        same = await asyncio.gather(
+            *(
+                client.get("/api/runbooks/1", cookies={"access_token": "a"})
+                for _ in range(5)
+            )
+        )
+        other = await client.get("/api/runbooks/1", cookies={"access_token": "b"})
+
+    assert [r.json() for r in same] == [{"id": "1", "hits": 1}] * 5
+    assert other.json() == {"id": "1", "hits": 2}
+
+
+async def test_middleware_keeps_cors_headers_per_origin():
+    """Test that requests from different origins get their own CORS headers."""
+    app = FastAPI()
+
+    @app.get("/api/runbooks")
+    async def list_runbooks():
+        await asyncio.sleep(0.02)
+        return []
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://a.test", "http://b.test"],
+        allow_credentials=True,
+    )
+    app.add_middleware(SingleFlightMiddleware, path_prefixes=["/api/runbooks"])
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        responses = await asyncio.gather(
+            *(
+                client.get("/api/runbooks", headers={"Origin": origin})
+                for origin in ("http://a.test", "http://b.test")
+            )
+        )
+
+    assert [r.headers["access-control-allow-origin"] for r in responses] == [
+        "http://a.test",
+        "http://b.test",
+    ]
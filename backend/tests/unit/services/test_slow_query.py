@@ -0,0 +1,109 @@
+"""Unit tests for the slow query recorder."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from backend.services.slow_query import SlowQueryRecorder, normalize_shape
+
+
+def _events(request_id, command_name, command, duration_micros):
+    started = SimpleNamespace(
+        connection_id=("localhost", 27017),
+        request_id=request_id,
+        command_name=command_name,
+        database_name="runbooks_db",
+        command=command,
+    )
+    succeeded = SimpleNamespace(
+        connection_id=("localhost", 27017),
+        request_id=request_id,
+        command_name=command_name,
+        duration_micros=duration_micros,
+    )
+    return started, succeeded
+
+
+def test_normalize_shape_replaces_literals():
+    """Test that literal values are replaced while operators are kept."""
+    shape = normalize_shape(
+        {"status": "active", "created_at": {"$gt": 5}, "tags": {"$in": ["a", "b"]}}
+    )
+    assert shape == {"status": "?", "created_at": {"$gt": "?"}, "tags": {"$in": ["?"]}}
+
+
+def test_fast_commands_are_ignored():
+    """Test that commands below the threshold are not recorded."""
+    recorder = SlowQueryRecorder(threshold_ms=100)
+    started, succeeded = _events(1, "find", {"find": "runbooks", "filter": {}}, 500)
+    recorder.started(started)
+    recorder.succeeded(succeeded)
+    assert recorder.top() == []
+
+
+def test_slow_commands_are_grouped_by_shape():
+    """Test that slow commands differing only in values share a shape."""
+    recorder = SlowQueryRecorder(threshold_ms=100)
+    for request_id, owner in enumerate(["a", "b", "c"]):
+        command = {
+            "find": "runbooks",
+            "filter": {"owner_id": owner},
+            "lsid": {"id": "x"},
+            "$db": "runbooks_db",
+        }
+        started, succeeded = _events(request_id, "find", command, 150_000)
+        recorder.started(started)
+        recorder.succeeded(succeeded)
+
+    top = recorder.top()
+    assert len(top) == 1
+    assert top[0]["collection"] == "runbooks"
+    assert top[0]["shape"] == {"filter": {"owner_id": "?"}}
+    assert top[0]["count"] == 3
+    assert top[0]["avg_ms"] == pytest.approx(150)
+
+
+def test_shapes_are_bounded():
+    """Test that the cheapest shape is evicted when the limit is reached."""
+    recorder = SlowQueryRecorder(threshold_ms=0, max_shapes=2)
+    recorder.record("db", "find", {"find": "a", "filter": {}}, 5)
+    recorder.record("db", "find", {"find": "b", "filter": {}}, 50)
+    recorder.record("db", "find", {"find": "c", "filter": {}}, 500)
+    assert [stats["collection"] for stats in recorder.top()] == ["c", "b"]
+
+
+@pytest.mark.asyncio
+async def test_each_shape_is_queued_for_explain_once():
+    """Test that a shape is only queued for explain capture the first time."""
+    recorder = SlowQueryRecorder(threshold_ms=0)
+    recorder._loop = asyncio.get_running_loop()
+    recorder._queue = asyncio.Queue()
+
+    recorder.record("db", "find", {"find": "a", "filter": {"x": 1}}, 5)
+    recorder.record("db", "find", {"find": "a", "filter": {"x": 2}}, 5)
+    await asyncio.sleep(0)
+
+    assert recorder._queue.qsize() == 1
+
+
+@pytest.mark.asyncio
+async def test_explain_worker_survives_unexpected_errors(monkeypatch):
+    """Test that an explain failing with a non-MongoDB error does not stop
+    explains of later shapes."""
+    recorder = SlowQueryRecorder(threshold_ms=0)
+    recorder._queue = asyncio.Queue()
+    explained = []
+
+    async def explain(db, key, database_name, command):
+        if key == "bad":
+            raise KeyError("executionStats")
+        explained.append(key)
+
+    monkeypatch.setattr(recorder, "_explain", explain)
+    recorder._queue.put_nowait(("bad", "db", {}))
+    recorder._queue.put_nowait(("good", "db", {}))
+    worker = asyncio.create_task(recorder._explain_worker(None))
+    await asyncio.sleep(0.01)
+    worker.cancel()
+
+    assert explained == ["good"]
@@ -0,0 +1,184 @@
+"""Unit tests for the speculative action preparer."""
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+
+from backend.models.enums import SeverityLevel
+from backend.models.runbook import Runbook
+from backend.services.speculation import (
+    ImagePrefetcher,
+    SpeculativePreparer,
+    action_metadata_cache,
+    get_action_metadata,
+    prepare_command_metadata,
+    speculation_outcomes_total,
+)
+
+
+def _action(node_id):
+    return {
+        "id": node_id,
+        "type": "action",
+        "title": f"Action {node_id}",
+        "description": "Run it.",
+        "commands": [
+            {"command": f"run {node_id}", "description": "Run", "timeout_seconds": 30}
+        ],
+    }
+
+
+@pytest.fixture
+def runbook():
+    """Return a runbook with a three-way decision at the root."""
+    return Runbook(
+        id=ObjectId(),
+        title="Service Down",
+        description="A runbook for when the main service is down.",
+        owner_id=ObjectId(),
+        severity=SeverityLevel.CRITICAL,
+        execution_environment={"name": "test-env", "base_image": "ubuntu:latest"},
+        decision_tree={
+            "root_node_id": "root",
+            "nodes": {
+                "root": {
+                    "id": "root",
+                    "type": "decision",
+                    "question": "What is wrong?",
+                    "description": "Pick one.",
+                    "options": [
+                        {"description": "A", "next_node_id": "a"},
+                        {"description": "B", "next_node_id": "b"},
+                        {"description": "C", "next_node_id": "c"},
+                    ],
+                },
+                "a": _action("a"),
+                "b": _action("b"),
+                "c": _action("c"),
+            },
+        },
+        version=1,
+    )
+
+
+def test_rank_options_uses_history(runbook):
+    """Test that options are ranked by smoothed choice frequency."""
+    root = runbook.decision_tree.nodes["root"]
+    ranked = SpeculativePreparer.rank_options(root, {"1": 6, "2": 1}, 7)
+    assert [node_id for node_id, _ in ranked] == ["b", "c", "a"]
+    assert ranked[0][1] == pytest.approx(0.7)
+    assert sum(p for _, p in ranked) == pytest.approx(1.0)
+
+
+def test_rank_options_without_history_is_uniform(runbook):
+    """Test that a decision with no history gives every option equal odds."""
+    root = runbook.decision_tree.nodes["root"]
+    ranked = SpeculativePreparer.rank_options(root, {}, 0)
+    assert [p for _, p in ranked] == pytest.approx([1 / 3] * 3)
+
+
+@pytest.mark.asyncio
+async def test_prepares_within_budget_and_counts_hits(runbook):
+    """Test that only the most likely actions are prepared, and a hit is counted."""
+    prepare = AsyncMock()
+    preparer = SpeculativePreparer([prepare], budget_per_session=2, min_probability=0)
+    root = runbook.decision_tree.nodes["root"]
+
+    prepared = preparer.on_decision("s1", runbook, root, {"1": 6, "2": 3}, 9)
+    assert prepared == ["b", "c"]
+    await asyncio.sleep(0)
+    assert prepare.await_count == 2
+
+    hits = speculation_outcomes_total.value("hit")
+    wasted = speculation_outcomes_total.value("wasted")
+    assert preparer.on_enter("s1", "b") is True
+    assert speculation_outcomes_total.value("hit") == hits + 1
+    assert speculation_outcomes_total.value("wasted") == wasted + 1
+
+
+@pytest.mark.asyncio
+async def test_unprepared_action_is_a_miss(runbook):
+    """Test that entering an action that was not prepared counts as a miss."""
+    preparer = SpeculativePreparer(
+        [AsyncMock()], budget_per_session=1, min_probability=0
+    )
+    root = runbook.decision_tree.nodes["root"]
+    preparer.on_decision("s1", runbook, root, {"0": 5}, 5)
+
+    misses = speculation_outcomes_total.value("miss")
+    assert preparer.on_enter("s1", "c") is False
+    assert speculation_outcomes_total.value("miss") == misses + 1
+
+
+@pytest.mark.asyncio
+async def test_unlikely_options_are_skipped(runbook):
+    """Test that options below the probability threshold are not prepared."""
+    preparer = SpeculativePreparer(
+        [AsyncMock()], budget_per_session=3, min_probability=0.5
+    )
+    root = runbook.decision_tree.nodes["root"]
+    assert preparer.on_decision("s1", runbook, root, {"0": 20}, 20) == ["a"]
+
+
+@pytest.mark.asyncio
+async def test_finish_cancels_outstanding_preparations(runbook):
+    """Test that finishing a session cancels and counts unused preparations."""
+    started = asyncio.Event()
+
+    async def slow(runbook, node):
+        started.set()
+        await asyncio.sleep(60)
+
+    preparer = SpeculativePreparer([slow], budget_per_session=1, min_probability=0)
+    root = runbook.decision_tree.nodes["root"]
+    preparer.on_decision("s1", runbook, root, {}, 0)
+    await started.wait()
+
+    wasted = speculation_outcomes_total.value("wasted")
+    preparer.on_finish("s1")
+    assert speculation_outcomes_total.value("wasted") == wasted + 1
+
+
+@pytest.mark.asyncio
+async def test_command_metadata_is_cached(runbook):
+    """Test that prepared command metadata is served from the cache."""
+    node = runbook.decision_tree.nodes["a"]
+    await prepare_command_metadata(runbook, node)
+
+    hits = action_metadata_cache.hits
+    metadata = get_action_metadata(runbook, node)
+    assert action_metadata_cache.hits == hits + 1
+    assert metadata["image"] == "ubuntu:latest"
+    assert metadata["total_timeout_seconds"] == 30
+
+
+@pytest.mark.asyncio
+async def test_image_prefetch_queues_one_pull_per_image(runbook, monkeypatch):
+    """Test that each image is queued once per interval and one failing image
+    does not stop prefetch for others."""
+    repo = AsyncMock()
+    repo.enqueue_periodic.side_effect = lambda kind, interval, payload, key: (
+        _raise(PyMongoError("down")) if key == "broken:latest" else None
+    )
+    monkeypatch.setattr("backend.services.speculation.JobRepository", lambda db: repo)
+    prefetch = ImagePrefetcher(interval=3600)
+    node = runbook.decision_tree.nodes["a"]
+    broken = runbook.model_copy(deep=True)
+    broken.execution_environment.base_image = "broken:latest"
+
+    await prefetch(runbook, node)
+    await prefetch(runbook, node)
+    await prefetch(broken, node)
+    await prefetch(runbook, runbook.decision_tree.nodes["b"])
+
+    calls = [call.args for call in repo.enqueue_periodic.await_args_list]
+    assert calls == [
+        ("pull_image", 3600, {"image": "ubuntu:latest"}),
+        ("pull_image", 3600, {"image": "broken:latest"}),
+    ]
+
+
+def _raise(exc):
+    raise exc
@@ -0,0 +1,157 @@
+"""Unit tests for the structured logging pipeline."""
+import io
+import json
+import logging
+import os
+import queue
+import sys
+import time
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+
+from backend.services.structured_logging import (
+    JsonFormatter,
+    LogPipeline,
+    NonBlockingQueueHandler,
+    RequestIdMiddleware,
+    request_id_var,
+)
+
+
+def _record(level=logging.INFO, msg="hello %s", args=("world",), **extra):
+    record = logging.LogRecord("test", level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter():
+    """Test that records become one JSON object with their extra fields."""
+    line = JsonFormatter().format(_record(request_id="abc", runbook_id="r1"))
+    entry = json.loads(line)
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "test"
+    assert entry["message"] == "hello world"
+    assert entry["request_id"] == "abc"
+    assert entry["runbook_id"] == "r1"
+    assert "args" not in entry
+
+
+def test_full_queue_drops_instead_of_blocking():
+    """Test that records are dropped and counted once the queue is full."""
+    handler = NonBlockingQueueHandler(queue.Queue(2))
+    started = time.perf_counter()
+    for _ in range(5):
+        handler.emit(_record())
+    assert time.perf_counter() - started < 0.1
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+
+
+def test_records_are_prepared_in_the_caller():
+    """Test that messages, exceptions and request IDs are resolved on emit."""
+    handler = NonBlockingQueueHandler(queue.Queue())
+    token = request_id_var.set("req-1")
+    try:
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record = _record(level=logging.ERROR)
+            record.exc_info = sys.exc_info()
+        handler.emit(record)
+    finally:
+        request_id_var.reset(token)
+    queued = handler.queue.get_nowait()
+    assert queued.msg == "hello world" and queued.args is None
+    assert queued.exc_info is None and "ValueError: boom" in queued.exc_text
+    assert queued.request_id == "req-1"
+
+
+def test_debug_sampling_is_per_request():
+    """Test that a request keeps all or none of its debug records."""
+    handler = NonBlockingQueueHandler(queue.Queue(), debug_sample_rate=0.1)
+    kept = {}
+    for i in range(200):
+        token = request_id_var.set(f"request-{i}")
+        try:
+            for _ in range(3):
+                handler.emit(_record(level=logging.DEBUG))
+            handler.emit(_record(level=logging.WARNING))
+        finally:
+            request_id_var.reset(token)
+    while not handler.queue.empty():
+        record = handler.queue.get_nowait()
+        counts = kept.setdefault(record.request_id, {})
+        counts[record.levelname] = counts.get(record.levelname, 0) + 1
+    assert len(kept) == 200
+    debug = [counts.get("DEBUG", 0) for counts in kept.values()]
+    assert set(debug) == {0, 3}
+    assert 5 <= debug.count(3) <= 40
+
+
+def test_pipeline_writes_from_the_listener_thread():
+    """Test that records logged while running are written by the time it stops."""
+    stream = io.StringIO()
+    root = logging.getLogger()
+    before = root.handlers[:]
+    pipeline = LogPipeline("INFO", "json", 100, 1.0, stream=stream)
+    pipeline.start()
+    try:
+        logging.getLogger("backend.test").info("started %d", 1)
+        logging.getLogger("backend.test").debug("not at this level")
+    finally:
+        pipeline.stop()
+    assert root.handlers == before
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line["message"] for line in lines] == ["started 1"]
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_pipeline_restarts_in_a_forked_process(tmp_path):
+    """Test that a child forked while the pipeline runs still writes its logs."""
+    path = tmp_path / "child.log"
+    with open(path, "w") as stream:
+        pipeline = LogPipeline("INFO", "json", 100, 1.0, stream=stream)
+        pipeline.start()
+        try:
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    pipeline.start()
+                    logging.getLogger("backend.test").info("from child")
+                    pipeline.stop()
+                    stream.flush()
+                finally:
+                    os._exit(0)
+            os.waitpid(pid, 0)
+        finally:
+            pipeline.stop()
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["message"] for line in lines] == ["from child"]
+
+
+@pytest.mark.asyncio
+async def test_request_id_middleware():
+    """Test that requests get an ID, and well-formed incoming IDs are kept."""
+    app = FastAPI()
+
+    @app.get("/id")
+    async def current_id():
+        return {"request_id": request_id_var.get()}
+
+    app.add_middleware(RequestIdMiddleware)
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/id")
+        generated = response.headers["X-Request-ID"]
+        assert len(generated) == 32
+        assert response.json() == {"request_id": generated}
+
+        response = await client.get("/id", headers={"X-Request-ID": "lb-1234"})
+        assert response.headers["X-Request-ID"] == "lb-1234"
+        assert response.json() == {"request_id": "lb-1234"}
+
+        response = await client.get("/id", headers={"X-Request-ID": "bad id\n"})
+        assert response.headers["X-Request-ID"] != "bad id\n"
+    assert request_id_var.get() is None
@@ -32,3 +32,13 @@ def test_invalid_token():
     """Test that an invalid token is rejected."""
     decoded_payload = token_service.decode_token("invalid_token")
     assert decoded_payload is None
+
+
+def test_create_refresh_token():
+    """Test that refresh tokens are marked with their type."""
+    token = token_service.create_refresh_token({"sub": "testuser", "jti": "abc"})
+
+    decoded_payload = token_service.decode_token(token)
+    assert decoded_payload is not None
+    assert decoded_payload["type"] == "refresh"
+    assert decoded_payload["jti"] == "abc"
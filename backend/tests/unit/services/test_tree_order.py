@@ -0,0 +1,20 @@
+"""Unit tests for the topological order of decision trees."""
+from backend.services.tree_order import topological_order
+
+
+def test_topological_order_drops_edges_closing_a_cycle():
+    """Test that parents come first and only back edges are dropped."""
+    graph = {"a": ["b", "c"], "b": ["d"], "c": ["d", "a"], "d": [], "e": ["a"]}
+
+    order, forward = topological_order("a", graph.__getitem__)
+
+    assert set(order) == {"a", "b", "c", "d"}
+    position = {node: index for index, node in enumerate(order)}
+    assert position["a"] < position["b"] < position["d"]
+    assert position["c"] < position["d"]
+    assert forward == {"a": ["b", "c"], "b": ["d"], "c": ["d"], "d": []}
+
+
+def test_topological_order_without_a_root():
+    """Test that a tree without a root has no order."""
+    assert topological_order(None, lambda node: []) == ([], {})
@@ -0,0 +1,121 @@
+"""Unit tests for decision tree rendering."""
+import pytest
+
+from backend.models.runbook import DecisionTree
+from backend.services.tree_render import (
+    render,
+    render_cache,
+    render_dot,
+    render_layout,
+    render_mermaid,
+)
+
+
+@pytest.fixture
+def tree():
+    """Return a tree whose two options converge on one action."""
+    return DecisionTree(
+        root_node_id="start",
+        nodes={
+            "start": {
+                "id": "start",
+                "type": "decision",
+                "question": 'Is the "api" down?',
+                "description": "Check the dashboard.",
+                "options": [
+                    {"description": "Yes", "next_node_id": "restart"},
+                    {"description": "No", "next_node_id": "check.latency"},
+                    {"description": "Unknown", "next_node_id": "missing"},
+                ],
+            },
+            "restart": {
+                "id": "restart",
+                "type": "action",
+                "title": "Restart",
+                "description": "Restart the service.",
+                "commands": [],
+                "next_node_id": "verify",
+            },
+            "check.latency": {
+                "id": "check.latency",
+                "type": "action",
+                "title": "Check latency",
+                "description": "Look at latency graphs.",
+                "commands": [],
+                "next_node_id": "verify",
+            },
+            "verify": {
+                "id": "verify",
+                "type": "action",
+                "title": "Verify",
+                "description": "Confirm recovery.",
+                "commands": [],
+            },
+        },
+    )
+
+
+def test_render_mermaid(tree):
+    """Test Mermaid output uses safe IDs and escapes labels."""
+    text = render_mermaid(tree)
+    assert text.startswith("flowchart TD\n")
+    assert 'n0{"Is the #quot;api#quot; down?"}' in text
+    assert 'n0 -->|"Yes"| n1' in text
+    assert "n1 --> n3" in text
+    # The dangling "missing" target is skipped.
+    assert "Unknown" not in text
+
+
+def test_render_dot(tree):
+    """Test DOT output quotes node IDs and escapes labels."""
+    text = render_dot(tree)
+    assert '"start" [label="Is the \\"api\\" down?", shape=diamond];' in text
+    assert '"start" -> "check.latency" [label="No"];' in text
+
+
+def test_render_layout_places_converging_node_below_parents(tree):
+    """Test that a node reached through several options sits below all of them."""
+    layout = render_layout(tree)
+    nodes = {node["id"]: node for node in layout["nodes"]}
+
+    assert nodes["start"]["layer"] == 0
+    assert nodes["restart"]["layer"] == nodes["check.latency"]["layer"] == 1
+    assert nodes["verify"]["layer"] == 2
+    assert nodes["restart"]["x"] != nodes["check.latency"]["x"]
+    assert len(layout["edges"]) == 4
+
+
+def test_render_layout_handles_cycles():
+    """Test that a cycle does not break layering."""
+    tree = DecisionTree(
+        root_node_id="a",
+        nodes={
+            "a": {
+                "id": "a",
+                "type": "action",
+                "title": "A",
+                "description": "",
+                "commands": [],
+                "next_node_id": "b",
+            },
+            "b": {
+                "id": "b",
+                "type": "action",
+                "title": "B",
+                "description": "",
+                "commands": [],
+                "next_node_id": "a",
+            },
+        },
+    )
+    nodes = {node["id"]: node for node in render_layout(tree)["nodes"]}
+    assert nodes["a"]["layer"] == 0
+    assert nodes["b"]["layer"] == 1
+
+
+def test_render_is_cached_per_version(tree):
+    """Test that renders are reused for a version and redone for a new one."""
+    render_cache.clear()
+    first = render("rb1", 1, tree, "layout")
+    assert render("rb1", 1, tree, "layout") is first
+    assert render("rb1", 2, tree, "layout") is not first
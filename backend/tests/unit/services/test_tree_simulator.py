@@ -0,0 +1,151 @@
+"""Unit tests for decision tree simulation."""
+import pytest
+
+from backend.models.runbook import DecisionTree
+from backend.services.tree_simulator import CompiledTree, simulate
+from backend.services.tree_stats import tree_stats
+
+
+def _action(node_id, timeouts, next_node_id=None):
+    return {
+        "id": node_id,
+        "type": "action",
+        "title": node_id,
+        "description": "",
+        "commands": [
+            {"command": f"{node_id}-{i}", "description": "", "timeout_seconds": t}
+            for i, t in enumerate(timeouts)
+        ],
+        "next_node_id": next_node_id,
+    }
+
+
+def _decision(node_id, *targets):
+    return {
+        "id": node_id,
+        "type": "decision",
+        "question": f"{node_id}?",
+        "description": "",
+        "options": [
+            {"description": f"to {target}", "next_node_id": target}
+            for target in targets
+        ],
+    }
+
+
+def _ladder(rungs):
+    """Chain decisions whose two options converge on the next decision."""
+    nodes = {}
+    for i in range(rungs):
+        following = f"d{i + 1}" if i + 1 < rungs else None
+        nodes[f"d{i}"] = _decision(f"d{i}", f"fast{i}", f"slow{i}")
+        nodes[f"fast{i}"] = _action(f"fast{i}", [10], following)
+        nodes[f"slow{i}"] = _action(f"slow{i}", [60], following)
+    return DecisionTree(root_node_id="d0", nodes=nodes)
+
+
+@pytest.fixture
+def tree():
+    """Return a tree with converging options, a cycle and a dangling option."""
+    return DecisionTree(
+        root_node_id="start",
+        nodes={
+            "start": _decision("start", "restart", "inspect", "missing"),
+            "restart": _action("restart", [600, 300], next_node_id="verify"),
+            "inspect": _action("inspect", [10], next_node_id="verify"),
+            "verify": _decision("verify", "done", "start"),
+            "done": _action("done", [5]),
+            "orphan": _action("orphan", [5000]),
+        },
+    )
+
+
+def test_summary(tree):
+    """Test path counts and extremes; the loop back to the root is ignored."""
+    summary = CompiledTree(tree).summary()
+    assert summary == {
+        "node_count": 6,
+        "reachable_nodes": 5,
+        "path_count": 2,
+        "max_steps": 4,
+        "longest_runtime_seconds": 905,
+        "shortest_runtime_seconds": 15,
+    }
+
+
+def test_extreme_paths(tree):
+    """Test that the longest and shortest paths are reconstructed."""
+    compiled = CompiledTree(tree)
+    assert compiled.longest_path() == ["start", "restart", "verify", "done"]
+    assert compiled.shortest_path() == ["start", "inspect", "verify", "done"]
+
+
+def test_dry_run_timeline(tree):
+    """Test that commands are laid end to end and choices are recorded."""
+    timeline = CompiledTree(tree).dry_run(["start", "restart", "verify", "start"])
+    assert [(step["node_id"], step["start_s"], step["end_s"]) for step in timeline] == [
+        ("start", 0, 0),
+        ("restart", 0, 900),
+        ("verify", 900, 900),
+        ("start", 900, 900),
+    ]
+    assert timeline[0]["choice"] == "to restart"
+    assert timeline[1]["commands"][1] == {
+        "command": "restart-1",
+        "start_s": 600,
+        "end_s": 900,
+    }
+    assert "choice" not in timeline[3]
+
+
+@pytest.mark.parametrize(
+    "path",
+    [[], ["inspect"], ["start", "done"], ["start", "missing"]],
+)
+def test_dry_run_rejects_invalid_paths(tree, path):
+    """Test that a path must start at the root and follow existing edges."""
+    with pytest.raises(ValueError):
+        CompiledTree(tree).dry_run(path)
+
+
+def test_sampling_is_uniform_and_repeatable():
+    """Test that samples are valid paths, seeded and spread over all paths."""
+    compiled = CompiledTree(_ladder(3))
+    samples = compiled.sample_paths(800, seed=7)
+    assert samples == compiled.sample_paths(800, seed=7)
+    counts = {}
+    for path in samples:
+        compiled.dry_run(path)
+        counts[tuple(path)] = counts.get(tuple(path), 0) + 1
+    assert len(counts) == 8
+    assert all(50 < count < 150 for count in counts.values())
+
+
+def test_large_converging_tree():
+    """Test exact counts on a tree with exponentially many paths, in
+    agreement with the stored tree statistics."""
+    tree = _ladder(2000)
+    result = simulate(tree, samples=2, seed=1)
+    stats = tree_stats(tree)
+    assert result["path_count"] == 2**2000
+    assert result["max_steps"] == stats.max_depth == 4000
+    assert result["longest_runtime_seconds"] == stats.worst_case_runtime_seconds
+    assert result["shortest_runtime_seconds"] == 2000 * 10
+    assert [path["kind"] for path in result["paths"]][:2] == ["longest", "shortest"]
+    assert all(
+        path["runtime_seconds"] == path["timeline"][-1]["end_s"]
+        for path in result["paths"]
+    )
+
+
+def test_simulate_requested_path_and_missing_root(tree):
+    """Test dry-running a given path, and a tree whose root does not exist."""
+    result = simulate(tree, path=["start", "inspect", "verify", "done"])
+    assert [(p["kind"], p["runtime_seconds"]) for p in result["paths"]] == [
+        ("requested", 15)
+    ]
+
+    broken = DecisionTree(root_node_id="gone", nodes=tree.nodes)
+    result = simulate(broken)
+    assert result["path_count"] == 0
+    assert result["paths"] == []
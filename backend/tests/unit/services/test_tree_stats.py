@@ -0,0 +1,118 @@
+"""Unit tests for decision tree statistics."""
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from backend.migrations.backfill_tree_stats import backfill_tree_stats
+from backend.models.runbook import DecisionTree
+from backend.services.tree_stats import TREE_STATS_VERSION, tree_stats
+
+
+def _action(node_id, timeouts, next_node_id=None):
+    return {
+        "id": node_id,
+        "type": "action",
+        "title": node_id,
+        "description": "",
+        "commands": [
+            {"command": "true", "description": "", "timeout_seconds": timeout}
+            for timeout in timeouts
+        ],
+        "next_node_id": next_node_id,
+    }
+
+
+@pytest.fixture
+def tree_doc():
+    """Return a tree with a short expensive branch and a long cheap one."""
+    return {
+        "root_node_id": "start",
+        "nodes": {
+            "start": {
+                "id": "start",
+                "type": "decision",
+                "question": "Is it down?",
+                "description": "",
+                "options": [
+                    {"description": "Yes", "next_node_id": "restart"},
+                    {"description": "No", "next_node_id": "inspect"},
+                    {"description": "Unknown", "next_node_id": "missing"},
+                ],
+            },
+            "restart": _action("restart", [600, 300]),
+            "inspect": _action("inspect", [10], next_node_id="tune"),
+            "tune": _action("tune", [20], next_node_id="inspect"),
+            "orphan": _action("orphan", [5000]),
+        },
+    }
+
+
+def test_tree_stats(tree_doc):
+    """Test counts, longest path depth and worst-case runtime."""
+    stats = tree_stats(DecisionTree(**tree_doc))
+    assert stats.version == TREE_STATS_VERSION
+    assert stats.node_count == 5
+    assert stats.command_count == 5
+    # start -> inspect -> tune; the edge back to inspect closes a cycle.
+    assert stats.max_depth == 3
+    # The restart branch is shorter but its commands take longer; the
+    # unreachable orphan does not count.
+    assert stats.worst_case_runtime_seconds == 900
+
+
+def test_tree_stats_missing_root():
+    """Test that a tree without its root node has no paths."""
+    stats = tree_stats(DecisionTree(root_node_id="gone", nodes={}))
+    assert stats.max_depth == 0
+    assert stats.worst_case_runtime_seconds == 0
+
+
+@pytest.mark.asyncio
+async def test_backfill_updates_runbooks_with_stale_stats(tree_doc):
+    """Test that the migration only touches runbooks without current stats."""
+    docs = [
+        {"_id": ObjectId(), "decision_tree": tree_doc, "version": version}
+        for version in range(1, 4)
+    ]
+
+    async def cursor():
+        for doc in docs:
+            yield doc
+
+    collection = MagicMock()
+    collection.create_index = AsyncMock()
+    collection.find.return_value = cursor()
+    collection.bulk_write = AsyncMock(
+        side_effect=lambda batch, ordered: MagicMock(modified_count=len(batch))
+    )
+    collection.insert_many = AsyncMock()
+    db = MagicMock()
+    db.__getitem__.return_value = collection
+    db.list_collection_names = AsyncMock(return_value=["cache_invalidations"])
+
+    assert await backfill_tree_stats(db, batch_size=2) == 3
+
+    assert collection.find.call_args.args[0] == {
+        "stats.version": {"$ne": TREE_STATS_VERSION}
+    }
+    stats = tree_stats(DecisionTree(**tree_doc)).model_dump()
+    assert stats["worst_case_runtime_seconds"] == 900
+    batches = [call.args[0] for call in collection.bulk_write.await_args_list]
+    assert batches == [
+        [
+            UpdateOne(
+                {"_id": doc["_id"], "version": doc["version"]},
+                {"$set": {"stats": stats}},
+            )
+            for doc in docs[:2]
+        ],
+        [UpdateOne({"_id": docs[2]["_id"], "version": 3}, {"$set": {"stats": stats}})],
+    ]
+    invalidated = [
+        message["key"]
+        for call in collection.insert_many.await_args_list
+        for message in call.args[0]
+    ]
+    assert invalidated == [str(doc["_id"]) for doc in docs]
@@ -0,0 +1,126 @@
+"""Unit tests for the startup cache warm-up."""
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+from bson import ObjectId
+
+from backend.services.cache import runbook_cache
+from backend.services.speculation import action_metadata_cache
+from backend.services.tree_render import render_cache
+from backend.services.warmup import CacheWarmer
+
+pytestmark = pytest.mark.asyncio
+
+
+def _runbook_doc(severity):
+    return {
+        "_id": ObjectId(),
+        "title": "Service down",
+        "description": "",
+        "owner_id": ObjectId(),
+        "severity": severity,
+        "execution_environment": {"name": "env", "base_image": "ubuntu"},
+        "decision_tree": {
+            "root_node_id": "fix",
+            "nodes": {
+                "fix": {
+                    "id": "fix",
+                    "type": "action",
+                    "title": "Restart",
+                    "description": "",
+                    "commands": [{"command": "./restart.sh", "description": ""}],
+                }
+            },
+        },
+        "version": 1,
+    }
+
+
+class _Cursor:
+    def __init__(self, docs, delay=0):
+        self.docs = docs
+        self.delay = delay
+
+    def sort(self, *args):
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def __aiter__(self):
+        await asyncio.sleep(self.delay)
+        for doc in self.docs:
+            yield doc
+
+
+def _db(runbooks, sessions, delay=0):
+    by_id = {doc["_id"]: doc for doc in runbooks}
+    runbook_collection = MagicMock()
+
+    def find_runbooks(query, projection=None):
+        if "severity" in query:
+            docs = [d for d in runbooks if d["severity"] == query["severity"]]
+            return _Cursor(docs, delay)
+        return _Cursor([by_id[i] for i in query["_id"]["$in"] if i in by_id])
+
+    runbook_collection.find.side_effect = find_runbooks
+    session_collection = MagicMock()
+    session_collection.find.return_value = _Cursor(sessions)
+    db = MagicMock()
+    db.__getitem__.side_effect = lambda name: {
+        "runbooks": runbook_collection,
+        "sessions": session_collection,
+    }[name]
+    return db
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Start every test with empty, unpinned caches."""
+    for cache in (runbook_cache, render_cache, action_metadata_cache):
+        cache.clear()
+        cache._pinned.clear()
+    yield
+
+
+async def test_warm_up_pins_critical_and_loads_recent():
+    """Test that critical runbooks are pinned and recent ones only cached."""
+    critical, recent = _runbook_doc("critical"), _runbook_doc("low")
+    sessions = [{"runbook_id": recent["_id"]}, {"runbook_id": critical["_id"]}]
+    warmer = CacheWarmer(budget_s=5, max_critical=10, recent_runbooks=10)
+
+    await warmer.run(_db([critical, recent], sessions))
+
+    assert warmer.state()["ready"] is True
+    assert (warmer.pinned, warmer.warmed) == (1, 2)
+    critical_id, recent_id = str(critical["_id"]), str(recent["_id"])
+    assert runbook_cache.is_pinned(critical_id)
+    assert recent_id in runbook_cache and not runbook_cache.is_pinned(recent_id)
+    assert render_cache.is_pinned(f"{critical_id}:mermaid")
+    assert f"{recent_id}:layout" in render_cache
+    assert action_metadata_cache.is_pinned(f"{critical_id}:1:fix")
+
+
+async def test_warm_up_reports_ready_when_out_of_budget():
+    """Test that a slow warm-up does not hold back readiness."""
+    warmer = CacheWarmer(budget_s=0.01, max_critical=10, recent_runbooks=10)
+
+    await warmer.run(_db([_runbook_doc("critical")], [], delay=1))
+
+    assert warmer.ready is True
+    assert warmer.timed_out is True
+    assert warmer.warmed == 0
+
+
+async def test_warm_up_reports_ready_when_a_runbook_fails():
+    """Test that an unexpected error during warm-up does not hold back readiness."""
+    broken = _runbook_doc("critical")
+    broken["decision_tree"]["nodes"]["fix"]["type"] = "unknown"
+    warmer = CacheWarmer(budget_s=5, max_critical=10, recent_runbooks=10)
+
+    await warmer.run(_db([broken], []))
+
+    assert warmer.ready is True
+    assert warmer.elapsed_s is not None
@@ -0,0 +1,34 @@
+"""Administrative endpoints."""
+from fastapi import APIRouter, Depends, Query
+
+from backend.models.enums import UserRole
+from backend.services.cache import invalidation_bus
+from backend.services.security import requires_role
+from backend.services.slow_query import slow_query_recorder
+
+router = APIRouter(
+    prefix="/api/admin",
+    tags=["admin"],
+    dependencies=[Depends(requires_role(UserRole.ADMIN))],
+)
+
+
+@router.get("/slow-queries")
+async def slow_queries(limit: int = Query(20, ge=1, le=500)):
+    """List the query shapes that spent the most time above the slow threshold."""
+    return {
+        "ok": True,
+        "data": {
+            "threshold_ms": slow_query_recorder.threshold_ms,
+            "shapes": slow_query_recorder.top(limit),
+        },
+    }
+
+
+@router.get("/caches")
+async def caches():
+    """Report hit ratio and memory use of the in-process caches."""
+    return {
+        "ok": True,
+        "data": [cache.stats() for cache in invalidation_bus.caches()],
+    }
@@ -0,0 +1,74 @@
+"""Authentication endpoints."""
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+
+from backend.config import settings
+from backend.controllers.auth_controller import AuthController
+from backend.models.user import User, UserLogin
+from backend.services.database import get_db
+
+router = APIRouter(prefix="/api/auth", tags=["auth"])
+
+REFRESH_COOKIE_PATH = "/api/auth"
+
+
+def _set_auth_cookies(response: Response, access_token: str, refresh_token: str):
+    response.set_cookie(
+        "access_token",
+        access_token,
+        max_age=settings.access_token_ttl_min * 60,
+        httponly=True,
+        samesite="lax",
+    )
+    response.set_cookie(
+        "refresh_token",
+        refresh_token,
+        max_age=settings.refresh_token_ttl_min * 60,
+        httponly=True,
+        samesite="strict",
+        path=REFRESH_COOKIE_PATH,
+    )
+
+
+def _user_response(user: User) -> dict:
+    return {
+        "ok": True,
+        "data": {"user": user.model_dump(mode="json", exclude={"password_hash"})},
+    }
+
+
+@router.post("/login")
+async def login(
+    credentials: UserLogin,
+    request: Request,
+    response: Response,
+    db=Depends(get_db),
+):
+    """Log in with email and password, setting the auth cookies."""
+    client_ip = request.client.host if request.client else "unknown"
+    user, access_token, refresh_token = await AuthController(db).login(
+        credentials, client_ip
+    )
+    _set_auth_cookies(response, access_token, refresh_token)
+    return _user_response(user)
+
+
+@router.post("/refresh")
+async def refresh(request: Request, response: Response, db=Depends(get_db)):
+    """Exchange the refresh token cookie for a new access and refresh token."""
+    token = request.cookies.get("refresh_token")
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated"
+        )
+    user, access_token, refresh_token = await AuthController(db).refresh(token)
+    _set_auth_cookies(response, access_token, refresh_token)
+    return _user_response(user)
+
+
+@router.post("/logout")
+async def logout(request: Request, response: Response, db=Depends(get_db)):
+    """Revoke the current token family and clear the auth cookies."""
+    await AuthController(db).logout(request.cookies.get("refresh_token"))
+    response.delete_cookie("access_token")
+    response.delete_cookie("refresh_token", path=REFRESH_COOKIE_PATH)
+    return {"ok": True, "data": None}
@@ -0,0 +1,95 @@
+"""Background job endpoints."""
+from bson import ObjectId
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from backend.models.enums import JobStatus, UserRole
+from backend.models.job import Job, JobCreate
+from backend.models.user import User
+from backend.repositories.job import JobRepository
+from backend.services.database import get_db
+from backend.services.jobs import job_handlers
+from backend.services.security import requires_role
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+
+def _object_id(job_id: str) -> ObjectId:
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
+        )
+    return ObjectId(job_id)
+
+
+@router.post("", status_code=status.HTTP_202_ACCEPTED)
+async def enqueue_job(
+    body: JobCreate,
+    db=Depends(get_db),
+    current_user: User = Depends(requires_role(UserRole.ADMIN)),
+):
+    """Queue a job for the worker pool."""
+    if body.kind not in job_handlers:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown job kind {body.kind}",
+        )
+    job = await JobRepository(db).create(
+        Job(
+            kind=body.kind,
+            payload=body.payload,
+            max_attempts=body.max_attempts,
+            created_by=current_user.id,
+        )
+    )
+    return {"ok": True, "data": job.model_dump(mode="json")}
+
+
+@router.get("")
+async def list_jobs(
+    job_status: JobStatus | None = Query(None, alias="status"),
+    kind: str | None = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100),
+    db=Depends(get_db),
+    current_user: User = Depends(requires_role(UserRole.ADMIN)),
+):
+    """List jobs, newest first."""
+    query: dict = {}
+    if job_status is not None:
+        query["status"] = job_status.value
+    if kind is not None:
+        query["kind"] = kind
+    jobs = await JobRepository(db).find_many(
+        query, skip, limit, sort=[("created_at", -1)]
+    )
+    return {"ok": True, "data": [job.model_dump(mode="json") for job in jobs]}
+
+
+@router.get("/{job_id}")
+async def get_job(
+    job_id: str,
+    db=Depends(get_db),
+    current_user: User = Depends(requires_role(UserRole.ADMIN)),
+):
+    """Get a job's status, progress and result."""
+    job = await JobRepository(db).get(str(_object_id(job_id)))
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
+        )
+    return {"ok": True, "data": job.model_dump(mode="json")}
+
+
+@router.post("/{job_id}/cancel")
+async def cancel_job(
+    job_id: str,
+    db=Depends(get_db),
+    current_user: User = Depends(requires_role(UserRole.ADMIN)),
+):
+    """Cancel a queued job, or ask a running one to stop."""
+    job = await JobRepository(db).request_cancel(str(_object_id(job_id)))
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
+        )
+    return {"ok": True, "data": job.model_dump(mode="json")}
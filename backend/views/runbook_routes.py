@@ -0,0 +1,446 @@
+"""Runbook endpoints."""
+import logging
+from datetime import UTC, datetime
+from typing import Literal
+
+from bson import ObjectId
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pymongo.errors import PyMongoError
+
+from backend.models.compact import CompactRunbook
+from backend.models.enums import UserRole
+from backend.models.runbook import Runbook
+from backend.models.user import User, UserPublic
+from backend.repositories.path_analytics import PathAnalyticsRepository, summarize
+from backend.repositories.runbook import RunbookRepository
+from backend.services.autocomplete import autocomplete_index
+from backend.services.bson_json import decode_raw, document_to_json, ok_envelope
+from backend.services.database import db as database
+from backend.services.database import get_db
+from backend.services.dataloader import RequestLoaders, get_loaders
+from backend.services.runbook_snapshot import runbook_snapshot
+from backend.services.runbook_uploads import runbook_uploads
+from backend.services.security import get_current_user, requires_role
+from backend.services.similarity import similarity_index
+from backend.services.tree_render import render
+from backend.services.tree_simulator import simulate
+from backend.services.tree_stats import STATS_FIELDS
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/runbooks", tags=["runbooks"])
+
+
+def _object_id(runbook_id: str) -> ObjectId:
+    if not ObjectId.is_valid(runbook_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Runbook not found"
+        )
+    return ObjectId(runbook_id)
+
+
+def _parse_if_match(if_match: str | None) -> int:
+    if if_match is None:
+        raise HTTPException(
+            status_code=status.HTTP_428_PRECONDITION_REQUIRED,
+            detail="Updates require an If-Match header with the runbook version",
+        )
+    try:
+        return int(if_match.strip().removeprefix("W/").strip('"'))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="If-Match must be a runbook version",
+        ) from None
+
+
+def _snapshot_or_503():
+    if not runbook_snapshot.load():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The database is unavailable and no snapshot is available",
+        )
+    return runbook_snapshot
+
+
+def _stale_headers(snapshot_at: datetime) -> dict[str, str]:
+    age = max(0, int((datetime.now(UTC) - snapshot_at).total_seconds()))
+    return {"Warning": '110 - "Response is Stale"', "Age": str(age)}
+
+
+def _snapshot_runbook(runbook_id: str) -> dict:
+    """Read a runbook from the snapshot while MongoDB is unavailable."""
+    doc = _snapshot_or_503().get(runbook_id)
+    if doc is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Runbook not found"
+        )
+    return doc
+
+
+async def _read_document(
+    repo: RunbookRepository, runbook_id: str
+) -> tuple[dict, datetime | None]:
+    """
+    Read a stored runbook, from the snapshot while MongoDB is unavailable.
+
+    Runbooks read from MongoDB are added to the runbook cache.
+
+    :return: The document, and the snapshot time if it came from the snapshot.
+    """
+    if database.healthy:
+        try:
+            raw = await repo.get_raw(runbook_id)
+        except PyMongoError as exc:
+            # The health check has not noticed the outage yet.
+            logger.warning("Reading runbook %s failed: %s", runbook_id, exc)
+        else:
+            if raw is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND, detail="Runbook not found"
+                )
+            # Later reads of this runbook are then served from the cache.
+            repo.cache_raw(raw)
+            return decode_raw(raw), None
+    return _snapshot_runbook(runbook_id), runbook_snapshot.created_at
+
+
+def _stat(doc: dict, field: str):
+    value = doc
+    for part in field.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def _list_from_snapshot(query: dict, field: str, direction: int, skip: int, limit: int):
+    """Run the catalog query against the snapshot while MongoDB is unavailable."""
+    snapshot = _snapshot_or_503()
+    tag = query.get("tags")
+    limits = {key: bound["$lte"] for key, bound in query.items() if key != "tags"}
+    docs = [
+        doc
+        for doc in snapshot.documents()
+        if (tag is None or tag in doc.get("tags", []))
+        and all(
+            (value := _stat(doc, key)) is not None and value <= maximum
+            for key, maximum in limits.items()
+        )
+    ]
+    # Like MongoDB, missing values sort before every other value.
+    docs.sort(
+        key=lambda doc: (_stat(doc, field) is not None, _stat(doc, field) or 0),
+        reverse=direction < 0,
+    )
+    items = []
+    for doc in docs[skip : skip + limit]:
+        item = Runbook(**doc).model_dump(
+            mode="json", exclude={"decision_tree", "execution_environment"}
+        )
+        item["owner"] = None
+        items.append(item)
+    return JSONResponse(
+        {
+            "ok": True,
+            "stale": {"snapshot_at": snapshot.created_at.isoformat()},
+            "data": items,
+        },
+        headers=_stale_headers(snapshot.created_at),
+    )
+
+
+@router.get("")
+async def list_runbooks(
+    tag: str | None = None,
+    max_nodes: int | None = Query(None, ge=0),
+    max_depth: int | None = Query(None, ge=0),
+    max_commands: int | None = Query(None, ge=0),
+    max_runtime_seconds: int | None = Query(None, ge=0),
+    sort: Literal[
+        "updated_at", "node_count", "max_depth", "command_count", "worst_case_runtime"
+    ] = "updated_at",
+    order: Literal["asc", "desc"] = "desc",
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100),
+    db=Depends(get_db),
+    loaders: RequestLoaders = Depends(get_loaders),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    List runbooks with their owners, most recently updated first by default.
+
+    Runbooks can be filtered and sorted by the tree statistics stored with
+    them, so the decision trees themselves are never loaded. While MongoDB is
+    unavailable the list comes from the local snapshot, without owners, and
+    is flagged as stale.
+    """
+    query: dict = {"tags": tag} if tag else {}
+    limits = {
+        "node_count": max_nodes,
+        "max_depth": max_depth,
+        "command_count": max_commands,
+        "worst_case_runtime": max_runtime_seconds,
+    }
+    for key, maximum in limits.items():
+        if maximum is not None:
+            query[STATS_FIELDS[key]] = {"$lte": maximum}
+    field = STATS_FIELDS.get(sort, sort)
+    direction = 1 if order == "asc" else -1
+    if not database.healthy:
+        return _list_from_snapshot(query, field, direction, skip, limit)
+    runbooks = await RunbookRepository(db).find_many(
+        query, skip, limit, sort=[(field, direction), ("_id", direction)]
+    )
+    owners = await loaders.users.load_many(r.owner_id for r in runbooks)
+    items = []
+    for runbook, owner in zip(runbooks, owners, strict=True):
+        item = runbook.model_dump(
+            mode="json", exclude={"decision_tree", "execution_environment"}
+        )
+        item["owner"] = UserPublic.from_user(owner).model_dump() if owner else None
+        items.append(item)
+    return {"ok": True, "data": items}
+
+
+@router.get("/autocomplete")
+async def autocomplete(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(10, ge=1, le=25),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Suggest runbook titles and tags starting with what was typed, most used
+    first.
+
+    Served from an in-memory index, so it is cheap enough to call on every
+    keystroke.
+    """
+    return {"ok": True, "data": autocomplete_index.suggest(q, limit)}
+
+
+@router.get("/{runbook_id}")
+async def get_runbook(
+    runbook_id: str,
+    response: Response,
+    db=Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Get a runbook; its version is returned as the ETag.
+
+    A cached runbook is served from the cache; a compact cached runbook is
+    encoded to JSON without building a model. Otherwise the stored document
+    is read as raw BSON and encoded straight to JSON, since it was validated
+    when it was written. While MongoDB is unavailable, runbooks missing from
+    the cache are served from the local snapshot and flagged as stale.
+    """
+    _object_id(runbook_id)
+    repo = RunbookRepository(db)
+    cached = repo.cache.get(runbook_id) if repo.cache is not None else None
+    if isinstance(cached, CompactRunbook):
+        return Response(
+            ok_envelope(document_to_json(cached.to_document())),
+            media_type="application/json",
+            headers={"ETag": f'"{cached.version}"'},
+        )
+    if cached is not None:
+        response.headers["ETag"] = f'"{cached.version}"'
+        return {"ok": True, "data": cached.model_dump(mode="json")}
+    doc, snapshot_at = await _read_document(repo, runbook_id)
+    headers = {"ETag": f'"{doc.get("version")}"'}
+    if snapshot_at is not None:
+        headers.update(_stale_headers(snapshot_at))
+    return Response(
+        ok_envelope(document_to_json(doc), snapshot_at),
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+@router.post("", status_code=status.HTTP_201_CREATED)
+async def create_runbook(
+    request: Request,
+    db=Depends(get_db),
+    current_user: User = Depends(requires_role(UserRole.EDITOR)),
+):
+    """
+    Create a runbook from a ``RunbookCreate`` body.
+
+    Large bodies are validated in a process pool so other requests keep being
+    served; see :mod:`backend.services.runbook_uploads`.
+    """
+    prepared = await runbook_uploads.prepare_create(await request.body())
+    await RunbookRepository(db).create_prepared(prepared)
+    return Response(
+        ok_envelope(prepared.response),
+        status_code=status.HTTP_201_CREATED,
+        media_type="application/json",
+        headers={"ETag": '"1"'},
+    )
+
+
+@router.put("/{runbook_id}")
+async def update_runbook(
+    runbook_id: str,
+    request: Request,
+    if_match: str | None = Header(None),
+    db=Depends(get_db),
+    current_user: User = Depends(requires_role(UserRole.EDITOR)),
+):
+    """
+    Update a runbook from a ``RunbookUpdate`` body if it is still at the
+    version given in ``If-Match``.
+
+    A stale version is answered with 409 and the current version. Large
+    bodies are validated in a process pool, as for creation.
+    """
+    _object_id(runbook_id)
+    expected_version = _parse_if_match(if_match)
+    fields = await runbook_uploads.prepare_update(await request.body())
+    runbook = await RunbookRepository(db).update_prepared(
+        runbook_id, fields, expected_version
+    )
+    if runbook is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Runbook not found"
+        )
+    return Response(
+        ok_envelope(runbook.response),
+        media_type="application/json",
+        headers={"ETag": f'"{runbook.version}"'},
+    )
+
+
+@router.get("/{runbook_id}/render")
+async def render_runbook(
+    runbook_id: str,
+    format: str = Query("layout", pattern="^(mermaid|dot|layout)$"),
+    db=Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Render the decision tree as Mermaid, Graphviz DOT or layout JSON."""
+    _object_id(runbook_id)
+    repo = RunbookRepository(db)
+    snapshot_at = None
+    if database.healthy:
+        runbook = await repo.get(runbook_id)
+        if runbook is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Runbook not found"
+            )
+    else:
+        runbook = repo.get_cached(runbook_id)
+        if runbook is None:
+            runbook = Runbook(**_snapshot_runbook(runbook_id))
+            snapshot_at = runbook_snapshot.created_at
+    rendered = render(runbook_id, runbook.version, runbook.decision_tree, format)
+    headers = {"ETag": f'"{runbook.version}"'}
+    if snapshot_at is not None:
+        headers.update(_stale_headers(snapshot_at))
+    if format == "layout":
+        body = {"ok": True, "data": rendered}
+        if snapshot_at is not None:
+            body["stale"] = {"snapshot_at": snapshot_at.isoformat()}
+        return JSONResponse(body, headers=headers)
+    return PlainTextResponse(rendered, headers=headers)
+
+
+@router.get("/{runbook_id}/simulation")
+async def simulate_runbook(
+    runbook_id: str,
+    samples: int = Query(3, ge=0, le=20),
+    seed: int | None = None,
+    path: list[str] | None = Query(None),
+    db=Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Count the paths through the decision tree and dry-run representative ones.
+
+    Nothing is executed; timelines assume every command runs to its timeout.
+    Pass ``path`` once per node ID to dry-run a specific path instead. The
+    path count is returned as a string, since it can exceed what a JSON
+    number holds exactly.
+    """
+    _object_id(runbook_id)
+    runbook = await RunbookRepository(db).get(runbook_id)
+    if runbook is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Runbook not found"
+        )
+    try:
+        result = simulate(runbook.decision_tree, samples, seed, path)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)
+        ) from None
+    result["path_count"] = str(result["path_count"])
+    return JSONResponse(
+        {"ok": True, "data": result}, headers={"ETag": f'"{runbook.version}"'}
+    )
+
+
+@router.get("/{runbook_id}/analytics")
+async def runbook_analytics(
+    runbook_id: str,
+    version: int | None = Query(None, ge=1),
+    top_paths: int = Query(10, ge=1, le=100),
+    db=Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Read the execution-path analytics of a runbook version."""
+    oid = _object_id(runbook_id)
+    if version is None:
+        runbook = await RunbookRepository(db).get(runbook_id)
+        if runbook is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Runbook not found"
+            )
+        version = runbook.version
+    summary = await PathAnalyticsRepository(db).get_summary(oid, version, top_paths)
+    if summary is None:
+        summary = summarize({"runbook_id": oid, "version": version}, [])
+    return {"ok": True, "data": summary}
+
+
+@router.get("/{runbook_id}/similar")
+async def similar_runbooks(
+    runbook_id: str,
+    k: int = Query(5, ge=1, le=50),
+    db=Depends(get_db),
+    loaders: RequestLoaders = Depends(get_loaders),
+    current_user: User = Depends(get_current_user),
+):
+    """Suggest runbooks that share symptoms, questions or commands with this one."""
+    _object_id(runbook_id)
+    runbook = await RunbookRepository(db).get(runbook_id)
+    if runbook is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Runbook not found"
+        )
+    if similarity_index.version(runbook_id) != runbook.version:
+        similarity_index.upsert(runbook)
+    neighbours = similarity_index.similar([runbook_id], k)[0]
+    runbooks = await loaders.runbooks.load_many(other for other, _ in neighbours)
+    return {
+        "ok": True,
+        "data": [
+            {
+                "id": str(other.id),
+                "title": other.title,
+                "severity": other.severity.value,
+                "score": round(score, 4),
+            }
+            for other, (_, score) in zip(runbooks, neighbours, strict=True)
+            if other is not None
+        ],
+    }
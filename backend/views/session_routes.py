@@ -0,0 +1,304 @@
+"""Session endpoints."""
+from bson import ObjectId
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+
+from backend.config import settings
+from backend.controllers.session_controller import SessionController
+from backend.models.enums import SessionStatus
+from backend.models.session import (
+    CommandOutput,
+    CommandRun,
+    SessionAdvance,
+    SessionComplete,
+    SessionStart,
+)
+from backend.models.user import User, UserPublic
+from backend.repositories.command_output import CommandOutputRepository
+from backend.repositories.session import SessionRepository
+from backend.repositories.timeline import TimelineEventRepository
+from backend.services.command_output import follow
+from backend.services.database import get_db
+from backend.services.dataloader import RequestLoaders, get_loaders
+from backend.services.security import get_current_user
+
+router = APIRouter(prefix="/api/sessions", tags=["sessions"])
+
+# The most output bytes returned by a single read.
+MAX_OUTPUT_READ = 1024 * 1024
+
+
+def _check_session_id(session_id: str) -> None:
+    if not ObjectId.is_valid(session_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Session not found"
+        )
+
+
+def _user(user: User | None) -> dict | None:
+    return UserPublic.from_user(user).model_dump() if user else None
+
+
+@router.get("")
+async def list_sessions(
+    session_status: SessionStatus | None = Query(None, alias="status"),
+    runbook_id: str | None = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100),
+    db=Depends(get_db),
+    loaders: RequestLoaders = Depends(get_loaders),
+    current_user: User = Depends(get_current_user),
+):
+    """List sessions, newest first, with their runbooks and responders."""
+    query: dict = {}
+    if session_status is not None:
+        query["status"] = session_status.value
+    if runbook_id is not None:
+        if not ObjectId.is_valid(runbook_id):
+            return {"ok": True, "data": []}
+        query["runbook_id"] = ObjectId(runbook_id)
+    sessions = await SessionRepository(db).find_many(
+        query, skip, limit, sort=[("created_at", -1)]
+    )
+    runbooks = await loaders.runbooks.load_many(s.runbook_id for s in sessions)
+    users = await loaders.users.load_many(s.user_id for s in sessions)
+    items = []
+    for session, runbook, user in zip(sessions, runbooks, users, strict=True):
+        item = session.model_dump(mode="json")
+        item["runbook"] = (
+            {
+                "id": str(runbook.id),
+                "title": runbook.title,
+                "severity": runbook.severity.value,
+                "version": runbook.version,
+            }
+            if runbook
+            else None
+        )
+        item["user"] = _user(user)
+        items.append(item)
+    return {"ok": True, "data": items}
+
+
+@router.post("")
+async def start_session(
+    body: SessionStart,
+    db=Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Start a new session at the root of a runbook."""
+    if not ObjectId.is_valid(body.runbook_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Runbook not found"
+        )
+    session = await SessionController(db).start(body.runbook_id, current_user)
+    return {"ok": True, "data": session.model_dump(mode="json")}
+
+
+@router.post("/{session_id}/advance")
+async def advance_session(
+    session_id: str,
+    body: SessionAdvance,
+    db=Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Move a session to the next node of its decision tree.
+
+    Moving to an action node also returns what is needed to execute it as
+    ``action``.
+    """
+    _check_session_id(session_id)
+    session, action = await SessionController(db).advance(session_id, body.next_node_id)
+    data = session.model_dump(mode="json")
+    if action is not None:
+        data["action"] = action
+    return {"ok": True, "data": data}
+
+
+@router.post("/{session_id}/complete")
+async def complete_session(
+    session_id: str,
+    body: SessionComplete,
+    db=Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Finish a session as completed or failed."""
+    _check_session_id(session_id)
+    session = await SessionController(db).complete(session_id, body.status)
+    return {"ok": True, "data": session.model_dump(mode="json")}
+
+
+@router.post("/{session_id}/commands", status_code=status.HTTP_202_ACCEPTED)
+async def run_command(
+    session_id: str,
+    body: CommandRun,
+    db=Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Run a command of the session's current action node.
+
+    The command runs in the job worker pool; poll the returned job for its
+    exit code and read its output through ``/outputs``.
+    """
+    _check_session_id(session_id)
+    job = await SessionController(db).run_command(
+        session_id, body.node_id, body.command_index, current_user
+    )
+    return {"ok": True, "data": job.model_dump(mode="json")}
+
+
+@router.get("/{session_id}/timeline")
+async def session_timeline(
+    session_id: str,
+    db=Depends(get_db),
+    loaders: RequestLoaders = Depends(get_loaders),
+    current_user: User = Depends(get_current_user),
+):
+    """List a session's timeline events with the users who caused them."""
+    _check_session_id(session_id)
+    events = await TimelineEventRepository(db).list_for_session(session_id)
+    users = await loaders.users.load_many(e.user_id for e in events)
+    items = []
+    for event, user in zip(events, users, strict=True):
+        item = event.model_dump(mode="json")
+        item["user"] = _user(user)
+        items.append(item)
+    return {"ok": True, "data": items}
+
+
+async def _get_output(
+    repo: CommandOutputRepository, session_id: str, output_id: str
+) -> CommandOutput:
+    output = None
+    if ObjectId.is_valid(output_id):
+        output = await repo.get(output_id)
+    if output is None or str(output.session_id) != session_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Output not found"
+        )
+    return output
+
+
+def _parse_range(header: str | None, length: int) -> tuple[int, int] | None:
+    """Parse a single ``bytes=`` range into ``[start, end)``."""
+    if header is None:
+        return None
+    unit, _, spec = header.partition("=")
+    first, _, last = spec.strip().partition("-")
+    try:
+        if unit.strip() != "bytes" or "," in spec:
+            raise ValueError(header)
+        if first:
+            start = int(first)
+            end = int(last) + 1 if last else length
+        else:
+            start, end = max(0, length - int(last)), length
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Only a single bytes range is supported",
+        ) from None
+    if start >= length or end <= start:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail=f"Output is {length} bytes long",
+        )
+    return start, min(end, length)
+
+
+@router.get("/{session_id}/outputs")
+async def list_outputs(
+    session_id: str,
+    db=Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """List the command output streams of a session."""
+    _check_session_id(session_id)
+    outputs = await CommandOutputRepository(db).list_for_session(session_id)
+    return {"ok": True, "data": [o.model_dump(mode="json") for o in outputs]}
+
+
+@router.get("/{session_id}/outputs/{output_id}")
+async def read_output(
+    session_id: str,
+    output_id: str,
+    range_header: str | None = Header(None, alias="Range"),
+    db=Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Read command output, honouring a ``Range: bytes=`` header.
+
+    Reads are capped at 1 MiB; larger ranges are answered partially and the
+    ``Content-Range`` header tells the client where to continue.
+    """
+    repo = CommandOutputRepository(db)
+    output = await _get_output(repo, session_id, output_id)
+    requested = _parse_range(range_header, output.length)
+    start, end = requested or (0, output.length)
+    end = min(end, start + MAX_OUTPUT_READ)
+    data = await repo.read_range(output, start, end)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "X-Output-Complete": str(output.complete).lower(),
+    }
+    partial = requested is not None or end < output.length
+    if partial:
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{output.length}"
+    return Response(
+        data,
+        status_code=status.HTTP_206_PARTIAL_CONTENT if partial else status.HTTP_200_OK,
+        media_type="text/plain",
+        headers=headers,
+    )
+
+
+@router.get("/{session_id}/outputs/{output_id}/tail")
+async def tail_output(
+    session_id: str,
+    output_id: str,
+    lines: int = Query(100, ge=1, le=10000),
+    db=Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Read the last lines of command output, like ``tail -n``."""
+    repo = CommandOutputRepository(db)
+    output = await _get_output(repo, session_id, output_id)
+    data, start = await repo.tail(output, lines)
+    return Response(
+        data[-MAX_OUTPUT_READ:],
+        media_type="text/plain",
+        headers={
+            "X-Output-Offset": str(start + len(data)),
+            "X-Output-Complete": str(output.complete).lower(),
+        },
+    )
+
+
+@router.get("/{session_id}/outputs/{output_id}/follow")
+async def follow_output(
+    session_id: str,
+    output_id: str,
+    offset: int = Query(0, ge=0),
+    db=Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Stream command output from an offset until the command finishes, or no
+    output has arrived for ``COMMAND_OUTPUT_FOLLOW_IDLE_S``.
+    """
+    repo = CommandOutputRepository(db)
+    await _get_output(repo, session_id, output_id)
+    return StreamingResponse(
+        follow(
+            repo,
+            output_id,
+            offset,
+            settings.command_output_follow_poll_s,
+            MAX_OUTPUT_READ,
+            settings.command_output_follow_idle_s,
+        ),
+        media_type="text/plain",
+    )
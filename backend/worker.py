@@ -0,0 +1,96 @@
+"""
+Background job worker pool.
+
+Run with ``python -m backend.worker``. Each process connects to MongoDB on its
+own and claims jobs from the shared queue, so the pool can also be scaled by
+running the command on several hosts.
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from datetime import timedelta
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from backend.config import settings
+from backend.repositories.job import JobRepository
+from backend.services.jobs import create_worker
+from backend.services.structured_logging import log_pipeline
+
+logger = logging.getLogger(__name__)
+
+
+async def serve(worker_id: str) -> None:
+    """
+    Run a job worker until the process receives SIGTERM or SIGINT.
+
+    :param worker_id: A unique name for the worker.
+    """
+    client = AsyncIOMotorClient(settings.mongodb_uri)
+    db = client[settings.db_name]
+    await JobRepository(db).ensure_indexes(timedelta(days=settings.job_retention_days))
+    task = asyncio.create_task(create_worker(db, worker_id).run())
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, task.cancel)
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    finally:
+        client.close()
+
+
+def _process_main() -> None:
+    load_dotenv()
+    # The writer thread of a pipeline started before the fork is not copied,
+    # so this sets up the child's own.
+    log_pipeline.start()
+    try:
+        asyncio.run(serve(f"{socket.gethostname()}-{os.getpid()}"))
+    finally:
+        log_pipeline.stop()
+
+
+def main() -> None:
+    """Start the worker processes and restart any that die."""
+    parser = argparse.ArgumentParser(description="Run background job workers.")
+    parser.add_argument("--processes", type=int, default=settings.job_worker_processes)
+    args = parser.parse_args()
+    log_pipeline.start()
+
+    processes: list[multiprocessing.Process] = []
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for process in processes:
+            process.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for _ in range(args.processes):
+        process = multiprocessing.Process(target=_process_main)
+        process.start()
+        processes.append(process)
+    while not stopping:
+        for index, process in enumerate(processes):
+            if not process.is_alive() and not stopping:
+                logger.warning("Worker %s exited; restarting it", process.pid)
+                processes[index] = multiprocessing.Process(target=_process_main)
+                processes[index].start()
+        time.sleep(1)
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
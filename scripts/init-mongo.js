@@ -63,5 +63,6 @@ db.sessions.createIndex({ runbook_id: 1 });
 db.sessions.createIndex({ user_id: 1 });
 db.sessions.createIndex({ status: 1 });
 db.sessions.createIndex({ created_at: -1 });
+db.sessions.createIndex({ status: 1, completed_at: 1 });
 
 print('Database initialization completed successfully!');